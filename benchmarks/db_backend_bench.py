@@ -0,0 +1,173 @@
+"""
+Сравнение MariaDB и встроенной БД SQLite (WAL) на запросах системы.
+
+Запись: показания DEVICES устройств по PARAMS параметрам с шагом --interval
+секунд за --days дней записываются пакетами по --batch строк через
+DBMS_worker IoT-сервера (upsert_actual_data: actual_data, триггер истории
+и агрегаты history_minute/hour/day), как это делает буфер записи показаний.
+
+Чтение: запросы графика /history через DBMS_worker web-сервера (get_history)
+для каждого периода в разрешении, которое выбирает страница, и для замеров
+без агрегатов за сутки. Для каждого выводятся p50 и p95 времени ответа.
+
+Каждый тип БД заполняется в отдельной базе --database, которая удаляется
+после замера. Для MariaDB нужен запущенный сервер.
+
+Запуск: python benchmarks/db_backend_bench.py --backends sqlite mysql --days 7
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import importlib.util
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from dbaccess import BACKENDS  # noqa: E402
+
+PARAMS = ("temperature", "humidity", "brightness")
+# Запросы /history: (период, дней, разрешение, выбираемое страницей для периода)
+HISTORY_QUERIES = [
+    ("24h", 1, "raw"),
+    ("24h", 1, "minute"),
+    ("7d", 7, "hour"),
+    ("30d", 30, "hour"),
+    ("all", None, "day"),
+]
+
+
+def load_worker(component: str):
+    """
+    Загружает класс DBMS_worker компонента. У IoT- и web-сервера модули
+    называются одинаково, поэтому они загружаются под разными именами.
+
+    Args:
+        component (str): Каталог компонента в servers/
+
+    Returns:
+        type: Класс DBMS_worker
+    """
+    path = os.path.join(ROOT, "servers", component, "DBMS_worker.py")
+    spec = importlib.util.spec_from_file_location(f"{component}_DBMS_worker", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.DBMS_worker
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_ingest(iot, args: argparse.Namespace) -> tuple[int, float]:
+    """
+    Returns:
+        tuple[int, float]: (записано строк, строк в секунду)
+    """
+    rng = random.Random(0)
+    device_ids = []
+    for number in range(args.devices):
+        uuid = f"00000000-0000-0000-0000-{number:012d}"
+        iot.add_device(uuid, f"bench-{number}")
+        device_ids.append(iot.get_device_id(uuid))
+
+    start = datetime.now().replace(microsecond=0) - timedelta(days=args.days)
+    steps = args.days * 86400 // args.interval
+    rows = []
+    written = 0
+    elapsed = 0.0
+    for step in range(steps):
+        moment = start + timedelta(seconds=step * args.interval)
+        for device_id in device_ids:
+            for param in PARAMS:
+                rows.append((device_id, param, rng.randint(0, 100), moment))
+        if len(rows) >= args.batch or step == steps - 1:
+            started = time.perf_counter()
+            if not iot.upsert_actual_data(rows):
+                raise RuntimeError("Ошибка записи показаний")
+            elapsed += time.perf_counter() - started
+            written += len(rows)
+            rows = []
+    return written, written / elapsed
+
+
+def bench_history(web, args: argparse.Namespace) -> list[tuple[str, str, int, float, float]]:
+    """
+    Returns:
+        list[tuple]: (период, разрешение, точек, p50 мс, p95 мс) для HISTORY_QUERIES
+    """
+    results = []
+    for time_range, days, resolution in HISTORY_QUERIES:
+        timings = []
+        points = 0
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            points = len(web.get_history(PARAMS[0], None, days, resolution))
+            timings.append((time.perf_counter() - started) * 1000)
+        results.append(
+            (time_range, resolution, points, percentile(timings, 0.5), percentile(timings, 0.95))
+        )
+    return results
+
+
+def drop_database(worker, backend: str, db_name: str) -> None:
+    db = worker.db
+    if backend == "sqlite":
+        db.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db.path + suffix):
+                os.remove(db.path + suffix)
+    else:
+        db.execute(f"DROP DATABASE IF EXISTS {db_name}", prepared=False)
+        db.close()
+
+
+def run(backend: str, args: argparse.Namespace) -> None:
+    iot = load_worker("IoT-server")(
+        args.host, args.user, args.password, args.database, backend=backend
+    )
+    if not iot.created:
+        print(f"{backend}: нет подключения к БД: {iot.error}")
+        return
+    web = load_worker("web-server")(
+        args.host, args.user, args.password, args.database, backend=backend
+    )
+    try:
+        written, rate = bench_ingest(iot, args)
+        print(f"{backend}: записано {written} строк, {rate:,.0f} строк/с")
+        for time_range, resolution, points, p50, p95 in bench_history(web, args):
+            print(
+                f"{backend}: /history {time_range:>3} {resolution:<6} "
+                f"точек {points:>6}  p50 {p50:8.2f} мс  p95 {p95:8.2f} мс"
+            )
+    finally:
+        web.db.close()
+        drop_database(iot, backend, args.database)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Сравнение MariaDB и SQLite (WAL)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="123")
+    parser.add_argument("--database", default="GreenHouseBench")
+    parser.add_argument("--devices", type=int, default=20, help="число устройств")
+    parser.add_argument("--days", type=int, default=7, help="дней истории")
+    parser.add_argument("--interval", type=int, default=300, help="шаг замеров, с")
+    parser.add_argument("--batch", type=int, default=500, help="строк в пакете записи")
+    parser.add_argument("--queries", type=int, default=20, help="повторов каждого запроса")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    for backend in args.backends:
+        run(backend, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Сравнение прежнего чтения и записи кадров с модулем framing.
+
+Прежний способ: два вызова sendall на кадр (заголовок и данные) и чтение
+с накоплением в bytes через '+='. Новый: send_frame одним системным вызовом
+и FrameReader с recv_into в переиспользуемый буфер.
+Кадры передаются через пару локальных сокетов, отправка идёт в отдельном потоке.
+
+Запуск: python benchmarks/framing_bench.py [число кадров]
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from transport import FrameReader, send_frame  # noqa: E402
+
+SIZES = [64, 4 * 1024, 64 * 1024, 512 * 1024]
+
+
+def legacy_send(sock: socket.socket, payload: bytes) -> None:
+    sock.sendall(len(payload).to_bytes(4, "big"))
+    sock.sendall(payload)
+
+
+def legacy_recv(sock: socket.socket) -> bytes:
+    data_length = int.from_bytes(sock.recv(4), "big")
+    data = b""
+    while len(data) < data_length:
+        packet = sock.recv(data_length - len(data))
+        if not packet:
+            raise ConnectionError("Соединение закрыто")
+        data += packet
+    return data
+
+
+def run(size: int, frames: int, framed: bool) -> float:
+    """
+    Передаёт frames кадров размера size и возвращает микросекунды на кадр.
+
+    Args:
+        size (int): Размер полезной нагрузки в байтах
+        frames (int): Число кадров
+        framed (bool): True - модуль framing, False - прежний способ
+
+    Returns:
+        float: Среднее время передачи кадра в микросекундах
+    """
+    writer, reader = socket.socketpair()
+    payload = os.urandom(size)
+    send = send_frame if framed else legacy_send
+
+    def produce():
+        for _ in range(frames):
+            send(writer, payload)
+
+    if framed:
+        frame_reader = FrameReader(reader)
+        receive = frame_reader.read_frame
+    else:
+        def receive():
+            return legacy_recv(reader)
+
+    thread = threading.Thread(target=produce)
+    started = time.perf_counter()
+    thread.start()
+    for _ in range(frames):
+        assert len(receive()) == size
+    thread.join()
+    elapsed = time.perf_counter() - started
+
+    writer.close()
+    reader.close()
+    return elapsed / frames * 1e6
+
+
+def main() -> None:
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    print(f"{'размер':>10}{'прежний, мкс':>16}{'framing, мкс':>16}")
+    for size in SIZES:
+        legacy = run(size, frames, framed=False)
+        framed = run(size, frames, framed=True)
+        print(f"{size:>10}{legacy:>16.2f}{framed:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
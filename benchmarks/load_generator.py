@@ -0,0 +1,341 @@
+"""
+Генератор нагрузки на IoT-сервер.
+
+Виртуальные устройства говорят на том же протоколе, что и bots: вход
+(пароль, метаданные с форматами и шифром сессии), затем кадры показаний
+с ответом {'delay', 'commands'}. Устройства подключаются равномерно
+в течение --ramp секунд, каждое отправляет --rate кадров в секунду
+независимо от задержки, назначенной сервером.
+
+Каждые --report секунд и в конце выводятся: число устройств на связи,
+пропускная способность (кадров в секунду), p50/p95/p99 времени от отправки
+кадра до получения ответа и счётчики ошибок.
+
+Запуск: python benchmarks/load_generator.py --devices 1000 --rate 1 --duration 60
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import resource
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "servers", "IoT-server")
+)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from encryption import encrypt, decrypt_bytes  # noqa: E402
+from transport.session import (  # noqa: E402
+    CIPHER_SESSION,
+    new_session_nonce,
+    session_from_response,
+)
+from transport.wire_format import (  # noqa: E402
+    JSON_CODEC,
+    codec_from_response,
+    FORMAT_BINARY,
+    FORMAT_JSON,
+    BATCH_KEY,
+    TIMESTAMP_KEY,
+    PUSH_KEY,
+)
+from transport import read_frame_async, write_frame  # noqa: E402
+from config import (  # noqa: E402
+    LOC_SOCK_SERV_ADDR,
+    LOC_SOCK_SERV_PORT,
+    PASSWORD,
+    ENCRYPTION_KEY,
+)
+
+PARAMS = ("temperature", "humidity", "light")
+# UUID виртуальных устройств постоянны между запусками, чтобы не плодить записи в БД
+UUID_NAMESPACE = uuid.UUID("6f1c3a52-7d0e-4c1b-9a55-2b8e4f0d9c31")
+ERRORS = ("connect", "login", "busy", "timeout", "disconnect")
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Args:
+        values (list[float]): Отсортированные значения
+        fraction (float): Доля от 0 до 1
+
+    Returns:
+        float: Значение перцентиля или 0 для пустого списка
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Stats:
+    def __init__(self):
+        """
+        Счётчики нагрузки за текущий интервал отчёта и за весь запуск.
+
+        Attributes:
+            online (int): Устройства, прошедшие вход
+            latencies (list): Времена ответа за интервал в секундах
+            total_latencies (list): Времена ответа за весь запуск
+            errors (dict): {вид ошибки: число} за весь запуск
+            pushed (int): Принятые кадры команд без запроса
+        """
+        self.online = 0
+        self.latencies = []
+        self.total_latencies = []
+        self.errors = dict.fromkeys(ERRORS, 0)
+        self.pushed = 0
+        self.started = time.monotonic()
+        self.interval_started = self.started
+
+    def report(self, final: bool = False) -> str:
+        """
+        Формирует строку отчёта и начинает новый интервал.
+
+        Args:
+            final (bool, optional): Итог за весь запуск вместо интервала
+
+        Returns:
+            str: Строка отчёта
+        """
+        now = time.monotonic()
+        if final:
+            latencies, elapsed = self.total_latencies, now - self.started
+        else:
+            latencies, elapsed = self.latencies, now - self.interval_started
+            self.total_latencies.extend(latencies)
+            self.latencies = []
+            self.interval_started = now
+
+        latencies = sorted(latencies)
+        errors = " ".join(f"{name}={count}" for name, count in self.errors.items())
+        return (
+            f"[{now - self.started:7.1f} c] устройств {self.online:>6} "
+            f"кадров/с {len(latencies) / elapsed if elapsed else 0:>9.1f} "
+            f"p50 {percentile(latencies, 0.50) * 1000:>7.2f} мс "
+            f"p95 {percentile(latencies, 0.95) * 1000:>7.2f} мс "
+            f"p99 {percentile(latencies, 0.99) * 1000:>7.2f} мс "
+            f"push={self.pushed} {errors}"
+        )
+
+
+class VirtualDevice:
+    def __init__(self, index: int, args: argparse.Namespace, stats: Stats):
+        """
+        Виртуальное устройство генератора нагрузки.
+
+        Args:
+            index (int): Номер устройства
+            args (argparse.Namespace): Параметры запуска
+            stats (Stats): Общие счётчики
+        """
+        self.name = f"load-{index}"
+        self.uuid = str(uuid.uuid5(UUID_NAMESPACE, self.name))
+        self.args = args
+        self.stats = stats
+        self.codec = JSON_CODEC
+        self.cipher = None
+        self.reader = None
+        self.writer = None
+
+    def encode(self, data: dict) -> bytes:
+        payload = self.codec.encode(data)
+        return self.cipher.encrypt(payload) if self.cipher else encrypt(payload)
+
+    def decode(self, payload: bytes) -> dict:
+        data = self.cipher.decrypt(payload) if self.cipher else decrypt_bytes(payload)
+        return self.codec.decode(data)
+
+    async def send(self, data: dict) -> None:
+        write_frame(self.writer, self.encode(data))
+        await self.writer.drain()
+
+    async def receive(self) -> dict:
+        payload = await asyncio.wait_for(
+            read_frame_async(self.reader), self.args.timeout
+        )
+        return self.decode(payload)
+
+    async def login(self) -> int | None:
+        """
+        Выполняет вход по протоколу Server.perform_login.
+
+        Returns:
+            int | None: None при успешном входе, иначе задержка повторной попытки
+        """
+        self.codec, self.cipher = JSON_CODEC, None
+        await self.send({"password": self.args.password})
+
+        client_nonce = new_session_nonce()
+        device_info = {
+            "device_name": self.name,
+            "uuid": self.uuid,
+            "formats": [self.args.format],
+            "params": ["state", *PARAMS],
+            "push": True,
+        }
+        if self.args.session_cipher:
+            device_info["cipher"] = CIPHER_SESSION
+            device_info["client_nonce"] = client_nonce.hex()
+        await self.send(device_info)
+
+        response = await self.receive()
+        if response.get("status") == "busy":
+            self.stats.errors["busy"] += 1
+            return response.get("retry_after", 1)
+        if response.get("status") not in ("authorized", "registered"):
+            raise PermissionError(f"Вход отклонён: {response}")
+
+        self.codec = codec_from_response(response)
+        self.cipher = session_from_response(response, client_nonce, ENCRYPTION_KEY)
+        return None
+
+    def make_frame(self) -> dict:
+        """
+        Returns:
+            dict: Кадр показаний или пакет из --samples замеров
+        """
+        if self.args.samples <= 1:
+            return {"state": 0, **{p: random.randint(0, 100) for p in PARAMS}}
+        now = time.time()
+        return {
+            BATCH_KEY: [
+                {TIMESTAMP_KEY: now - i, "state": 0, **{p: random.randint(0, 100) for p in PARAMS}}
+                for i in range(self.args.samples)
+            ]
+        }
+
+    async def exchange(self) -> None:
+        """
+        Отправляет кадр и ждёт ответ, пропуская команды, отправленные без запроса.
+        """
+        started = time.perf_counter()
+        await self.send(self.make_frame())
+        while True:
+            response = await self.receive()
+            if not response.get(PUSH_KEY):
+                break
+            self.stats.pushed += 1
+        self.stats.latencies.append(time.perf_counter() - started)
+
+    async def session(self, deadline: float) -> None:
+        """
+        Одно подключение: вход и обмен кадрами с частотой --rate до deadline.
+        """
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.args.host, self.args.port),
+                self.args.timeout,
+            )
+        except (OSError, asyncio.TimeoutError):
+            self.stats.errors["connect"] += 1
+            await asyncio.sleep(1)
+            return
+
+        online = False
+        try:
+            try:
+                retry_after = await self.login()
+            except (OSError, ValueError, PermissionError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError):
+                self.stats.errors["login"] += 1
+                await asyncio.sleep(1)
+                return
+            if retry_after is not None:
+                await asyncio.sleep(min(retry_after, max(0, deadline - time.monotonic())))
+                return
+
+            online = True
+            self.stats.online += 1
+            interval = 1 / self.args.rate
+            # Случайная фаза, чтобы устройства не отправляли кадры одновременно
+            next_send = time.monotonic() + random.uniform(0, interval)
+            while next_send < deadline:
+                await asyncio.sleep(max(0, next_send - time.monotonic()))
+                await self.exchange()
+                next_send += interval
+        except asyncio.TimeoutError:
+            self.stats.errors["timeout"] += 1
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            self.stats.errors["disconnect"] += 1
+        finally:
+            if online:
+                self.stats.online -= 1
+            self.writer.close()
+
+    async def run(self, start_delay: float, deadline: float) -> None:
+        """
+        Подключается через start_delay секунд и переподключается до deadline.
+        """
+        await asyncio.sleep(start_delay)
+        while time.monotonic() < deadline:
+            await self.session(deadline)
+
+
+async def reporter(stats: Stats, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        print(stats.report(), flush=True)
+
+
+async def run(args: argparse.Namespace) -> Stats:
+    """
+    Запускает виртуальные устройства и периодический отчёт.
+
+    Returns:
+        Stats: Итоговые счётчики
+    """
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    devices = [VirtualDevice(i, args, stats) for i in range(args.devices)]
+    step = args.ramp / args.devices if args.devices else 0
+
+    report_task = asyncio.create_task(reporter(stats, args.report))
+    await asyncio.gather(
+        *(device.run(i * step, deadline) for i, device in enumerate(devices))
+    )
+    report_task.cancel()
+    stats.total_latencies.extend(stats.latencies)
+    return stats
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Генератор нагрузки на IoT-сервер")
+    parser.add_argument("--host", default=LOC_SOCK_SERV_ADDR)
+    parser.add_argument("--port", type=int, default=LOC_SOCK_SERV_PORT)
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--devices", type=int, default=100, help="число виртуальных устройств")
+    parser.add_argument("--rate", type=float, default=1.0, help="кадров в секунду на устройство")
+    parser.add_argument("--ramp", type=float, default=10.0, help="время подключения всех устройств, с")
+    parser.add_argument("--duration", type=float, default=60.0, help="длительность теста, с")
+    parser.add_argument("--report", type=float, default=5.0, help="период отчёта, с")
+    parser.add_argument("--timeout", type=float, default=10.0, help="ожидание ответа, с")
+    parser.add_argument("--samples", type=int, default=1, help="замеров в кадре")
+    parser.add_argument("--format", choices=(FORMAT_BINARY, FORMAT_JSON), default=FORMAT_BINARY)
+    parser.add_argument(
+        "--no-session-cipher", dest="session_cipher", action="store_false",
+        help="AES-EAX с общим ключом вместо шифра сессии",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    print(
+        f"{args.devices} устройств x {args.rate} кадр/с -> {args.host}:{args.port}, "
+        f"разгон {args.ramp} с, длительность {args.duration} с"
+    )
+    stats = asyncio.run(run(args))
+    print("Итого:")
+    print(stats.report(final=True))
+    sys.exit(1 if not stats.total_latencies else 0)
+
+
+if __name__ == "__main__":
+    main()
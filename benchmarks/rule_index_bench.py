@@ -0,0 +1,153 @@
+"""
+Сравнение прежней проверки правил с индексом порогов.
+
+Прежний способ: на такте исполнителя перебрать все его правила и для каждого
+сравнить текущее значение источника с порогом. Новый: при получении значения
+найти сработавшие правила параметра двоичным поиском в ThresholdIndex
+(RuleIndex.set_value) и на такте исполнителя взять готовый набор
+(RuleIndex.active_rules).
+
+Правила распределяются по SOURCES источникам с PARAMS параметрами и по TARGETS
+исполнителям, условия и пороги выбираются случайно.
+
+Запуск: python benchmarks/rule_index_bench.py [число правил ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "servers", "IoT-server")
+)
+
+from rule_index import RuleIndex, ThresholdIndex, CompiledRule  # noqa: E402
+
+SOURCES = 10
+PARAMS = ("temperature", "humidity", "light")
+TARGETS = 100
+VALUE_RANGE = (0, 1000)
+# Изменение показания датчика между соседними замерами
+DRIFT = 5
+ITERATIONS = 2000
+
+
+def make_rules(count: int) -> list[dict]:
+    rng = random.Random(count)
+    return [
+        {
+            "rule_id": rule_id,
+            "source_device": f"source-{rng.randrange(SOURCES)}",
+            "parameter": rng.choice(PARAMS),
+            "condition": rng.randint(1, 4),
+            "threshold": rng.randint(*VALUE_RANGE),
+            "target_device": f"target-{rng.randrange(TARGETS)}",
+            "message": "start:1",
+            "value": 0,
+            "timestamp": None,
+        }
+        for rule_id in range(count)
+    ]
+
+
+def bench_match(rules: list[dict]) -> tuple[float, float]:
+    """
+    Поиск сработавших правил одного параметра: перебор против индекса порогов.
+
+    Returns:
+        tuple[float, float]: Микросекунды на одно значение (перебор, индекс)
+    """
+    compiled = [CompiledRule(rule) for rule in rules]
+    group = [
+        rule for rule in compiled
+        if (rule.source_device, rule.parameter) == (compiled[0].source_device, compiled[0].parameter)
+    ]
+    index = ThresholdIndex(group)
+    values = [random.randint(*VALUE_RANGE) for _ in range(ITERATIONS)]
+
+    started = time.perf_counter()
+    for value in values:
+        [rule for rule in group if rule.matches(value)]
+    scan = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for value in values:
+        index.match(value)
+    indexed = time.perf_counter() - started
+    return scan / ITERATIONS * 1e6, indexed / ITERATIONS * 1e6
+
+
+def bench_ingest(index: RuleIndex, updates: list[tuple]) -> float:
+    """
+    Returns:
+        float: Микросекунды на один вызов set_value
+    """
+    started = time.perf_counter()
+    for (source, parameter), value in updates:
+        index.set_value(source, parameter, value, None)
+    return (time.perf_counter() - started) / len(updates) * 1e6
+
+
+def bench_target(rules: list[dict]) -> tuple[float, float, float, float]:
+    """
+    Такт исполнителя: проверка всех его правил против чтения готового набора,
+    плюс стоимость пересчёта набора при получении значения источника -
+    с плавным изменением показаний (на DRIFT) и со скачками по всему диапазону.
+
+    Returns:
+        tuple: Микросекунды (перебор на такте, active_rules на такте,
+        set_value при плавном изменении, set_value при скачках)
+    """
+    index = RuleIndex(db_worker=None, refresh_interval=0)
+    index.rebuild(rules)
+    targets = [f"target-{i}" for i in range(TARGETS)]
+    keys = list(index.by_source)
+
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        for rule in index.rules_for_target(targets[i % TARGETS]):
+            rule.matches(index.get_value(rule.source_device, rule.parameter))
+    scan = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        index.active_rules(targets[i % TARGETS])
+    active = time.perf_counter() - started
+
+    values = {key: index.get_value(*key) for key in keys}
+    drift = []
+    for _ in range(ITERATIONS):
+        key = random.choice(keys)
+        values[key] += random.randint(-DRIFT, DRIFT)
+        drift.append((key, values[key]))
+    jumps = [(random.choice(keys), random.randint(*VALUE_RANGE)) for _ in range(ITERATIONS)]
+
+    return (
+        scan / ITERATIONS * 1e6,
+        active / ITERATIONS * 1e6,
+        bench_ingest(index, drift),
+        bench_ingest(index, jumps),
+    )
+
+
+def main() -> None:
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+
+    print("Поиск сработавших правил одного параметра, мкс на значение")
+    print(f"{'правил':>10}{'в группе':>10}{'перебор':>12}{'индекс':>12}")
+    for count in counts:
+        rules = make_rules(count)
+        scan, indexed = bench_match(rules)
+        group = count // (SOURCES * len(PARAMS))
+        print(f"{count:>10}{group:>10}{scan:>12.1f}{indexed:>12.1f}")
+
+    print()
+    print("Такт исполнителя и получение значения, мкс")
+    print(f"{'правил':>10}{'перебор':>12}{'active':>12}{'плавно':>12}{'скачки':>12}")
+    for count in counts:
+        scan, active, drift, jumps = bench_target(make_rules(count))
+        print(f"{count:>10}{scan:>12.1f}{active:>12.1f}{drift:>12.1f}{jumps:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
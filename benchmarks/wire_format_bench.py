@@ -0,0 +1,69 @@
+"""
+Сравнение форматов обмена IoT-устройств: JSON и двоичного.
+
+Для типичных кадров показаний и ответа сервера измеряет размер кадра
+(полезная нагрузка, а также с учётом шифрования и заголовка длины)
+и время сериализации + десериализации одного кадра.
+
+Запуск: python benchmarks/wire_format_bench.py [число итераций]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from transport.wire_format import JSON_CODEC, BinaryCodec  # noqa: E402
+
+# Заголовок длины (4 байта) + тег и nonce AES-EAX (32 байта)
+FRAME_OVERHEAD = 4 + 32
+
+FRAMES = {
+    "показания (2 параметра)": {"state": 0, "temperature": 25, "humidity": 74},
+    "показания (1 параметр)": {"state": 1, "brightness": 63},
+    "ответ без команд": {"delay": 10, "commands": []},
+    "ответ с командой": {"delay": 30, "commands": ["start:5"]},
+}
+PARAMS = ["state", "temperature", "humidity", "brightness"]
+
+
+def measure(codec, data: dict, iterations: int) -> tuple[int, float]:
+    """
+    Измеряет размер кадра и среднее время кодирования и декодирования.
+
+    Args:
+        codec: Кодек формата обмена
+        data (dict): Сообщение
+        iterations (int): Число повторений
+
+    Returns:
+        tuple: (размер кадра в байтах, микросекунд на кадр)
+    """
+    payload = codec.encode(data)
+    assert codec.decode(payload) == data
+
+    encode = codec.encode
+    decode = codec.decode
+    started = time.perf_counter()
+    for _ in range(iterations):
+        decode(encode(data))
+    elapsed = time.perf_counter() - started
+    return len(payload), elapsed / iterations * 1e6
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    codecs = {"json": JSON_CODEC, "binary": BinaryCodec(PARAMS)}
+
+    print(f"{'кадр':<26}{'формат':<8}{'байт':>6}{'на проводе':>12}{'мкс/кадр':>10}")
+    for frame_name, data in FRAMES.items():
+        for codec_name, codec in codecs.items():
+            size, micros = measure(codec, data, iterations)
+            print(
+                f"{frame_name:<26}{codec_name:<8}{size:>6}"
+                f"{size + FRAME_OVERHEAD:>12}{micros:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
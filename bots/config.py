@@ -9,3 +9,24 @@ ERROR_PERCENT = 10
 
 ENCRYPTION_KEY = b"WahrheitUndLiebe"
 PASSWORD = "Tagiiiiil!!!"
+
+# Тип БД: "mysql" - сервер MariaDB, "sqlite" - встроенная БД SQLite в режиме WAL
+# (файлы в каталоге data/ в корне проекта) для установки всех компонентов на одном компьютере
+DB_BACKEND = "mysql"
+
+# Форматы обмена в порядке предпочтения. Сервер выбирает первый поддерживаемый
+WIRE_FORMATS = ("binary", "json")
+# Шифр сессии (AES-GCM с ключом подключения) вместо AES-EAX с общим ключом
+SESSION_CIPHER = True
+# Число замеров в одном кадре. Замеры равномерно распределяются по задержке сервера
+SAMPLES_PER_FRAME = 1
+# Принимать команды, которые сервер отправляет без запроса сразу при срабатывании правила
+PUSH_COMMANDS = True
+# Переподключаться по токену сессии одним кадром с показаниями вместо полного входа
+SESSION_RESUME = True
+
+# Журнал: уровень (DEBUG, INFO, WARNING, ERROR), формат ("text" или "json"),
+# запись каждого N-го сообщения об обмене кадрами
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "text"
+LOG_FRAME_SAMPLE = 1
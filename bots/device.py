@@ -1,22 +1,48 @@
+import os
+import sys
 import socket
-import json
-import datetime
 import random
-from time import sleep
+import select
+import logging
+from time import sleep, time
 from typing import Optional
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 from DBMS_worker import DBMS_worker
 from logic import get_uuid, set_uuid
-from encryption import encrypt, decrypt
+from encryption import encrypt, decrypt_bytes
+from transport.session import CIPHER_SESSION, new_session_nonce, session_from_response
+from transport.wire_format import (
+    JSON_CODEC,
+    codec_from_response,
+    BATCH_KEY,
+    TIMESTAMP_KEY,
+    PUSH_KEY,
+    RESUME_KEY,
+    RESUME_DATA_KEY,
+    RECONNECT_KEY,
+)
+from transport import FrameReader, send_frame
+from logutil import Logger
 from config import (
     RECONNECT_DELAY,
     SERVER_ADDR,
     SERVER_PORT,
     PASSWORD,
+    ENCRYPTION_KEY,
     SEND_STATE_DELAY,
-    ERROR_PERCENT
+    ERROR_PERCENT,
+    WIRE_FORMATS,
+    SESSION_CIPHER,
+    SAMPLES_PER_FRAME,
+    PUSH_COMMANDS,
+    SESSION_RESUME,
+    LOG_FRAME_SAMPLE,
 )
 
+logger = Logger("bots", LOG_FRAME_SAMPLE)
+
 
 class Device:
     def __init__(self, db_worker: DBMS_worker):
@@ -27,35 +53,59 @@ class Device:
             db_worker (DBMS_worker): Объект для работы с базой данных
         """
         self.sock = socket.socket()
+        self.frames = FrameReader(self.sock)
         self.uuid = get_uuid(self.uuid_filename)
         self.db_worker = db_worker
         self.state = 0
+        self.codec = JSON_CODEC
+        self.cipher = None
+        self.retry_after = None
+        self.max_samples = 1
+        self.push = False
+        self.session_token = None
+        self.session_expires = 0
+        self.reconnect_after = None
+
+    def log(self, level: int, message: str, **fields) -> None:
+        """
+        Записывает сообщение в журнал с UUID и именем устройства.
+
+        Args:
+            level (int): Уровень logging
+            message (str): Сообщение
+            **fields: Именованные поля записи
+        """
+        logger.log(level, message, uuid=self.uuid, device=self.IoT_name, **fields)
 
-    def print(self, *args, **kwargs) -> None:
+    def log_frame(self, message: str, **fields) -> None:
         """
-        Выводит форматированное сообщение с меткой времени и информацией об устройстве.
+        Выборочно записывает сообщение об обмене кадрами (каждое LOG_FRAME_SAMPLE-е).
+
+        Args:
+            message (str): Сообщение
+            **fields: Именованные поля записи
         """
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        print(f"({timestamp}) {self.uuid} [{self.IoT_name}]:", *args, **kwargs)
+        logger.sampled(message, uuid=self.uuid, device=self.IoT_name, **fields)
 
     def receive_data(self) -> Optional[dict]:
         """
-        Принимает и расшифровывает данные от сервера.
+        Принимает и расшифровывает данные от сервера в согласованном формате.
 
         Returns:
             dict | None: Расшифрованные данные в виде словаря или None при ошибке
         """
         try:
-            data_length = int.from_bytes(self.sock.recv(4), "big")
-            encrypted_data = self.sock.recv(data_length)
-            return json.loads(decrypt(encrypted_data))
-        except (ConnectionResetError, json.JSONDecodeError) as e:
-            self.print(f"Ошибка получения данных: {e}")
+            encrypted_data = self.frames.read_frame()
+            if self.cipher is not None:
+                return self.codec.decode(self.cipher.decrypt(encrypted_data))
+            return self.codec.decode(decrypt_bytes(encrypted_data))
+        except (ConnectionError, ValueError) as e:
+            self.log(logging.ERROR, "Ошибка получения данных", error=str(e))
             return None
 
     def send_data(self, data: dict) -> bool:
         """
-        Шифрует и отправляет данные на сервер.
+        Сериализует в согласованном формате, шифрует и отправляет данные на сервер.
 
         Args:
             data (dict): Данные для отправки в виде словаря
@@ -64,14 +114,78 @@ class Device:
             bool: True если данные успешно отправлены
         """
         try:
-            encrypted_data = encrypt(json.dumps(data))
-            self.sock.sendall(len(encrypted_data).to_bytes(4, "big"))
-            self.sock.sendall(encrypted_data)
+            payload = self.codec.encode(data)
+            if self.cipher is not None:
+                encrypted_data = self.cipher.encrypt(payload)
+            else:
+                encrypted_data = encrypt(payload)
+            send_frame(self.sock, encrypted_data)
             return True
         except (TypeError, BrokenPipeError) as e:
-            self.print(f"Ошибка отправки данных: {e}")
+            self.log(logging.ERROR, "Ошибка отправки данных", error=str(e))
             return False
 
+    def login_fields(self, client_nonce: bytes) -> dict:
+        """
+        Поля входа, общие для полного входа и возобновления сессии.
+
+        Args:
+            client_nonce (bytes): Случайное значение для шифра сессии
+
+        Returns:
+            dict: {'formats', 'params'} и, по настройкам, {'cipher', 'client_nonce', 'push'}
+        """
+        fields = {
+            "formats": list(WIRE_FORMATS),
+            "params": ["state", *self.indicators],
+        }
+        if SESSION_CIPHER:
+            fields["cipher"] = CIPHER_SESSION
+            fields["client_nonce"] = client_nonce.hex()
+        if PUSH_COMMANDS:
+            fields["push"] = True
+        return fields
+
+    def apply_login_response(self, response: dict, client_nonce: bytes) -> bool:
+        """
+        Применяет ответ сервера на вход: UUID, формат, шифр и токен сессии.
+
+        Args:
+            response (dict): Ответ сервера
+            client_nonce (bytes): Значение, отправленное устройством при входе
+
+        Returns:
+            bool: False если сервер занят (задержка сохраняется в self.retry_after)
+        """
+        if response.get("status") == "busy":
+            self.retry_after = response.get("retry_after", RECONNECT_DELAY)
+            self.log(logging.WARNING, "Сервер занят", retry_after=self.retry_after)
+            return False
+
+        if response.get("status") == "registered":
+            new_uuid = response.get("uuid")
+            if new_uuid and new_uuid != self.uuid:
+                self.uuid = new_uuid
+                set_uuid(self.uuid_filename, self.uuid)
+                self.log(logging.INFO, "Получен новый UUID")
+
+        self.codec = codec_from_response(response)
+        self.cipher = session_from_response(response, client_nonce, ENCRYPTION_KEY)
+        self.max_samples = response.get("max_samples", 1)
+        self.push = bool(response.get("push"))
+        self.session_token = response.get("session_token") if SESSION_RESUME else None
+        self.session_expires = time() + response.get("session_ttl", 0)
+        return True
+
+    def reset_session(self) -> None:
+        """
+        Возвращает параметры обмена к исходным перед входом.
+        """
+        self.codec = JSON_CODEC
+        self.cipher = None
+        self.retry_after = None
+        self.push = False
+
     def login(self) -> bool:
         """
         Выполняет процесс аутентификации на сервере.
@@ -79,34 +193,86 @@ class Device:
         Протокол аутентификации:
         1. Отправка пароля в формате {'password': str}
         2. Отправка метаданных устройства {'device_name': str, 'uuid': str}
-        3. Получение подтверждения или нового UUID
+           и поддерживаемых форматов обмена {'formats': list, 'params': list},
+           при SESSION_CIPHER - запроса шифра сессии {'cipher': 'session', 'client_nonce': hex},
+           при PUSH_COMMANDS - готовности принимать команды без запроса {'push': True}
+        3. Получение подтверждения или нового UUID, выбранного формата, шифра
+           и токена возобновления сессии.
+           Если сервер перегружен, он отвечает {'status': 'busy', 'retry_after': int},
+           задержка сохраняется в self.retry_after
 
         Returns:
             bool: True при успешной аутентификации
         """
         try:
+            self.reset_session()
             if not self.send_data({"password": PASSWORD}):
                 return False
 
-            device_info = {"device_name": self.IoT_name, "uuid": self.uuid}
+            client_nonce = new_session_nonce()
+            device_info = {
+                "device_name": self.IoT_name,
+                "uuid": self.uuid,
+                **self.login_fields(client_nonce),
+            }
             if not self.send_data(device_info):
                 return False
 
             response = self.receive_data()
             if not response:
                 return False
+            return self.apply_login_response(response, client_nonce)
+        except Exception as e:
+            self.log(logging.ERROR, "Ошибка аутентификации", error=str(e))
+            return False
 
-            if response.get("status") == "registered":
-                new_uuid = response.get("uuid")
-                if new_uuid and new_uuid != self.uuid:
-                    self.uuid = new_uuid
-                    set_uuid(self.uuid_filename, self.uuid)
-                    self.print(f"Получен новый UUID: {self.uuid}")
+    def resume(self) -> Optional[int]:
+        """
+        Возобновляет сессию по токену за один обмен кадрами: первый кадр
+        {'resume': токен, поля входа, 'data': показания} заменяет пароль
+        и метаданные, а ответ содержит и параметры сессии, и задержку с командами.
+        Если токен недействителен, выполняется полный вход в том же подключении.
 
-            return True
+        Returns:
+            int | None: Задержка до следующего кадра или None при ошибке
+        """
+        try:
+            self.reset_session()
+            client_nonce = new_session_nonce()
+            message = {
+                RESUME_KEY: self.session_token,
+                **self.login_fields(client_nonce),
+                RESUME_DATA_KEY: self.read_sensors(),
+            }
+            if not self.send_data(message):
+                return None
+
+            response = self.receive_data()
+            if not response:
+                return None
+            if response.get("status") == "expired":
+                self.session_token = None
+                self.log(logging.INFO, "Токен сессии недействителен, полный вход")
+                return 0 if self.login() else None
+            if not self.apply_login_response(response, client_nonce):
+                return None
+            self.log(logging.INFO, "Сессия возобновлена")
+            return self.process_server_response(response)
         except Exception as e:
-            self.print(f"Ошибка аутентификации: {e}")
-            return False
+            self.log(logging.ERROR, "Ошибка возобновления сессии", error=str(e))
+            return None
+
+    def open_session(self) -> Optional[int]:
+        """
+        Возобновляет сессию при действующем токене, иначе выполняет полный вход.
+
+        Returns:
+            int | None: Задержка до первого кадра рабочего цикла (0 - сразу)
+            или None при ошибке
+        """
+        if self.session_token and time() < self.session_expires:
+            return self.resume()
+        return 0 if self.login() else None
 
     def start(self) -> None:
         """
@@ -115,54 +281,162 @@ class Device:
         while True:
             try:
                 self.sock = socket.socket()
+                self.frames = FrameReader(self.sock)
                 self.sock.settimeout(10)
                 self.sock.connect((SERVER_ADDR, SERVER_PORT))
 
-                if not self.login():
+                delay = self.open_session()
+                if delay is None:
+                    self.sock.close()
+                    sleep(self.retry_after or RECONNECT_DELAY)
                     continue
 
-                self.work_loop()
+                self.work_loop(delay)
+                if self.reconnect_after:
+                    # Сервер останавливается: новое подключение примет другой процесс
+                    self.sock.close()
+                    sleep(self.reconnect_after)
+                    self.reconnect_after = None
 
             except (ConnectionRefusedError, TimeoutError):
-                self.print(f"Не удалось подключиться к {SERVER_ADDR}:{SERVER_PORT}")
+                self.log(
+                    logging.WARNING,
+                    "Не удалось подключиться",
+                    address=f"{SERVER_ADDR}:{SERVER_PORT}",
+                )
                 sleep(RECONNECT_DELAY)
             except Exception as e:
-                self.print(f"Критическая ошибка: {e}")
+                self.log(logging.ERROR, "Критическая ошибка", error=str(e))
                 sleep(RECONNECT_DELAY)
             finally:
                 self.sock.close()
 
-    def work_loop(self) -> None:
+    def read_sensors(self) -> dict:
+        """
+        Снимает показания всех датчиков устройства с учётом погрешности.
+
+        Returns:
+            dict: Словарь {'state': int, параметр: значение, ...}
+        """
+        sensor_data = {"state": self.state}
+        for indicator in self.indicators:
+            value = self.db_worker.get_value(self.sector, indicator)
+            if value != 0:
+                error = max(1, int(abs(value) * ERROR_PERCENT / 100))
+                noisy_value = value + random.randint(-error, error)
+            else:
+                noisy_value = 0  # Обработка нулевого значения
+            sensor_data[indicator] = noisy_value
+        return sensor_data
+
+    def work_loop(self, first_delay: int = 0) -> None:
         """
         Основной рабочий цикл после успешного подключения.
+
+        При SAMPLES_PER_FRAME > 1 (и поддержке сервером) замеры снимаются
+        равномерно в течение задержки сервера, копятся локально с метками
+        времени и отправляются одним кадром {'samples': list}.
+
+        Args:
+            first_delay (int, optional): Задержка перед первым замером - после
+                возобновления сессии первые показания уже отправлены
         """
+        samples_per_frame = max(1, min(SAMPLES_PER_FRAME, self.max_samples))
+        delay = first_delay or SEND_STATE_DELAY
+        samples = []
+        if first_delay and not self.wait(first_delay / samples_per_frame):
+            return
         while True:
             try:
-                sensor_data = {"state": self.state}
-                for indicator in self.indicators:
-                    value = self.db_worker.get_value(self.sector, indicator)
-                    if value != 0:
-                        error = max(1, int(abs(value) * ERROR_PERCENT / 100))
-                        noisy_value = value + random.randint(-error, error)
-                    else:
-                        noisy_value = 0  # Обработка нулевого значения
-                    sensor_data[indicator] = noisy_value
-
-                self.print(f"Отправка данных: {sensor_data}")
+                sensor_data = self.read_sensors()
+                if samples_per_frame > 1:
+                    samples.append({TIMESTAMP_KEY: time(), **sensor_data})
+                    if len(samples) < samples_per_frame:
+                        if not self.wait(delay / samples_per_frame):
+                            break
+                        continue
+                    sensor_data, samples = {BATCH_KEY: samples}, []
+
+                self.log_frame("Отправка данных", data=sensor_data)
                 if not self.send_data(sensor_data):
                     break
 
-                response = self.receive_data()
+                response = self.receive_response()
                 if not response:
                     break
 
-                self.process_server_response(response)
+                delay = self.process_server_response(response)
+                if response.get(RECONNECT_KEY):
+                    self.reconnect_after = response[RECONNECT_KEY]
+                    self.log(logging.INFO, "Сервер останавливается", reconnect=self.reconnect_after)
+                    break
+                if not self.wait(delay / samples_per_frame):
+                    break
 
             except socket.timeout:
-                self.print("Таймаут соединения, переподключение...")
+                self.log(logging.WARNING, "Таймаут соединения, переподключение")
                 break
 
-    def process_server_response(self, response: dict) -> None:
+    def receive_response(self) -> Optional[dict]:
+        """
+        Принимает ответ на отправленный кадр. Команды, которые сервер
+        отправил без запроса раньше ответа, выполняются по пути.
+
+        Returns:
+            dict | None: Ответ сервера или None при ошибке
+        """
+        while True:
+            message = self.receive_data()
+            if not message or not message.get(PUSH_KEY):
+                return message
+            self.process_pushed_commands(message)
+
+    def wait(self, seconds: float) -> bool:
+        """
+        Ожидает до следующего замера. Если сервер отправляет команды
+        без запроса, во время ожидания они принимаются и выполняются сразу.
+
+        Args:
+            seconds (float): Время ожидания в секундах
+
+        Returns:
+            bool: False если соединение разорвано или сервер предложил
+            переподключиться (задержка сохраняется в self.reconnect_after)
+        """
+        if not self.push:
+            sleep(seconds)
+            return True
+
+        deadline = time() + seconds
+        while (remaining := deadline - time()) > 0:
+            readable, _, _ = select.select([self.sock], [], [], remaining)
+            if not readable:
+                continue
+            message = self.receive_data()
+            if not message:
+                return False
+            if message.get(PUSH_KEY):
+                self.process_pushed_commands(message)
+                if message.get(RECONNECT_KEY):
+                    self.reconnect_after = message[RECONNECT_KEY]
+                    self.log(logging.INFO, "Сервер останавливается", reconnect=self.reconnect_after)
+                    return False
+            else:
+                self.log(logging.WARNING, "Неожиданный кадр сервера", message=message)
+        return True
+
+    def process_pushed_commands(self, message: dict) -> None:
+        """
+        Выполняет команды, отправленные сервером без запроса.
+
+        Args:
+            message (dict): Кадр {'push': True, 'commands': list[str]}
+        """
+        self.log_frame("Получены команды", commands=message.get("commands"))
+        for command in message.get("commands", []):
+            self.execute_command(command)
+
+    def process_server_response(self, response: dict) -> int:
         """
         Обрабатывает ответ от сервера с командами.
 
@@ -172,8 +446,11 @@ class Device:
                     'delay': int,
                     'commands': list[str]
                 }
+
+        Returns:
+            int: Задержка до следующего кадра в секундах
         """
-        self.print(f"Получен ответ: {response}")
+        self.log_frame("Получен ответ", response=response)
 
         delay = response.get("delay", SEND_STATE_DELAY)
         commands = response.get("commands", [])
@@ -181,7 +458,7 @@ class Device:
         if commands:
             for command in commands:
                 self.execute_command(command)
-        sleep(delay)
+        return delay
 
     def execute_command(self, command: str) -> None:
         """
@@ -192,13 +469,13 @@ class Device:
         """
         try:
             cmd, param = command.split(":")
-            self.print(f"Выполнение команды: {cmd} с параметром {param}")
+            self.log(logging.INFO, "Выполнение команды", command=cmd, param=param)
 
             if cmd.lower() == "start" and self.to_change:
                 self.process_control_command(cmd, param)
 
         except ValueError as e:
-            self.print(f"Ошибка разбора команды: {e}")
+            self.log(logging.ERROR, "Ошибка разбора команды", error=str(e))
 
     def process_control_command(self, cmd: str, param: str) -> None:
         """
@@ -216,9 +493,11 @@ class Device:
                 if self.db_worker.change_value(
                     self.sector, self.to_change, 1 if value > 0 else -1
                 ):
-                    self.print(f"Успешное изменение параметра ({i+1}/{value})")
+                    self.log(
+                        logging.INFO, "Успешное изменение параметра", step=f"{i + 1}/{value}"
+                    )
                 sleep(1)
 
             self.state = 0
         except ValueError as e:
-            self.print(f"Некорректный параметр команды: {e}")
+            self.log(logging.ERROR, "Некорректный параметр команды", error=str(e))
@@ -4,6 +4,8 @@ from random import random
 
 import IoT_devices
 from DBMS_worker import DBMS_worker
+from logutil import setup_logging
+from config import LOG_LEVEL, LOG_FORMAT, DB_BACKEND
 
 
 def main() -> None:
@@ -25,11 +27,13 @@ def main() -> None:
     - Для работы требуется запущенный MySQL сервер с указанными учетными данными
     - Все устройства должны быть определены в модуле IoT_devices
     """
+    setup_logging(LOG_LEVEL, LOG_FORMAT)
+
     host = "localhost"
     user = "root"
     password = "123"
     db_name = "GreenHouseIoT"
-    db_worker = DBMS_worker(host, user, password, db_name)
+    db_worker = DBMS_worker(host, user, password, db_name, DB_BACKEND)
 
     device_list = [
         IoT_devices.TermometerAndHumiditySensor1(db_worker),
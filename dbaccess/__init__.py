@@ -0,0 +1,47 @@
+from .database import Database, Connection, ExecResult
+from .sqlite import SqliteDatabase, SqliteConnection
+
+BACKENDS = ("mysql", "sqlite")
+
+
+def open_database(
+    backend: str,
+    host: str,
+    user: str,
+    password: str,
+    db_name: str,
+    pool_size: int = 20,
+    prepared_cache_size: int = 64,
+) -> Database:
+    """
+    Открывает БД выбранного типа.
+
+    Args:
+        backend (str): "mysql" - сервер MariaDB/MySQL, "sqlite" - встроенная
+            БД SQLite (host, user и password не используются)
+        host (str): Хост MySQL сервера
+        user (str): Имя пользователя
+        password (str): Пароль пользователя
+        db_name (str): Название базы данных
+        pool_size (int, optional): Наибольшее число соединений
+        prepared_cache_size (int, optional): Подготовленных запросов на соединение
+
+    Returns:
+        Database: Database или SqliteDatabase
+    """
+    if backend == "mysql":
+        return Database(host, user, password, db_name, pool_size, prepared_cache_size)
+    if backend == "sqlite":
+        return SqliteDatabase(db_name, pool_size, prepared_cache_size)
+    raise ValueError(f"Неизвестный тип БД: {backend}")
+
+
+__all__ = [
+    "Database",
+    "Connection",
+    "ExecResult",
+    "SqliteDatabase",
+    "SqliteConnection",
+    "BACKENDS",
+    "open_database",
+]
@@ -0,0 +1,429 @@
+import time
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import mysql.connector
+from mysql.connector import errorcode, errors
+
+# Ошибки потери соединения, после которых запрос повторяется на новом соединении
+CONNECTION_LOST_ERRORS = {
+    errorcode.CR_SERVER_GONE_ERROR,
+    errorcode.CR_SERVER_LOST,
+    errorcode.CR_SERVER_LOST_EXTENDED,
+}
+
+
+class ExecResult(NamedTuple):
+    """
+    Результат INSERT/UPDATE/DELETE.
+
+    Attributes:
+        rowcount (int): Число затронутых строк
+        lastrowid (int | None): ID последней вставленной строки
+    """
+
+    rowcount: int
+    lastrowid: int | None
+
+
+class Connection:
+    dialect = "mysql"
+
+    def __init__(self, cnx, prepared_cache_size: int):
+        """
+        Соединение пула с кэшем подготовленных на сервере запросов.
+
+        Подготовленный запрос (COM_STMT_PREPARE) разбирается сервером один раз,
+        дальше передаются только параметры в двоичном виде. Курсоры подготовленных
+        запросов хранятся по тексту запроса, самые давние закрываются при
+        превышении prepared_cache_size.
+
+        Args:
+            cnx: Соединение mysql.connector
+            prepared_cache_size (int): Наибольшее число подготовленных запросов
+
+        Attributes:
+            prepared (OrderedDict): {текст запроса: (текст, курсор)} в порядке использования
+            hits (int): Выполнения уже подготовленных запросов
+            misses (int): Подготовки новых запросов
+        """
+        self.cnx = cnx
+        self.prepared_cache_size = prepared_cache_size
+        self.prepared = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _prepared_cursor(self, sql: str):
+        entry = self.prepared.get(sql)
+        if entry is not None:
+            self.prepared.move_to_end(sql)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        # Курсор переподготавливает запрос, если текст - другой объект str,
+        # поэтому вместе с курсором хранится сам текст из кэша
+        entry = (sql, self.cnx.cursor(prepared=True))
+        self.prepared[sql] = entry
+        while len(self.prepared) > self.prepared_cache_size:
+            _, (_, cursor) = self.prepared.popitem(last=False)
+            cursor.close()
+        return entry
+
+    def _run(self, sql: str, params, prepared: bool):
+        if prepared and self.prepared_cache_size:
+            sql, cursor = self._prepared_cursor(sql)
+            cursor.execute(sql, params or ())
+            return cursor, False
+        cursor = self.cnx.cursor(buffered=True)
+        cursor.execute(sql, params)
+        return cursor, True
+
+    def query(self, sql: str, params: tuple = None, prepared: bool = True) -> list[tuple]:
+        """
+        Выполняет SELECT.
+
+        Args:
+            sql (str): Запрос с параметрами %s
+            params (tuple, optional): Параметры запроса
+            prepared (bool, optional): Подготовить запрос на сервере. Отключается
+                для запросов с переменным текстом (списки IN, многострочный VALUES)
+
+        Returns:
+            list[tuple]: Строки результата
+        """
+        cursor, owned = self._run(sql, params, prepared)
+        try:
+            return cursor.fetchall()
+        finally:
+            if owned:
+                cursor.close()
+
+    def query_one(self, sql: str, params: tuple = None, prepared: bool = True) -> tuple | None:
+        """
+        Returns:
+            tuple | None: Первая строка результата или None
+        """
+        rows = self.query(sql, params, prepared)
+        return rows[0] if rows else None
+
+    def query_dicts(self, sql: str, params: tuple = None, prepared: bool = True) -> list[dict]:
+        """
+        Returns:
+            list[dict]: Строки результата в виде {столбец: значение}
+        """
+        cursor, owned = self._run(sql, params, prepared)
+        try:
+            columns = cursor.column_names
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            if owned:
+                cursor.close()
+
+    def execute(self, sql: str, params: tuple = None, prepared: bool = True) -> ExecResult:
+        """
+        Выполняет INSERT/UPDATE/DELETE или DDL (DDL - с prepared=False).
+
+        Returns:
+            ExecResult: Число затронутых строк и ID вставленной строки
+        """
+        cursor, owned = self._run(sql, params, prepared)
+        try:
+            if cursor.with_rows:
+                cursor.fetchall()
+            return ExecResult(cursor.rowcount, cursor.lastrowid)
+        finally:
+            if owned:
+                cursor.close()
+
+    def executemany(self, sql: str, seq_params: list[tuple]) -> ExecResult:
+        """
+        Выполняет запрос для каждого набора параметров. Многострочные INSERT
+        mysql.connector отправляет одним запросом.
+
+        Returns:
+            ExecResult: Суммарное число затронутых строк
+        """
+        with self.cnx.cursor() as cursor:
+            cursor.executemany(sql, seq_params)
+            return ExecResult(cursor.rowcount, cursor.lastrowid)
+
+    def cursor(self, **kwargs):
+        """
+        Обычный курсор соединения для многошаговых операций.
+        """
+        return self.cnx.cursor(**kwargs)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Выполняет запросы блока в одной транзакции: при исключении
+        все изменения блока откатываются.
+        """
+        self.cnx.start_transaction()
+        try:
+            yield self
+            self.cnx.commit()
+        except BaseException:
+            self.cnx.rollback()
+            raise
+
+    def commit(self) -> None:
+        self.cnx.commit()
+
+    def close(self) -> None:
+        for _, cursor in self.prepared.values():
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+        self.prepared.clear()
+        self.cnx.close()
+
+
+class Database:
+    dialect = "mysql"
+
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        password: str,
+        db_name: str,
+        pool_size: int = 20,
+        prepared_cache_size: int = 64,
+        acquire_timeout: float = 30,
+    ):
+        """
+        Общий доступ к БД для всех компонентов системы.
+
+        Каждый вызов берёт соединение из пула и возвращает его после запроса,
+        поэтому объект можно использовать из любого числа потоков. Соединения
+        открываются по мере необходимости, не больше pool_size; при занятом
+        пуле вызов ждёт освобождения соединения (время ожидания учитывается
+        в stats и передаётся в wait_observer). Запросы с постоянным текстом
+        подготавливаются на сервере и кэшируются в каждом соединении.
+
+        При создании база данных создаётся, если её нет.
+
+        Args:
+            host (str): Хост MySQL сервера
+            user (str): Имя пользователя
+            password (str): Пароль пользователя
+            db_name (str): Название базы данных
+            pool_size (int, optional): Наибольшее число соединений
+            prepared_cache_size (int, optional): Подготовленных запросов на соединение,
+                0 - не подготавливать запросы
+            acquire_timeout (float, optional): Наибольшее ожидание соединения в секундах
+
+        Attributes:
+            created_database (bool): База данных была создана этим объектом
+            wait_observer (callable | None): Функция (секунды ожидания соединения)
+        """
+        self.connect_args = {
+            "host": host,
+            "user": user,
+            "password": password,
+            "autocommit": True,
+        }
+        self.db_name = db_name
+        self.pool_size = pool_size
+        self.prepared_cache_size = prepared_cache_size
+        self.acquire_timeout = acquire_timeout
+        self.wait_observer = None
+
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(pool_size)
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.acquired = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.reconnects = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.created_database = self._create_database()
+
+    def _create_database(self) -> bool:
+        cnx = mysql.connector.connect(**self.connect_args)
+        try:
+            with cnx.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM information_schema.SCHEMATA WHERE SCHEMA_NAME = %s",
+                    (self.db_name,),
+                )
+                if cursor.fetchall():
+                    return False
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name}")
+                return True
+        finally:
+            cnx.close()
+
+    def _open(self) -> Connection:
+        cnx = mysql.connector.connect(**self.connect_args, database=self.db_name)
+        with self.lock:
+            self.opened += 1
+        return Connection(cnx, self.prepared_cache_size)
+
+    def _discard(self, conn: Connection) -> None:
+        with self.lock:
+            self.opened -= 1
+            self.hits += conn.hits
+            self.misses += conn.misses
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def acquire(self) -> Connection:
+        """
+        Берёт соединение из пула, при необходимости ожидая освобождения.
+
+        Raises:
+            mysql.connector.errors.PoolError: Соединение не освободилось
+                за acquire_timeout секунд
+        """
+        started = time.perf_counter()
+        if not self.slots.acquire(timeout=self.acquire_timeout):
+            raise errors.PoolError("Нет свободных соединений с БД")
+        waited = time.perf_counter() - started
+        with self.lock:
+            self.acquired += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if waited > 0.001:
+                self.waited += 1
+        if self.wait_observer is not None:
+            self.wait_observer(waited)
+
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._open()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, conn: Connection, broken: bool = False) -> None:
+        """
+        Возвращает соединение в пул. Разорванное соединение закрывается.
+        """
+        if broken:
+            self._discard(conn)
+        else:
+            self.idle.put(conn)
+        self.slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Соединение на несколько запросов (транзакция, GET_LOCK сессии,
+        многошаговая запись).
+
+        Yields:
+            Connection: Соединение пула
+        """
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (errors.OperationalError, errors.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def _call(self, method: str, *args):
+        for attempt in range(2):
+            conn = self.acquire()
+            try:
+                result = getattr(conn, method)(*args)
+            except (errors.OperationalError, errors.InterfaceError) as e:
+                self.release(conn, broken=True)
+                if attempt or e.errno not in CONNECTION_LOST_ERRORS:
+                    raise
+                # После перезапуска сервера БД разорваны и остальные свободные соединения
+                self.close()
+                with self.lock:
+                    self.reconnects += 1
+                continue
+            except Exception:
+                self.release(conn)
+                raise
+            self.release(conn)
+            return result
+
+    def query(self, sql: str, params: tuple = None, prepared: bool = True) -> list[tuple]:
+        """
+        Выполняет SELECT на соединении из пула (см. Connection.query).
+        При потере соединения запрос повторяется один раз на новом.
+        """
+        return self._call("query", sql, params, prepared)
+
+    def query_one(self, sql: str, params: tuple = None, prepared: bool = True) -> tuple | None:
+        """
+        Returns:
+            tuple | None: Первая строка результата или None
+        """
+        return self._call("query_one", sql, params, prepared)
+
+    def query_dicts(self, sql: str, params: tuple = None, prepared: bool = True) -> list[dict]:
+        """
+        Returns:
+            list[dict]: Строки результата в виде {столбец: значение}
+        """
+        return self._call("query_dicts", sql, params, prepared)
+
+    def execute(self, sql: str, params: tuple = None, prepared: bool = True) -> ExecResult:
+        """
+        Выполняет INSERT/UPDATE/DELETE на соединении из пула (см. Connection.execute).
+        """
+        return self._call("execute", sql, params, prepared)
+
+    def executemany(self, sql: str, seq_params: list[tuple]) -> ExecResult:
+        """
+        Выполняет запрос для каждого набора параметров на одном соединении.
+        """
+        return self._call("executemany", sql, seq_params)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Состояние пула: открытые, занятые и свободные соединения,
+            число выдач и ожиданий, время ожидания (сумма и максимум, с),
+            переподключения, попадания и промахи кэша подготовленных запросов
+        """
+        idle = list(self.idle.queue)
+        with self.lock:
+            return {
+                "pool_size": self.pool_size,
+                "opened": self.opened,
+                "in_use": self.opened - len(idle),
+                "idle": len(idle),
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "wait_total": round(self.wait_total, 6),
+                "wait_max": round(self.wait_max, 6),
+                "reconnects": self.reconnects,
+                "prepared": sum(len(conn.prepared) for conn in idle),
+                "prepared_hits": self.hits + sum(conn.hits for conn in idle),
+                "prepared_misses": self.misses + sum(conn.misses for conn in idle),
+            }
+
+    def close(self) -> None:
+        """
+        Закрывает свободные соединения пула.
+        """
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
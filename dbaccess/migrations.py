@@ -0,0 +1,764 @@
+import sys
+import argparse
+
+import mysql.connector
+from mysql.connector import errorcode
+
+from . import BACKENDS, open_database
+
+# Секция data_history для строк новее последней границы. Остаётся пустой,
+# пока перед ней создаются секции на HISTORY_PARTITIONS_AHEAD периодов вперёд
+HISTORY_FUTURE_PARTITION = "p_future"
+
+# Агрегаты истории: {разрешение: (таблица, поля datetime, обнуляемые в начале
+# интервала, формат DATE_FORMAT начала интервала)}
+ROLLUPS = {
+    "minute": ("history_minute", {"second": 0, "microsecond": 0}, "%Y-%m-%d %H:%i:00"),
+    "hour": ("history_hour", {"minute": 0, "second": 0, "microsecond": 0}, "%Y-%m-%d %H:00:00"),
+    "day": (
+        "history_day",
+        {"hour": 0, "minute": 0, "second": 0, "microsecond": 0},
+        "%Y-%m-%d 00:00:00",
+    ),
+}
+
+MIGRATIONS_LOCK = "schema_migrations"
+MIGRATIONS_LOCK_TIMEOUT = 60
+
+
+def create_base_schema(cursor) -> None:
+    """
+    Таблицы sectors, devices, actual_data, data_history, rules, users,
+    rules_version и триггеры истории и версии правил.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sectors (
+            sector_id INTEGER NOT NULL AUTO_INCREMENT,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            PRIMARY KEY (sector_id)
+        );
+        """
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS devices (
+            device_id INTEGER NOT NULL AUTO_INCREMENT,
+            device_uuid CHAR(36) UNIQUE,
+            device_name VARCHAR(255),
+            sector_id INTEGER DEFAULT NULL,
+            device_last_communication DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (device_id),
+            FOREIGN KEY (sector_id) REFERENCES sectors(sector_id) ON DELETE SET NULL
+        );
+    """
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS actual_data (
+            data_id INTEGER NOT NULL AUTO_INCREMENT,
+            data_device_id INTEGER,
+            data_name VARCHAR(255),
+            data_value INTEGER,
+            data_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (data_id),
+            UNIQUE KEY device_param (data_device_id, data_name),
+            FOREIGN KEY (data_device_id)
+            REFERENCES devices(device_id)
+            ON DELETE CASCADE
+        );
+    """
+    )
+
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS data_history (
+            data_id BIGINT NOT NULL AUTO_INCREMENT,
+            data_device_id INTEGER,
+            data_name VARCHAR(255),
+            data_value INTEGER,
+            data_timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (data_id, data_timestamp),
+            KEY device_time (data_device_id, data_timestamp)
+        )
+        PARTITION BY RANGE COLUMNS (data_timestamp) (
+            PARTITION {HISTORY_FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)
+        );
+    """
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rules (
+            rule_id INTEGER NOT NULL AUTO_INCREMENT,
+            rule_data_id INTEGER,
+            rule_condition INTEGER,
+            rule_value INTEGER,
+            rule_device_id INTEGER,
+            rule_message VARCHAR(255),
+            is_active BOOLEAN DEFAULT TRUE,
+            PRIMARY KEY (rule_id),
+            FOREIGN KEY (rule_data_id)
+            REFERENCES actual_data(data_id)
+            ON DELETE CASCADE,
+            FOREIGN KEY (rule_device_id)
+            REFERENCES devices(device_id)
+            ON DELETE CASCADE
+        );
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER NOT NULL AUTO_INCREMENT,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        password_hash VARCHAR(255) NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id)
+    );
+    """
+    )
+
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS after_actual_data_insert
+        AFTER INSERT ON actual_data
+        FOR EACH ROW
+        INSERT INTO data_history (
+            data_device_id,
+            data_name,
+            data_value,
+            data_timestamp
+        )
+        VALUES (
+            NEW.data_device_id,
+            NEW.data_name,
+            NEW.data_value,
+            NEW.data_timestamp
+        );
+    """
+    )
+
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS after_actual_data_update
+        AFTER UPDATE ON actual_data
+        FOR EACH ROW
+        BEGIN
+            INSERT INTO data_history (
+                data_device_id,
+                data_name,
+                data_value,
+                data_timestamp
+            )
+            VALUES (
+                NEW.data_device_id,
+                NEW.data_name,
+                NEW.data_value,
+                NEW.data_timestamp
+            );
+        END;
+    """
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rules_version (
+            version_id TINYINT NOT NULL,
+            version BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (version_id)
+        );
+    """
+    )
+
+    cursor.execute(
+        "INSERT IGNORE INTO rules_version (version_id, version) VALUES (1, 0)"
+    )
+
+    for trigger_name, event in (
+        ("after_rules_insert", "AFTER INSERT ON rules"),
+        ("after_rules_update", "AFTER UPDATE ON rules"),
+        ("after_rules_delete", "AFTER DELETE ON rules"),
+        # Каскадное удаление правил не вызывает триггеры таблицы rules
+        ("before_devices_delete", "BEFORE DELETE ON devices"),
+    ):
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {trigger_name}
+            {event}
+            FOR EACH ROW
+            UPDATE rules_version SET version = version + 1 WHERE version_id = 1;
+        """
+        )
+
+
+def partition_history(cursor) -> None:
+    """
+    Переводит data_history, созданную до секционирования, на секции
+    по data_timestamp: все строки попадают в секцию p_future, которую затем
+    делит обслуживание секций IoT-сервера. Внешний ключ на devices снимается -
+    у секционированной таблицы их быть не может.
+    """
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'data_history'
+        """
+    )
+    rows = cursor.fetchall()
+    if not rows or rows[0][0] is not None:
+        return
+
+    cursor.execute(
+        """
+        SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'data_history'
+        """
+    )
+    for (constraint_name,) in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE data_history DROP FOREIGN KEY {constraint_name}")
+    cursor.execute(
+        f"""
+        ALTER TABLE data_history
+            MODIFY data_id BIGINT NOT NULL AUTO_INCREMENT,
+            MODIFY data_timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (data_id, data_timestamp),
+            ADD KEY device_time (data_device_id, data_timestamp)
+        PARTITION BY RANGE COLUMNS (data_timestamp) (
+            PARTITION {HISTORY_FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)
+        )
+        """
+    )
+
+
+def create_rollups(cursor) -> None:
+    """
+    Таблицы агрегатов истории, их заполнение по накопленной data_history
+    и триггер удаления истории и агрегатов вместе с устройством.
+    """
+    for table, _, bucket_format in ROLLUPS.values():
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                data_device_id INTEGER NOT NULL,
+                data_name VARCHAR(255) NOT NULL,
+                bucket DATETIME NOT NULL,
+                value_min INTEGER NOT NULL,
+                value_max INTEGER NOT NULL,
+                value_sum BIGINT NOT NULL,
+                value_count INTEGER NOT NULL,
+                PRIMARY KEY (data_name, bucket, data_device_id),
+                KEY device_bucket (data_device_id, bucket)
+            );
+        """
+        )
+        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+        if cursor.fetchall():
+            continue
+        cursor.execute(
+            f"""
+            INSERT INTO {table}
+                (data_device_id, data_name, bucket,
+                 value_min, value_max, value_sum, value_count)
+            SELECT
+                data_device_id, data_name,
+                DATE_FORMAT(data_timestamp, '{bucket_format}') AS bucket,
+                MIN(data_value), MAX(data_value), SUM(data_value), COUNT(*)
+            FROM data_history
+            WHERE data_device_id IS NOT NULL
+                AND data_name IS NOT NULL
+                AND data_value IS NOT NULL
+            GROUP BY data_device_id, data_name, bucket
+            """
+        )
+
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS after_devices_delete
+        AFTER DELETE ON devices
+        FOR EACH ROW
+        BEGIN
+            DELETE FROM data_history WHERE data_device_id = OLD.device_id;
+            DELETE FROM history_minute WHERE data_device_id = OLD.device_id;
+            DELETE FROM history_hour WHERE data_device_id = OLD.device_id;
+            DELETE FROM history_day WHERE data_device_id = OLD.device_id;
+        END;
+    """
+    )
+
+
+def record_history_before_insert(cursor) -> None:
+    """
+    Замена триггеров истории after_actual_data_insert/update одним триггером
+    BEFORE INSERT. Замер старше текущего значения (из пакета с метками
+    времени устройства) не заменяет строку actual_data, и триггер обновления
+    записал бы в историю прежнее значение. BEFORE INSERT срабатывает для каждой
+    строки INSERT ... ON DUPLICATE KEY UPDATE до проверки ключа, поэтому
+    каждый замер попадает в data_history ровно один раз.
+    """
+    cursor.execute("DROP TRIGGER IF EXISTS after_actual_data_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS after_actual_data_update")
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS before_actual_data_insert
+        BEFORE INSERT ON actual_data
+        FOR EACH ROW
+        INSERT INTO data_history (
+            data_device_id,
+            data_name,
+            data_value,
+            data_timestamp
+        )
+        VALUES (
+            NEW.data_device_id,
+            NEW.data_name,
+            NEW.data_value,
+            NEW.data_timestamp
+        );
+    """
+    )
+
+
+def create_query_indexes(cursor) -> None:
+    """
+    Вторичные индексы под фильтры запросов (см. INDEX_CHECKS):
+    - data_history(data_name, data_timestamp) - /history без агрегатов
+    - devices(sector_id, device_id) - устройства сектора
+    - rules(rule_device_id, is_active) - правила устройства-исполнителя
+
+    Индексы devices и rules заменяют неявные индексы внешних ключей
+    по тем же первым столбцам. Индексы строятся без блокировки записи.
+    """
+    for table, index, columns in (
+        ("data_history", "name_time", "data_name, data_timestamp"),
+        ("devices", "sector_devices", "sector_id, device_id"),
+        ("rules", "target_active", "rule_device_id, is_active"),
+    ):
+        cursor.execute(
+            f"""
+            ALTER TABLE {table}
+            ADD INDEX IF NOT EXISTS {index} ({columns}),
+            ALGORITHM = INPLACE, LOCK = NONE
+            """
+        )
+
+
+# Миграции схемы по возрастанию версии: (версия, описание, функция(cursor)).
+# Функции повторяемы (IF NOT EXISTS и проверки состояния): DDL в MySQL
+# не откатывается, и прерванная миграция выполняется заново целиком
+MIGRATIONS = [
+    (1, "Базовая схема", create_base_schema),
+    (2, "Секционирование data_history", partition_history),
+    (3, "Агрегаты истории", create_rollups),
+    (4, "Индексы под запросы", create_query_indexes),
+    (5, "История замеров триггером BEFORE INSERT", record_history_before_insert),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Схема встроенной БД SQLite, соответствующая версии LATEST_VERSION: те же
+# таблицы, столбцы, индексы и триггеры без секционирования data_history
+# (устаревшая история удаляется построчно). Новая миграция MySQL дополняется
+# изменением этой схемы, запросы которого повторяемы (IF NOT EXISTS)
+SQLITE_TABLES = """
+CREATE TABLE IF NOT EXISTS sectors (
+    sector_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL,
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS devices (
+    device_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device_uuid CHAR(36),
+    device_name VARCHAR(255),
+    sector_id INTEGER DEFAULT NULL REFERENCES sectors(sector_id) ON DELETE SET NULL,
+    device_last_communication DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE UNIQUE INDEX IF NOT EXISTS device_uuid ON devices (device_uuid);
+CREATE INDEX IF NOT EXISTS sector_devices ON devices (sector_id, device_id);
+
+CREATE TABLE IF NOT EXISTS actual_data (
+    data_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data_device_id INTEGER REFERENCES devices(device_id) ON DELETE CASCADE,
+    data_name VARCHAR(255),
+    data_value INTEGER,
+    data_timestamp DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE UNIQUE INDEX IF NOT EXISTS device_param ON actual_data (data_device_id, data_name);
+
+CREATE TABLE IF NOT EXISTS data_history (
+    data_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data_device_id INTEGER,
+    data_name VARCHAR(255),
+    data_value INTEGER,
+    data_timestamp DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS device_time ON data_history (data_device_id, data_timestamp);
+CREATE INDEX IF NOT EXISTS name_time ON data_history (data_name, data_timestamp);
+
+CREATE TABLE IF NOT EXISTS rules (
+    rule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rule_data_id INTEGER REFERENCES actual_data(data_id) ON DELETE CASCADE,
+    rule_condition INTEGER,
+    rule_value INTEGER,
+    rule_device_id INTEGER REFERENCES devices(device_id) ON DELETE CASCADE,
+    rule_message VARCHAR(255),
+    is_active BOOLEAN DEFAULT TRUE
+);
+CREATE INDEX IF NOT EXISTS target_active ON rules (rule_device_id, is_active);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS rules_version (
+    version_id INTEGER NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO rules_version (version_id, version) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER NOT NULL PRIMARY KEY,
+    description VARCHAR(255),
+    applied_at DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+"""
+
+SQLITE_ROLLUP_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    data_device_id INTEGER NOT NULL,
+    data_name VARCHAR(255) NOT NULL,
+    bucket DATETIME NOT NULL,
+    value_min INTEGER NOT NULL,
+    value_max INTEGER NOT NULL,
+    value_sum BIGINT NOT NULL,
+    value_count INTEGER NOT NULL,
+    PRIMARY KEY (data_name, bucket, data_device_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {table}_device_bucket ON {table} (data_device_id, bucket);
+"""
+
+SQLITE_TRIGGERS = """
+DROP TRIGGER IF EXISTS after_actual_data_insert;
+DROP TRIGGER IF EXISTS after_actual_data_update;
+
+CREATE TRIGGER IF NOT EXISTS before_actual_data_insert
+BEFORE INSERT ON actual_data
+FOR EACH ROW
+BEGIN
+    INSERT INTO data_history (data_device_id, data_name, data_value, data_timestamp)
+    VALUES (NEW.data_device_id, NEW.data_name, NEW.data_value, NEW.data_timestamp);
+END;
+
+CREATE TRIGGER IF NOT EXISTS after_rules_insert
+AFTER INSERT ON rules
+FOR EACH ROW
+BEGIN
+    UPDATE rules_version SET version = version + 1 WHERE version_id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS after_rules_update
+AFTER UPDATE ON rules
+FOR EACH ROW
+BEGIN
+    UPDATE rules_version SET version = version + 1 WHERE version_id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS after_rules_delete
+AFTER DELETE ON rules
+FOR EACH ROW
+BEGIN
+    UPDATE rules_version SET version = version + 1 WHERE version_id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS before_devices_delete
+BEFORE DELETE ON devices
+FOR EACH ROW
+BEGIN
+    UPDATE rules_version SET version = version + 1 WHERE version_id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS after_devices_delete
+AFTER DELETE ON devices
+FOR EACH ROW
+BEGIN
+    DELETE FROM data_history WHERE data_device_id = OLD.device_id;
+    DELETE FROM history_minute WHERE data_device_id = OLD.device_id;
+    DELETE FROM history_hour WHERE data_device_id = OLD.device_id;
+    DELETE FROM history_day WHERE data_device_id = OLD.device_id;
+END;
+"""
+
+
+def sqlite_schema() -> str:
+    """
+    Returns:
+        str: Скрипт схемы SQLite в одной транзакции BEGIN IMMEDIATE
+        с записью всех версий MIGRATIONS в schema_version
+    """
+    return "\n".join(
+        [
+            "BEGIN IMMEDIATE;",
+            SQLITE_TABLES,
+            *(SQLITE_ROLLUP_TABLE.format(table=table) for table, _, _ in ROLLUPS.values()),
+            SQLITE_TRIGGERS,
+            *(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                f"VALUES ({version}, '{description}');"
+                for version, description, _ in MIGRATIONS
+            ),
+            "COMMIT;",
+        ]
+    )
+
+
+# Проверки индексов через EXPLAIN: (описание, запрос, параметры, таблица или
+# псевдоним в плане, индекс, который должен быть доступен оптимизатору)
+INDEX_CHECKS = [
+    (
+        "Поиск устройства по UUID",
+        "SELECT device_id FROM devices WHERE device_uuid = %s",
+        ("00000000-0000-0000-0000-000000000000",),
+        "devices",
+        "device_uuid",
+    ),
+    (
+        "Устройства сектора",
+        "SELECT device_id FROM devices WHERE sector_id = %s",
+        (1,),
+        "devices",
+        "sector_devices",
+    ),
+    (
+        "Актуальные показания устройства",
+        "SELECT data_name, data_value FROM actual_data WHERE data_device_id = %s",
+        (1,),
+        "actual_data",
+        "device_param",
+    ),
+    (
+        "Правила устройства-исполнителя",
+        """
+        SELECT r.rule_id FROM rules r
+        WHERE r.rule_device_id = %s AND r.is_active = TRUE
+        """,
+        (1,),
+        "r",
+        "target_active",
+    ),
+    (
+        "История параметра за период",
+        """
+        SELECT dh.data_value FROM data_history dh
+        WHERE dh.data_name = %s AND dh.data_timestamp >= NOW() - INTERVAL 1 DAY
+        """,
+        ("temperature",),
+        "dh",
+        "name_time",
+    ),
+    (
+        "История устройства (удаление устройства)",
+        "SELECT data_id FROM data_history WHERE data_device_id = %s",
+        (1,),
+        "data_history",
+        "device_time",
+    ),
+    *(
+        (
+            f"Агрегаты {table} параметра за период",
+            f"""
+            SELECT h.value_sum FROM {table} h
+            WHERE h.data_name = %s AND h.bucket >= NOW() - INTERVAL 1 DAY
+            """,
+            ("temperature",),
+            "h",
+            "PRIMARY",
+        )
+        for table, _, _ in ROLLUPS.values()
+    ),
+]
+
+
+def get_schema_version(cursor) -> int:
+    """
+    Returns:
+        int: Последняя применённая версия схемы, 0 - таблицы schema_version нет
+    """
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except mysql.connector.ProgrammingError as e:
+        if e.errno == errorcode.ER_NO_SUCH_TABLE:
+            return 0
+        raise
+    return cursor.fetchall()[0][0] or 0
+
+
+def apply_sqlite_schema(cnx) -> list[int]:
+    """
+    Создаёт схему sqlite_schema() во встроенной БД, если она не актуальна.
+    Схема создаётся в одной транзакции BEGIN IMMEDIATE, поэтому одновременно
+    запущенные процессы создают её по очереди.
+
+    Args:
+        cnx (SqliteConnection): Соединение пула SqliteDatabase
+
+    Returns:
+        list[int]: Версии миграций, которым соответствует созданная схема
+    """
+    exists = cnx.query_one(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    )
+    current = 0
+    if exists:
+        current = cnx.query_one("SELECT MAX(version) FROM schema_version")[0] or 0
+    if current >= LATEST_VERSION:
+        return []
+    cnx.executescript(sqlite_schema())
+    return [version for version, _, _ in MIGRATIONS if version > current]
+
+
+def apply_migrations(cnx) -> list[int]:
+    """
+    Применяет недостающие миграции схемы.
+
+    Если схема актуальна, выполняется один запрос к schema_version. Иначе
+    миграции применяются под блокировкой MIGRATIONS_LOCK (GET_LOCK), чтобы
+    одновременно запущенные процессы IoT- и web-сервера не выполняли их дважды.
+    Во встроенной БД SQLite создаётся схема sqlite_schema() (apply_sqlite_schema).
+
+    Args:
+        cnx (Connection): Соединение пула Database
+
+    Returns:
+        list[int]: Версии применённых миграций
+
+    Raises:
+        RuntimeError: Если блокировку не удалось получить за MIGRATIONS_LOCK_TIMEOUT секунд
+    """
+    if cnx.dialect == "sqlite":
+        return apply_sqlite_schema(cnx)
+
+    cursor = cnx.cursor(buffered=True)
+    try:
+        if get_schema_version(cursor) >= LATEST_VERSION:
+            return []
+
+        cursor.execute(
+            "SELECT GET_LOCK(%s, %s)", (MIGRATIONS_LOCK, MIGRATIONS_LOCK_TIMEOUT)
+        )
+        if not cursor.fetchall()[0][0]:
+            raise RuntimeError("Миграции схемы выполняет другой процесс")
+        try:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER NOT NULL,
+                    description VARCHAR(255),
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (version)
+                );
+                """
+            )
+            current = get_schema_version(cursor)
+            applied = []
+            for version, description, migrate in MIGRATIONS:
+                if version <= current:
+                    continue
+                migrate(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (version, description),
+                )
+                applied.append(version)
+            cnx.commit()
+            return applied
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATIONS_LOCK,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def check_indexes(cnx) -> list[str]:
+    """
+    Проверяет через EXPLAIN, что для запросов INDEX_CHECKS оптимизатору
+    доступен ожидаемый индекс (possible_keys или key плана). Выбор полного
+    сканирования на почти пустой таблице ошибкой не считается.
+    Во встроенной БД SQLite индекс ищется в плане EXPLAIN QUERY PLAN.
+
+    Args:
+        cnx (Connection): Соединение пула Database
+
+    Returns:
+        list[str]: Описания проверок, не прошедших проверку (пусто - все индексы на месте)
+    """
+    failures = []
+    if cnx.dialect == "sqlite":
+        for description, query, params, table, index in INDEX_CHECKS:
+            plan = [row[-1] for row in cnx.query(f"EXPLAIN QUERY PLAN {query}", params)]
+            expected = "PRIMARY KEY" if index == "PRIMARY" else f"INDEX {index} "
+            if not any(expected in f"{detail} " for detail in plan):
+                failures.append(f"{description}: нет индекса {table}.{index}")
+        return failures
+
+    cursor = cnx.cursor(buffered=True)
+    try:
+        for description, query, params, table, index in INDEX_CHECKS:
+            cursor.execute(f"EXPLAIN {query}", params)
+            columns = cursor.column_names
+            plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            usable = any(
+                row["table"] == table
+                and (
+                    row["key"] == index
+                    or index in (row["possible_keys"] or "").split(",")
+                )
+                for row in plan
+            )
+            if not usable:
+                failures.append(f"{description}: нет индекса {table}.{index}")
+    finally:
+        cursor.close()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Миграции схемы БД и проверка индексов через EXPLAIN"
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="mysql")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="123")
+    parser.add_argument("--database", default="GreenHouseLocal")
+    parser.add_argument(
+        "--check", action="store_true", help="после миграций проверить индексы"
+    )
+    args = parser.parse_args()
+
+    db = open_database(
+        args.backend, args.host, args.user, args.password, args.database, pool_size=1
+    )
+    with db.connection() as cnx:
+        applied = apply_migrations(cnx)
+        print(f"Версия схемы: {LATEST_VERSION}, применено миграций: {len(applied)}")
+        if not args.check:
+            return
+        failures = check_indexes(cnx)
+    db.close()
+
+    for failure in failures:
+        print(failure)
+    print(f"Проверено запросов: {len(INDEX_CHECKS)}, ошибок: {len(failures)}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
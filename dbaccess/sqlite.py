@@ -0,0 +1,218 @@
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+from mysql.connector import errors
+
+from .database import Database, ExecResult
+
+# Каталог файлов БД SQLite: <SQLITE_DIR>/<имя базы>.sqlite3
+SQLITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+# Замены конструкций MySQL в тексте запросов, по порядку применения
+SQL_REWRITES = [
+    (re.compile(r"%s"), "?"),
+    (
+        re.compile(r"NOW\(\)\s*-\s*INTERVAL\s+(\?|\d+)\s+DAY", re.IGNORECASE),
+        r"datetime('now', 'localtime', '-' || \1 || ' days')",
+    ),
+    (re.compile(r"NOW\(\)", re.IGNORECASE), "datetime('now', 'localtime')"),
+    (
+        re.compile(r"(?<!DEFAULT )\bCURRENT_TIMESTAMP\b", re.IGNORECASE),
+        "datetime('now', 'localtime')",
+    ),
+    (
+        re.compile(r"UNIX_TIMESTAMP\(([\w.]+)\)", re.IGNORECASE),
+        r"CAST(strftime('%s', \1, 'utc') AS INTEGER)",
+    ),
+    (re.compile(r"\bLEAST\(", re.IGNORECASE), "MIN("),
+    (re.compile(r"\bGREATEST\(", re.IGNORECASE), "MAX("),
+    (
+        re.compile(r"ON DUPLICATE KEY UPDATE", re.IGNORECASE),
+        "ON CONFLICT DO UPDATE SET",
+    ),
+    (re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE), r"excluded.\1"),
+    (re.compile(r"INSERT IGNORE", re.IGNORECASE), "INSERT OR IGNORE"),
+    (re.compile(r"\bAUTO_INCREMENT\b", re.IGNORECASE), "AUTOINCREMENT"),
+]
+
+# Время хранится текстом "YYYY-MM-DD HH:MM:SS", как его выводит MySQL
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" ", "seconds"))
+sqlite3.register_converter(
+    "DATETIME", lambda value: datetime.fromisoformat(value.decode("ascii"))
+)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql: str) -> str:
+    """
+    Переводит запрос в диалекте MySQL на SQLite: параметры %s, NOW(),
+    NOW() - INTERVAL n DAY, UNIX_TIMESTAMP, LEAST/GREATEST,
+    ON DUPLICATE KEY UPDATE с VALUES(столбец), INSERT IGNORE, AUTO_INCREMENT.
+
+    Args:
+        sql (str): Запрос для MySQL
+
+    Returns:
+        str: Запрос для SQLite
+    """
+    for pattern, replacement in SQL_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+@contextmanager
+def mysql_errors():
+    """
+    Поднимает ошибки sqlite3 как ошибки mysql.connector, чтобы обработка
+    ошибок в DBMS_worker не зависела от типа БД.
+    """
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        raise errors.IntegrityError(msg=str(e)) from e
+    except sqlite3.OperationalError as e:
+        # В том числе "database is locked" после ожидания блокировки записи
+        raise errors.OperationalError(msg=str(e)) from e
+    except sqlite3.Error as e:
+        raise errors.DatabaseError(msg=str(e)) from e
+
+
+class SqliteConnection:
+    dialect = "sqlite"
+
+    def __init__(self, cnx: sqlite3.Connection):
+        """
+        Соединение SQLite с интерфейсом Connection. Запросы переводятся
+        функцией translate; подготовленные запросы кэширует сам sqlite3
+        (cached_statements), параметр prepared принимается для совместимости.
+
+        Args:
+            cnx (sqlite3.Connection): Соединение в режиме автофиксации
+        """
+        self.cnx = cnx
+        self.prepared = {}
+        self.hits = 0
+        self.misses = 0
+
+    def query(self, sql: str, params: tuple = None, prepared: bool = True) -> list[tuple]:
+        with mysql_errors():
+            return self.cnx.execute(translate(sql), params or ()).fetchall()
+
+    def query_one(self, sql: str, params: tuple = None, prepared: bool = True) -> tuple | None:
+        with mysql_errors():
+            return self.cnx.execute(translate(sql), params or ()).fetchone()
+
+    def query_dicts(self, sql: str, params: tuple = None, prepared: bool = True) -> list[dict]:
+        with mysql_errors():
+            cursor = self.cnx.execute(translate(sql), params or ())
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def execute(self, sql: str, params: tuple = None, prepared: bool = True) -> ExecResult:
+        with mysql_errors():
+            cursor = self.cnx.execute(translate(sql), params or ())
+            return ExecResult(cursor.rowcount, cursor.lastrowid)
+
+    def executemany(self, sql: str, seq_params: list[tuple]) -> ExecResult:
+        with mysql_errors():
+            cursor = self.cnx.executemany(translate(sql), seq_params)
+            return ExecResult(cursor.rowcount, cursor.lastrowid)
+
+    def executescript(self, script: str) -> None:
+        """
+        Выполняет несколько запросов SQLite без перевода (схема БД).
+        """
+        with mysql_errors():
+            self.cnx.executescript(script)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Выполняет запросы блока в одной транзакции (BEGIN IMMEDIATE сразу
+        берёт блокировку записи): при исключении изменения откатываются.
+        """
+        with mysql_errors():
+            self.cnx.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+            with mysql_errors():
+                self.cnx.execute("COMMIT")
+        except BaseException:
+            self.cnx.rollback()
+            raise
+
+    def commit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.cnx.close()
+
+
+class SqliteDatabase(Database):
+    dialect = "sqlite"
+
+    def __init__(
+        self,
+        db_name: str,
+        pool_size: int = 5,
+        prepared_cache_size: int = 64,
+        acquire_timeout: float = 30,
+        directory: str = SQLITE_DIR,
+    ):
+        """
+        Встроенная БД SQLite в режиме WAL с интерфейсом Database.
+
+        Для одиночной установки, где все компоненты работают на одном
+        компьютере без отдельной службы MariaDB. В режиме WAL чтение не
+        блокируется записью, поэтому web-сервер строит графики во время
+        записи показаний IoT-сервером; записи выполняются по очереди,
+        ожидая блокировку файла не дольше acquire_timeout секунд.
+        Запросы DBMS_worker остаются в диалекте MySQL и переводятся translate.
+
+        Args:
+            db_name (str): Название базы данных - имя файла в directory
+            pool_size (int, optional): Наибольшее число соединений
+            prepared_cache_size (int, optional): Подготовленных запросов на соединение
+            acquire_timeout (float, optional): Наибольшее ожидание соединения
+                и блокировки записи в секундах
+            directory (str, optional): Каталог файлов БД
+
+        Attributes:
+            path (str): Путь файла БД
+        """
+        self.path = os.path.join(directory, f"{db_name}.sqlite3")
+        super().__init__(
+            None, None, None, db_name, pool_size, prepared_cache_size, acquire_timeout
+        )
+
+    def _create_database(self) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        created = not os.path.exists(self.path)
+        cnx = sqlite3.connect(self.path, timeout=self.acquire_timeout)
+        try:
+            # Режим журнала хранится в файле БД и действует для всех соединений
+            cnx.execute("PRAGMA journal_mode = WAL")
+        finally:
+            cnx.close()
+        return created
+
+    def _open(self) -> SqliteConnection:
+        cnx = sqlite3.connect(
+            self.path,
+            timeout=self.acquire_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=self.prepared_cache_size,
+        )
+        cnx.execute("PRAGMA foreign_keys = ON")
+        # В режиме WAL синхронизация с диском при каждой фиксации не нужна
+        # для целостности: теряются лишь последние записи при отключении питания
+        cnx.execute("PRAGMA synchronous = NORMAL")
+        with self.lock:
+            self.opened += 1
+        return SqliteConnection(cnx)
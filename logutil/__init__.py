@@ -0,0 +1,3 @@
+from .logger import Logger, StructuredFormatter, DroppingQueueHandler, setup_logging
+
+__all__ = ["Logger", "StructuredFormatter", "DroppingQueueHandler", "setup_logging"]
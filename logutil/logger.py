@@ -0,0 +1,162 @@
+import sys
+import json
+import queue
+import atexit
+import logging
+import itertools
+import logging.handlers
+from datetime import datetime
+
+FORMAT_TEXT = "text"
+FORMAT_JSON = "json"
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        """
+        Обработчик, передающий записи в очередь фонового потока.
+
+        Запись никогда не блокирует вызывающий поток: при переполненной
+        очереди она отбрасывается. Форматирование выполняется в фоновом потоке.
+
+        Args:
+            log_queue (queue.Queue): Ограниченная очередь записей
+
+        Attributes:
+            dropped (int): Число отброшенных записей
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, output_format: str = FORMAT_TEXT):
+        """
+        Форматирует запись с полями в текст или в JSON-строку.
+
+        Текст: "(HH:MM:SS) УРОВЕНЬ сообщение ключ=значение ...".
+        JSON: {"time", "level", "logger", "message", поля...}.
+
+        Args:
+            output_format (str, optional): "text" или "json"
+        """
+        super().__init__()
+        self.output_format = output_format
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        timestamp = datetime.fromtimestamp(record.created)
+
+        exception = self.formatException(record.exc_info) if record.exc_info else None
+        if self.output_format == FORMAT_JSON:
+            entry = {
+                "time": timestamp.isoformat(timespec="milliseconds"),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **fields,
+            }
+            if exception:
+                entry["exception"] = exception
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        parts = [f"({timestamp:%H:%M:%S})", record.levelname, record.getMessage()]
+        parts.extend(
+            f"{key}={json.dumps(value, ensure_ascii=False, default=str)}"
+            for key, value in fields.items()
+        )
+        text = " ".join(parts)
+        return f"{text}\n{exception}" if exception else text
+
+
+class Logger:
+    def __init__(self, name: str, sample_every: int = 1):
+        """
+        Структурированный журнал компонента.
+
+        Сообщения сопровождаются именованными полями, которые сериализуются
+        только в фоновом потоке и только если уровень сообщения включён.
+
+        Args:
+            name (str): Имя журнала
+            sample_every (int, optional): Для sampled() - записывать каждое N-е сообщение
+        """
+        self.logger = logging.getLogger(name)
+        self.sample_every = max(1, sample_every)
+        self.counter = itertools.count()
+
+    def log(self, level: int, message: str, **fields) -> None:
+        """
+        Записывает сообщение с полями.
+
+        Args:
+            level (int): Уровень logging
+            message (str): Сообщение
+            **fields: Именованные поля записи
+        """
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, message, extra={"fields": fields})
+
+    def debug(self, message: str, **fields) -> None:
+        self.log(logging.DEBUG, message, **fields)
+
+    def info(self, message: str, **fields) -> None:
+        self.log(logging.INFO, message, **fields)
+
+    def warning(self, message: str, **fields) -> None:
+        self.log(logging.WARNING, message, **fields)
+
+    def error(self, message: str, **fields) -> None:
+        self.log(logging.ERROR, message, **fields)
+
+    def sampled(self, message: str, level: int = logging.INFO, **fields) -> None:
+        """
+        Записывает только каждое sample_every-е сообщение (для записей на каждый кадр).
+
+        Args:
+            message (str): Сообщение
+            level (int, optional): Уровень logging
+            **fields: Именованные поля записи
+        """
+        if next(self.counter) % self.sample_every == 0:
+            self.log(level, message, **fields)
+
+
+def setup_logging(
+    level: str = "INFO",
+    output_format: str = FORMAT_TEXT,
+    queue_size: int = 10000,
+) -> logging.handlers.QueueListener:
+    """
+    Направляет корневой журнал в очередь, которую разбирает фоновый поток
+    записи в stdout. Поток останавливается с дозаписью очереди при выходе.
+
+    Args:
+        level (str, optional): Минимальный уровень (DEBUG, INFO, WARNING, ERROR)
+        output_format (str, optional): "text" или "json"
+        queue_size (int, optional): Ёмкость очереди. Сверх неё записи отбрасываются
+
+    Returns:
+        logging.handlers.QueueListener: Запущенный фоновый поток записи
+    """
+    log_queue = queue.Queue(queue_size)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(output_format))
+
+    root = logging.getLogger()
+    root.handlers = [DroppingQueueHandler(log_queue)]
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -1,205 +1,319 @@
+import os
+import sys
+import math
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
 import mysql.connector
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
 
-class DBMS_worker:
-    def __init__(self, host: str, user: str, password: str, db_name: str):
+from dbaccess import open_database
+from dbaccess.migrations import apply_migrations, HISTORY_FUTURE_PARTITION, ROLLUPS
+from logutil import Logger
+
+log = Logger("iot-server.db")
+
+HISTORY_LOCK = "data_history_partitions"
+
+# Обновление текущего значения при записи показаний. Пакеты с метками времени
+# устройства записываются не по порядку, поэтому замер старше текущего значения
+# его не заменяет (в data_history он попадает триггером before_actual_data_insert)
+ACTUAL_DATA_UPDATE = {
+    "mysql": """
+        ON DUPLICATE KEY UPDATE
+            data_value = IF(
+                VALUES(data_timestamp) >= data_timestamp, VALUES(data_value), data_value
+            ),
+            data_timestamp = GREATEST(data_timestamp, VALUES(data_timestamp))
+    """,
+    "sqlite": """
+        ON CONFLICT DO UPDATE SET
+            data_value = excluded.data_value,
+            data_timestamp = excluded.data_timestamp
+        WHERE excluded.data_timestamp >= data_timestamp
+    """,
+}
+
+
+class DeviceIdCache:
+    def __init__(self, max_size: int):
+        """
+        Потокобезопасный LRU-кэш соответствия UUID устройства и его device_id.
+
+        Args:
+            max_size (int): Максимальное число хранимых записей
+
+        Attributes:
+            hits (int): Число попаданий в кэш
+            misses (int): Число промахов
+        """
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, device_uuid: str) -> int | None:
+        """
+        Возвращает device_id из кэша и учитывает попадание или промах.
+
+        Args:
+            device_uuid (str): UUID устройства
+
+        Returns:
+            int | None: ID устройства или None при промахе
+        """
+        with self.lock:
+            device_id = self.items.get(device_uuid)
+            if device_id is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(device_uuid)
+            self.hits += 1
+            return device_id
+
+    def put(self, device_uuid: str, device_id: int) -> None:
+        """
+        Сохраняет соответствие UUID и device_id, вытесняя самую старую запись.
+
+        Args:
+            device_uuid (str): UUID устройства
+            device_id (int): ID устройства
+        """
+        with self.lock:
+            self.items[device_uuid] = device_id
+            self.items.move_to_end(device_uuid)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def invalidate(self, device_uuid: str) -> None:
+        """
+        Удаляет запись по UUID устройства.
+
+        Args:
+            device_uuid (str): UUID устройства
+        """
+        with self.lock:
+            self.items.pop(device_uuid, None)
+
+    def invalidate_id(self, device_id: int) -> None:
+        """
+        Удаляет все записи, указывающие на device_id.
+
+        Args:
+            device_id (int): ID устройства
+        """
+        with self.lock:
+            for device_uuid in [u for u, i in self.items.items() if i == device_id]:
+                del self.items[device_uuid]
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику кэша.
+
+        Returns:
+            dict: {'size': int, 'hits': int, 'misses': int}
         """
-        Инициализирует соединение с MySQL сервером и подключается к базе данных.
+        with self.lock:
+            return {"size": len(self.items), "hits": self.hits, "misses": self.misses}
+
+
+class DBMS_worker:
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        password: str,
+        db_name: str,
+        device_cache_size: int = 10000,
+        pool_size: int = 20,
+        prepared_cache_size: int = 64,
+        backend: str = "mysql",
+    ):
+        """
+        Инициализирует пул соединений с MySQL сервером и подключается к базе данных.
 
         Args:
             host (str): Хост MySQL сервера
             user (str): Имя пользователя
             password (str): Пароль пользователя
             db_name (str): Название базы данных
+            device_cache_size (int): Размер кэша UUID -> device_id
+            pool_size (int): Наибольшее число соединений с БД
+            prepared_cache_size (int): Подготовленных запросов на соединение
+            backend (str): Тип БД: "mysql" или "sqlite" (встроенная, host,
+                user и password не используются)
 
         Attributes:
             created (bool): Флаг успешного подключения
             error (str): Сообщение об ошибке при неудачном подключении
+            db (Database): Общий пул соединений (dbaccess) выбранного типа
+            device_ids (DeviceIdCache): Кэш идентификаторов устройств
         """
+        self.device_ids = DeviceIdCache(device_cache_size)
         try:
-            cnx = mysql.connector.connect(
-                host=host, user=user, password=password, autocommit=True
-            )
-            cnx.cursor().execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
-            cnx.close()
-            self.cnx_pool = mysql.connector.pooling.MySQLConnectionPool(
-                pool_name="gh_pool",
-                pool_size=20,
-                host=host,
-                user=user,
-                password=password,
-                database=db_name,
-                autocommit=True
+            self.db = open_database(
+                backend, host, user, password, db_name, pool_size, prepared_cache_size
             )
-            self._initialize_database(db_name)
+            self._initialize_database()
             self.created = True
         except Exception as e:
             self.created = False
             self.error = str(e)
 
-    def _execute(self, query, params=None):
-        conn = self.cnx_pool.get_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(query, params)
-                if cursor.with_rows:
-                    return cursor.fetchall()  # Возвращаем результат запроса
-                else:
-                    conn.commit()  # Явное подтверждение для не-SELECT операций
-                    return {
-                        'rowcount': cursor.rowcount,
-                        'lastrowid': cursor.lastrowid
-                    }
-        finally:
-            conn.close()
-
-    def _initialize_database(self, db_name: str) -> None:
+    def _initialize_database(self) -> None:
         """
-        Создает новую базу данных и все необходимые таблицы:
-        - devices (устройства)
-        - actual_data (актуальные показатели)
-        - data_history (история изменений)
-        - rules (правила обработки данных)
-        - tasks (задачи для устройств)
-
-        Также создает триггеры для автоматического сохранения истории изменений.
+        Приводит схему БД к актуальной версии миграциями (dbaccess/migrations.py):
+        таблицы устройств, показаний, истории и её агрегатов, правил,
+        пользователей, триггеры и индексы. Если схема актуальна,
+        выполняется один запрос к schema_version.
         """
-        self._execute(
+        with self.db.connection() as conn:
+            apply_migrations(conn)
+
+    @staticmethod
+    def _get_history_partitions(cursor) -> list[tuple[str, datetime | None]]:
+        cursor.execute(
             """
-            CREATE TABLE IF NOT EXISTS sectors (
-                sector_id INTEGER NOT NULL AUTO_INCREMENT,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                PRIMARY KEY (sector_id)
-            );
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'data_history'
+            ORDER BY PARTITION_ORDINAL_POSITION
             """
         )
+        partitions = []
+        for name, description in cursor.fetchall():
+            if name is None:
+                continue
+            bound = None if description == "MAXVALUE" else (
+                datetime.fromisoformat(description.strip("'"))
+            )
+            partitions.append((name, bound))
+        return partitions
 
-        self._execute(
-            """
-            CREATE TABLE IF NOT EXISTS devices (
-                device_id INTEGER NOT NULL AUTO_INCREMENT,
-                device_uuid CHAR(36) UNIQUE,
-                device_name VARCHAR(255),
-                sector_id INTEGER DEFAULT NULL,
-                device_last_communication DATETIME DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (device_id),
-                FOREIGN KEY (sector_id) REFERENCES sectors(sector_id) ON DELETE SET NULL
-            );
+    def maintain_history_partitions(
+        self, bounds: list[tuple[str, datetime]], cutoff: datetime
+    ) -> dict | None:
         """
-        )
+        Создаёт будущие секции data_history и удаляет секции старше cutoff.
 
-        self._execute(
-            """
-            CREATE TABLE IF NOT EXISTS actual_data (
-                data_id INTEGER NOT NULL AUTO_INCREMENT,
-                data_device_id INTEGER,
-                data_name VARCHAR(255),
-                data_value INTEGER,
-                data_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (data_id),
-                UNIQUE KEY device_param (data_device_id, data_name),
-                FOREIGN KEY (data_device_id)
-                REFERENCES devices(device_id)
-                ON DELETE CASCADE
-            );
-        """
-        )
+        Новые секции выделяются из пустой p_future (REORGANIZE PARTITION),
+        устаревшие удаляются целиком (DROP PARTITION) без построчного DELETE.
+        Процессы-обработчики выполняют обслуживание по очереди: если блокировку
+        HISTORY_LOCK держит другой процесс, вызов пропускается.
 
-        self._execute(
-            """
-            CREATE TABLE IF NOT EXISTS data_history (
-                data_id INTEGER NOT NULL AUTO_INCREMENT,
-                data_device_id INTEGER,
-                data_name VARCHAR(255),
-                data_value INTEGER,
-                data_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (data_id),
-                FOREIGN KEY (data_device_id)
-                REFERENCES devices(device_id)
-                ON DELETE CASCADE
-            );
-        """
-        )
+        Args:
+            bounds (list[tuple]): Желаемые секции (имя, верхняя граница) по возрастанию
+            cutoff (datetime): Секции с верхней границей не позже cutoff удаляются
 
-        self._execute(
-            """
-            CREATE TABLE IF NOT EXISTS rules (
-                rule_id INTEGER NOT NULL AUTO_INCREMENT,
-                rule_data_id INTEGER,
-                rule_condition INTEGER,
-                rule_value INTEGER,
-                rule_device_id INTEGER,
-                rule_message VARCHAR(255),
-                is_active BOOLEAN DEFAULT TRUE,
-                PRIMARY KEY (rule_id),
-                FOREIGN KEY (rule_data_id)
-                REFERENCES actual_data(data_id)
-                ON DELETE CASCADE,
-                FOREIGN KEY (rule_device_id)
-                REFERENCES devices(device_id)
-                ON DELETE CASCADE
-            );
-        """
-        )
+        Во встроенной БД SQLite секций нет: строки старше cutoff удаляются
+        запросом DELETE, их число возвращается в 'deleted'.
 
-        self._execute(
-            """
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER NOT NULL AUTO_INCREMENT,
-            email VARCHAR(255) NOT NULL UNIQUE,
-            password_hash VARCHAR(255) NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (user_id)
-        );
+        Returns:
+            dict | None: {'created': list[str], 'dropped': list[str]} или None,
+            если обслуживание выполняет другой процесс или произошла ошибка
         """
-        )
+        if self.db.dialect == "sqlite":
+            return self._delete_history_before(cutoff)
 
-        self._execute(
-            """
-            CREATE TRIGGER IF NOT EXISTS after_actual_data_insert
-            AFTER INSERT ON actual_data
-            FOR EACH ROW
-            INSERT INTO data_history (
-                data_device_id, 
-                data_name, 
-                data_value, 
-                data_timestamp
-            )
-            VALUES (
-                NEW.data_device_id,
-                NEW.data_name, 
-                NEW.data_value, 
-                NEW.data_timestamp
-            );
+        try:
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (HISTORY_LOCK,))
+                if not cursor.fetchall()[0][0]:
+                    return None
+                try:
+                    partitions = self._get_history_partitions(cursor)
+                    last_bound = max(
+                        (bound for _, bound in partitions if bound is not None),
+                        default=None,
+                    )
+                    created = [
+                        (name, bound)
+                        for name, bound in bounds
+                        if last_bound is None or bound > last_bound
+                    ]
+                    if created:
+                        definitions = ", ".join(
+                            f"PARTITION {name} VALUES LESS THAN ('{bound:%Y-%m-%d %H:%M:%S}')"
+                            for name, bound in created
+                        )
+                        cursor.execute(
+                            f"""
+                            ALTER TABLE data_history
+                            REORGANIZE PARTITION {HISTORY_FUTURE_PARTITION} INTO (
+                                {definitions},
+                                PARTITION {HISTORY_FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)
+                            )
+                            """
+                        )
+
+                    dropped = [
+                        name
+                        for name, bound in partitions
+                        if bound is not None and bound <= cutoff
+                    ]
+                    if dropped:
+                        cursor.execute(
+                            f"ALTER TABLE data_history DROP PARTITION {', '.join(dropped)}"
+                        )
+                    return {"created": [name for name, _ in created], "dropped": dropped}
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (HISTORY_LOCK,))
+                    cursor.fetchall()
+        except mysql.connector.Error as e:
+            log.error("Ошибка обслуживания секций истории", error=str(e))
+            return None
+
+    def _delete_history_before(self, cutoff: datetime) -> dict | None:
+        deleted = 0
+        if cutoff > datetime.min:
+            try:
+                deleted = self.db.execute(
+                    "DELETE FROM data_history WHERE data_timestamp < %s", (cutoff,)
+                ).rowcount
+            except mysql.connector.Error as e:
+                log.error("Ошибка удаления устаревшей истории", error=str(e))
+                return None
+        return {"created": [], "dropped": [], "deleted": deleted}
+
+    def delete_rollups_before(self, cutoffs: dict[str, datetime]) -> dict[str, int] | None:
         """
-        )
+        Удаляет агрегаты истории с началом интервала раньше границы таблицы.
 
-        self._execute(
-            """
-            CREATE TRIGGER IF NOT EXISTS after_actual_data_update
-            AFTER UPDATE ON actual_data
-            FOR EACH ROW
-            BEGIN
-                INSERT INTO data_history (
-                    data_device_id, 
-                    data_name, 
-                    data_value, 
-                    data_timestamp
-                )
-                VALUES (
-                    NEW.data_device_id, 
-                    NEW.data_name, 
-                    NEW.data_value, 
-                    NEW.data_timestamp
-                );
-            END;
+        Строки удаляются отдельным запросом по каждому параметру: условие
+        data_name = %s AND bucket < %s - диапазон первичного ключа
+        (data_name, bucket, data_device_id), таблица не просматривается целиком.
+
+        Args:
+            cutoffs (dict): {таблица агрегатов: граница удаления}
+
+        Returns:
+            dict | None: {таблица: число удалённых строк} или None при ошибке
         """
-        )
+        deleted = {}
+        try:
+            for table, cutoff in cutoffs.items():
+                names = [
+                    row[0] for row in self.db.query(f"SELECT DISTINCT data_name FROM {table}")
+                ]
+                deleted[table] = sum(
+                    self.db.execute(
+                        f"DELETE FROM {table} WHERE data_name = %s AND bucket < %s",
+                        (name, cutoff),
+                    ).rowcount
+                    for name in names
+                )
+            return deleted
+        except mysql.connector.Error as e:
+            log.error("Ошибка удаления устаревших агрегатов истории", error=str(e))
+            return None
 
     def get_device_id(self, device_uuid: str) -> int | None:
         """
-        Получает ID устройства по его UUID.
+        Получает ID устройства по его UUID. Найденные ID кэшируются,
+        поэтому повторные обращения не выполняют запросов к БД.
 
         Args:
             device_uuid (str): Уникальный идентификатор устройства
@@ -207,11 +321,20 @@ class DBMS_worker:
         Returns:
             int | None: ID устройства или None если не найдено
         """
-        result = self._execute(
+        device_id = self.device_ids.get(device_uuid)
+        if device_id is not None:
+            return device_id
+
+        row = self.db.query_one(
             "SELECT device_id FROM devices WHERE device_uuid = %s",
             (device_uuid,)
         )
-        return result[0][0] if result else None
+        if not row:
+            return None
+
+        device_id = row[0]
+        self.device_ids.put(device_uuid, device_id)
+        return device_id
 
     def update_device_communication_timestamp(self, device_uuid: str) -> None:
         """
@@ -220,7 +343,7 @@ class DBMS_worker:
         Args:
             device_uuid (str): Уникальный идентификатор устройства
         """
-        self._execute(
+        self.db.execute(
             """
             UPDATE devices
             SET device_last_communication = CURRENT_TIMESTAMP
@@ -229,9 +352,44 @@ class DBMS_worker:
             (device_uuid,),
         )
 
+    def update_devices_communication_timestamps(
+        self, timestamps: dict, chunk_size: int = 1000
+    ) -> bool:
+        """
+        Обновляет время последней коммуникации нескольких устройств одним запросом.
+
+        Args:
+            timestamps (dict): {device_id: datetime}
+            chunk_size (int): Максимальное число устройств в одном запросе
+
+        Returns:
+            bool: True при успешном обновлении
+        """
+        items = list(timestamps.items())
+        try:
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start:start + chunk_size]
+                cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+                placeholders = ", ".join(["%s"] * len(chunk))
+                self.db.execute(
+                    f"""
+                    UPDATE devices
+                    SET device_last_communication = CASE device_id {cases} END
+                    WHERE device_id IN ({placeholders})
+                    """,
+                    [value for item in chunk for value in item]
+                    + [device_id for device_id, _ in chunk],
+                    prepared=len(chunk) == chunk_size,
+                )
+            return True
+        except mysql.connector.Error as e:
+            log.error("Ошибка обновления времени связи", error=str(e))
+            return False
+
     def add_device(self, uuid: str, name: str, sector_id: int = None) -> bool:
         """
         Добавляет новое устройство в базу данных с возможностью привязки к сектору.
+        В обоих случаях (новое или уже существующее устройство) ID попадает в кэш.
 
         Args:
             uuid (str): Уникальный идентификатор устройства
@@ -242,15 +400,17 @@ class DBMS_worker:
             bool: True при успешном добавлении
         """
         try:
-            self._execute(
+            result = self.db.execute(
                 """
                 INSERT INTO devices (device_uuid, device_name, sector_id)
                 VALUES (%s, %s, %s)
                 """,
                 (uuid, name, sector_id),
             )
+            self.device_ids.put(uuid, result.lastrowid)
             return True
         except mysql.connector.Error as e:
+            self.get_device_id(uuid)
             return False
 
     def remove_device(self, device_id: int) -> bool:
@@ -263,8 +423,11 @@ class DBMS_worker:
         Returns:
             bool: True при успешном удалении
         """
+        # ID сбрасывается и после удаления: get_device_id, выполненный
+        # до фиксации DELETE, мог снова поместить его в кэш
+        self.device_ids.invalidate_id(device_id)
         try:
-            return self._execute(
+            removed = self.db.execute(
                 """
                 DELETE FROM devices 
                 WHERE device_id = %s
@@ -272,7 +435,11 @@ class DBMS_worker:
                 (device_id,),
             ).rowcount > 0
         except mysql.connector.Error as e:
+            log.error("Ошибка удаления устройства", device_id=device_id, error=str(e))
             return False
+        finally:
+            self.device_ids.invalidate_id(device_id)
+        return removed
 
     def assign_device_to_sector(self, device_id: int, sector_id: int) -> bool:
         """
@@ -286,7 +453,7 @@ class DBMS_worker:
             bool: True при успешном обновлении
         """
         try:
-            if not self._execute(
+            if not self.db.query_one(
                 """
                 SELECT sector_id 
                 FROM sectors 
@@ -296,7 +463,7 @@ class DBMS_worker:
             ):
                 return False
 
-            return self._execute(
+            return self.db.execute(
                 """
                 UPDATE devices 
                 SET sector_id = %s 
@@ -318,7 +485,7 @@ class DBMS_worker:
             bool: True при успешном обновлении
         """
         try:
-            return self._execute(
+            return self.db.execute(
                 """
                 UPDATE devices 
                 SET sector_id = NULL 
@@ -341,13 +508,12 @@ class DBMS_worker:
             int | None: ID созданного сектора или None при ошибке
         """
         try:
-            result = self._execute(
+            return self.db.execute(
                 "INSERT INTO sectors (name, description) VALUES (%s, %s)",
                 (name, description)
-            )
-            return result['lastrowid']
+            ).lastrowid
         except mysql.connector.Error as e:
-            print(f"[Ошибка] Не удалось создать сектор: {e}")
+            log.error("Не удалось создать сектор", error=str(e))
             return None
 
     def remove_sector(self, sector_id: int) -> bool:
@@ -361,13 +527,12 @@ class DBMS_worker:
             bool: True если сектор был удален, False если не существовал
         """
         try:
-            result = self._execute(
+            return self.db.execute(
                 "DELETE FROM sectors WHERE sector_id = %s", 
                 (sector_id,)
-            )
-            return result['rowcount'] > 0
+            ).rowcount > 0
         except mysql.connector.Error as e:
-            print(f"[Ошибка] Не удалось удалить сектор {sector_id}: {e}")
+            log.error("Не удалось удалить сектор", sector_id=sector_id, error=str(e))
             return False
 
     def add_device_data_batch(self, device_uuid: str, data: dict) -> bool:
@@ -388,26 +553,184 @@ class DBMS_worker:
 
         try:
             values = [(device_id, param, value) for param, value in data.items()]
-            conn = self.cnx_pool.get_connection()
-            with conn.cursor() as cursor:
-                cursor.executemany(
-                    """
-                    INSERT INTO actual_data 
-                        (data_device_id, data_name, data_value)
-                    VALUES (%s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        data_value = VALUES(data_value),
-                        data_timestamp = NOW()
-                    """,
-                    values
-                )
-                conn.commit()
-                return True
+            self.db.executemany(
+                """
+                INSERT INTO actual_data 
+                    (data_device_id, data_name, data_value)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    data_value = VALUES(data_value),
+                    data_timestamp = NOW()
+                """,
+                values
+            )
+            return True
+        except mysql.connector.IntegrityError as e:
+            # Устройство удалено другим процессом (например, web-сервером)
+            self.device_ids.invalidate(device_uuid)
+            log.error("Ошибка пакетного обновления", uuid=device_uuid, error=str(e))
+            return False
         except mysql.connector.Error as e:
-            print(f"Ошибка пакетного обновления: {e}")
+            log.error("Ошибка пакетного обновления", uuid=device_uuid, error=str(e))
+            return False
+
+    @staticmethod
+    def _upsert_actual_data_chunk(conn, rows: list[tuple]) -> None:
+        placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+        conn.execute(
+            f"""
+            INSERT INTO actual_data
+                (data_device_id, data_name, data_value, data_timestamp)
+            VALUES {placeholders}
+            {ACTUAL_DATA_UPDATE[conn.dialect]}
+            """,
+            [value for row in rows for value in row],
+            prepared=False,
+        )
+
+    @staticmethod
+    def _numeric_rows(rows: list[tuple]) -> list[tuple]:
+        """
+        Приводит значения показаний к числам перед записью и свёрткой в агрегаты.
+        Строки с десятичной записью числа преобразуются, строки с None,
+        логическим, нечисловым или бесконечным значением отбрасываются.
+
+        Args:
+            rows (list[tuple]): Строки (device_id, параметр, значение, время замера)
+
+        Returns:
+            list[tuple]: Строки с числовыми значениями
+        """
+        result = []
+        for device_id, name, value, timestamp in rows:
+            if isinstance(value, str):
+                try:
+                    value = float(value)
+                except ValueError:
+                    continue
+                if value.is_integer():
+                    value = int(value)
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if math.isfinite(value):
+                result.append((device_id, name, value, timestamp))
+        if len(result) < len(rows):
+            log.warning("Нечисловые показания отброшены", rows=len(rows) - len(result))
+        return result
+
+    @staticmethod
+    def _aggregate_rollups(rows: list[tuple]) -> dict[str, list[tuple]]:
+        """
+        Сворачивает строки показаний в агрегаты по интервалам каждого разрешения.
+
+        Args:
+            rows (list[tuple]): Строки (device_id, параметр, значение, время замера)
+
+        Returns:
+            dict: {таблица: [(device_id, параметр, начало интервала, min, max, sum, count)]}
+        """
+        result = {}
+        for table, truncate, _ in ROLLUPS.values():
+            buckets = {}
+            for device_id, name, value, timestamp in rows:
+                key = (device_id, name, timestamp.replace(**truncate))
+                current = buckets.get(key)
+                if current is None:
+                    buckets[key] = [value, value, value, 1]
+                else:
+                    current[0] = min(current[0], value)
+                    current[1] = max(current[1], value)
+                    current[2] += value
+                    current[3] += 1
+            result[table] = [(*key, *values) for key, values in buckets.items()]
+        return result
+
+    def _upsert_rollups_chunk(self, conn, rows: list[tuple]) -> None:
+        for table, aggregates in self._aggregate_rollups(rows).items():
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(aggregates))
+            conn.execute(
+                f"""
+                INSERT INTO {table}
+                    (data_device_id, data_name, bucket,
+                     value_min, value_max, value_sum, value_count)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE
+                    value_min = LEAST(value_min, VALUES(value_min)),
+                    value_max = GREATEST(value_max, VALUES(value_max)),
+                    value_sum = value_sum + VALUES(value_sum),
+                    value_count = value_count + VALUES(value_count)
+                """,
+                [value for row in aggregates for value in row],
+                prepared=False,
+            )
+
+    def write_actual_data(self, rows: list[tuple], chunk_size: int = 1000) -> None:
+        """
+        Добавляет или обновляет показания нескольких устройств многострочными запросами.
+        Каждая строка попадает в data_history через триггер actual_data, а агрегаты
+        history_minute/hour/day дополняются свёрнутыми строками пакета. Текущее
+        значение заменяется только замером не старше его (ACTUAL_DATA_UPDATE).
+        Строки устройств, удалённых к моменту записи, и строки с нечисловыми
+        значениями (_numeric_rows) отбрасываются.
+
+        Все запросы пакета выполняются в одной транзакции: при ошибке
+        не записывается ничего, и пакет можно повторить без повторных строк
+        в data_history и агрегатах.
+
+        Args:
+            rows (list[tuple]): Строки (device_id, параметр, значение, время замера)
+            chunk_size (int): Максимальное число строк в одном запросе
+
+        Raises:
+            mysql.connector.Error: Ошибка записи, изменения пакета отменены
+        """
+        rows = self._numeric_rows(rows)
+        if not rows:
+            return
+
+        with self.db.connection() as conn, conn.transaction():
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                try:
+                    self._upsert_actual_data_chunk(conn, chunk)
+                except mysql.connector.IntegrityError:
+                    device_ids = list({row[0] for row in chunk})
+                    existing = {
+                        row[0]
+                        for row in conn.query(
+                            f"""
+                            SELECT device_id FROM devices
+                            WHERE device_id IN ({", ".join(["%s"] * len(device_ids))})
+                            """,
+                            device_ids,
+                            prepared=False,
+                        )
+                    }
+                    for device_id in set(device_ids) - existing:
+                        self.device_ids.invalidate_id(device_id)
+                    chunk = [row for row in chunk if row[0] in existing]
+                    if not chunk:
+                        continue
+                    self._upsert_actual_data_chunk(conn, chunk)
+                self._upsert_rollups_chunk(conn, chunk)
+
+    def upsert_actual_data(self, rows: list[tuple], chunk_size: int = 1000) -> bool:
+        """
+        Записывает показания одной транзакцией (см. write_actual_data).
+
+        Args:
+            rows (list[tuple]): Строки (device_id, параметр, значение, время замера)
+            chunk_size (int): Максимальное число строк в одном запросе
+
+        Returns:
+            bool: True при успешной записи всех строк
+        """
+        try:
+            self.write_actual_data(rows, chunk_size)
+            return True
+        except mysql.connector.Error as e:
+            log.error("Ошибка пакетной записи показаний", rows=len(rows), error=str(e))
             return False
-        finally:
-            conn.close()
 
     def get_actual_data(
         self, device_uuid: str, parameter_name: str = None
@@ -439,11 +762,11 @@ class DBMS_worker:
                 query += " AND data_name = %s"
                 params.append(parameter_name)
 
-            results = self._execute(query, params)
+            results = self.db.query(query, params)
 
             return {row[0]: {"value": row[1], "timestamp": row[2]} for row in results}
         except mysql.connector.Error as e:
-            print(f"Ошибка получения данных: {e}")
+            log.error("Ошибка получения данных", uuid=device_uuid, error=str(e))
             return None
 
     def add_rule(
@@ -477,7 +800,7 @@ class DBMS_worker:
             if not source_device_id or not target_device_id:
                 return None
 
-            data_row = self._execute(
+            data_row = self.db.query_one(
                 """
                 SELECT data_id 
                 FROM actual_data 
@@ -489,7 +812,7 @@ class DBMS_worker:
             if not data_row:
                 return None
 
-            return self._execute(
+            return self.db.execute(
                 """
                 INSERT INTO rules (
                     rule_data_id,
@@ -529,7 +852,7 @@ class DBMS_worker:
             return []
 
         try:
-            result = self._execute(
+            result = self.db.query(
                 """
                 SELECT 
                     r.rule_id,
@@ -558,8 +881,81 @@ class DBMS_worker:
                 }
                 for row in result
             ]
-        except Exception as e:
-            return []
+        except mysql.connector.Error as e:
+            log.error("Ошибка получения активных правил", error=str(e))
+            return None
+
+    def get_rules_version(self) -> int | None:
+        """
+        Получает текущую версию набора правил.
+
+        Returns:
+            int | None: Значение счётчика rules_version или None при ошибке
+        """
+        try:
+            row = self.db.query_one(
+                "SELECT version FROM rules_version WHERE version_id = 1"
+            )
+            return row[0] if row else None
+        except mysql.connector.Error as e:
+            log.error("Ошибка получения версии правил", error=str(e))
+            return None
+
+    def get_active_rules(self) -> list[dict] | None:
+        """
+        Получает все активные правила вместе с текущими значениями их параметров.
+
+        Returns:
+            list[dict] | None: None при ошибке, иначе список правил в формате:
+            {
+                "rule_id": int,
+                "source_device": str (UUID источника),
+                "parameter": str,
+                "condition": int,
+                "threshold": int,
+                "target_device": str (UUID исполнителя),
+                "message": str,
+                "value": int (текущее значение параметра),
+                "timestamp": datetime (время замера)
+            }
+        """
+        try:
+            result = self.db.query(
+                """
+                SELECT
+                    r.rule_id,
+                    s.device_uuid,
+                    a.data_name,
+                    r.rule_condition,
+                    r.rule_value,
+                    t.device_uuid,
+                    r.rule_message,
+                    a.data_value,
+                    a.data_timestamp
+                FROM rules r
+                JOIN actual_data a ON r.rule_data_id = a.data_id
+                JOIN devices s ON a.data_device_id = s.device_id
+                JOIN devices t ON r.rule_device_id = t.device_id
+                WHERE r.is_active = TRUE
+                """
+            )
+            return [
+                {
+                    "rule_id": row[0],
+                    "source_device": row[1],
+                    "parameter": row[2],
+                    "condition": row[3],
+                    "threshold": row[4],
+                    "target_device": row[5],
+                    "message": row[6],
+                    "value": row[7],
+                    "timestamp": row[8],
+                }
+                for row in result
+            ]
+        except mysql.connector.Error as e:
+            log.error("Ошибка получения активных правил", error=str(e))
+            return None
 
     def remove_rule(self, rule_id: int) -> bool:
         """
@@ -572,6 +968,6 @@ class DBMS_worker:
             bool: True если правило было удалено
         """
         try:
-            return self._execute("DELETE FROM rules WHERE rule_id = %s", (rule_id,)).rowcount > 0
+            return self.db.execute("DELETE FROM rules WHERE rule_id = %s", (rule_id,)).rowcount > 0
         except Exception as e:
             return False
\ No newline at end of file
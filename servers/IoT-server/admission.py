@@ -0,0 +1,113 @@
+import math
+import time
+import random
+import threading
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        """
+        Ограничитель частоты событий по алгоритму token bucket.
+
+        Args:
+            rate (float): Скорость пополнения, событий в секунду
+            burst (int): Ёмкость корзины - допустимый всплеск событий
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self) -> None:
+        """Начисляет токены за время, прошедшее с прошлого обращения"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """
+        Забирает один токен, если он есть.
+
+        Returns:
+            bool: True если событие разрешено
+        """
+        with self.lock:
+            self.refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self) -> float:
+        """
+        Returns:
+            float: Время в секундах до появления следующего токена
+        """
+        with self.lock:
+            self.refill()
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class AdmissionControl:
+    def __init__(
+        self, max_sessions: int, login_rate: float, login_burst: int, retry_after: int
+    ):
+        """
+        Контроль допуска новых подключений к IoT-серверу.
+
+        Подключение допускается, если число активных сессий меньше max_sessions
+        и ограничитель частоты входов разрешает ещё один вход. Иначе устройству
+        предлагается повторить попытку позже, причём задержка случайно
+        растягивается до двукратной, чтобы повторные попытки не приходили разом.
+
+        Args:
+            max_sessions (int): Максимальное число одновременных сессий
+            login_rate (float): Допустимая частота входов в секунду
+            login_burst (int): Допустимый всплеск входов
+            retry_after (int): Минимальная задержка повторной попытки в секундах
+
+        Attributes:
+            sessions (int): Число активных сессий
+            rejected (int): Число отклонённых подключений
+        """
+        self.max_sessions = max_sessions
+        self.login_limiter = TokenBucket(login_rate, login_burst)
+        self.retry_after = retry_after
+        self.sessions = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def try_admit(self) -> int | None:
+        """
+        Пытается занять место для новой сессии.
+
+        Returns:
+            int | None: None если подключение допущено (место нужно освободить
+            через release), иначе рекомендуемая задержка повторной попытки в секундах
+        """
+        with self.lock:
+            if self.sessions >= self.max_sessions:
+                delay = self.retry_after
+            elif not self.login_limiter.try_acquire():
+                delay = max(self.retry_after, math.ceil(self.login_limiter.wait_time()))
+            else:
+                self.sessions += 1
+                return None
+            self.rejected += 1
+        return delay + random.randint(0, delay)
+
+    def release(self) -> None:
+        """
+        Освобождает место завершившейся сессии.
+        """
+        with self.lock:
+            self.sessions -= 1
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: {'sessions': int, 'rejected': int}
+        """
+        with self.lock:
+            return {"sessions": self.sessions, "rejected": self.rejected}
@@ -0,0 +1,357 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from main import Server
+from connection import Connection
+from transport.wire_format import RESUME_KEY, RESUME_DATA_KEY, RECONNECT_KEY
+from transport import read_header_async, read_payload_async, write_frame
+from config import (
+    ASYNC_LISTEN_BACKLOG,
+    DB_EXECUTOR_WORKERS,
+    LOGIN_TIMEOUT,
+    METRICS_PORT,
+    DRAIN_TIMEOUT,
+)
+
+
+class AsyncServer(Server):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        no_uuid: str,
+        reuse_port: bool = False,
+        metrics_port: int = METRICS_PORT,
+        listener=None,
+        takeover_conn=None,
+    ):
+        """
+        Инициализирует IoT-сервер, обслуживающий все подключения в одном цикле событий.
+
+        Протокол обмена полностью совпадает с потоковым сервером, но вместо потока
+        на устройство используется сопрограмма, а обращения к БД выполняются
+        в ограниченном пуле потоков.
+
+        Args:
+            host (str): IP-адрес для прослушивания подключений
+            port (int): Порт для входящих соединений
+            password (str): Секретный пароль для аутентификации устройств
+            no_uuid (str): Специальный UUID для новых неподключенных устройств
+            reuse_port (bool, optional): Слушать порт совместно с другими
+                процессами-обработчиками (SO_REUSEPORT)
+            metrics_port (int, optional): Порт HTTP-эндпоинта метрик, 0 - отключён
+            listener (socket.socket, optional): Слушающий сокет прежнего процесса
+            takeover_conn (socket.socket, optional): Соединение с прежним процессом
+
+        Attributes:
+            executor (ThreadPoolExecutor): Пул потоков для блокирующих вызовов БД
+            server (asyncio.Server | None): Запущенный asyncio-сервер
+            loop (asyncio.AbstractEventLoop | None): Цикл событий сервера
+            drain_requested (asyncio.Event | None): Запрос плавной остановки
+        """
+        super().__init__(
+            host, port, password, no_uuid, reuse_port, metrics_port, listener, takeover_conn
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db"
+        )
+        self.server = None
+        self.loop = None
+        self.drain_requested = None
+
+    async def run_db(self, func, *args):
+        """
+        Выполняет блокирующую функцию в пуле потоков БД.
+
+        Args:
+            func (callable): Вызываемая функция
+            *args: Аргументы функции
+
+        Returns:
+            object: Результат выполнения функции
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def receive_data(self, conn: Connection) -> dict:
+        """
+        Принимает и десериализует данные из потока в согласованном формате.
+
+        Args:
+            conn (Connection): Активное клиентское подключение
+
+        Returns:
+            dict: Расшифрованные данные в виде словаря
+
+        Raises:
+            ConnectionError: При закрытии соединения до получения всего сообщения
+                или превышении MAX_FRAME_SIZE
+        """
+        length = await read_header_async(conn.reader)
+        started = time.perf_counter()
+        payload = await read_payload_async(conn.reader, length)
+        self.metrics.observe("recv", time.perf_counter() - started)
+        return self.decode_frame(conn, payload)
+
+    async def send_data(self, conn: Connection, data: object) -> None:
+        """
+        Сериализует в согласованном формате и отправляет данные в поток.
+
+        Args:
+            conn (Connection): Активное клиентское подключение
+            data (object): Данные для отправки (обычно словарь)
+        """
+        with self.metrics.time("send"):
+            write_frame(conn.writer, conn.encode(data))
+            await conn.writer.drain()
+
+    def push_message(self, conn: Connection, message: dict) -> None:
+        """
+        Передаёт кадр без запроса в цикл событий: кадр шифруется и ставится
+        в очередь записи в потоке цикла, поэтому не перемешивается с ответами.
+
+        Args:
+            conn (Connection): Подключение устройства
+            message (dict): Кадр {'push': True, ...}
+        """
+        self.loop.call_soon_threadsafe(self.write_pushed, conn, message)
+
+    def write_pushed(self, conn: Connection, message: dict) -> None:
+        """
+        Ставит кадр без запроса в очередь записи подключения (в потоке цикла событий).
+
+        Args:
+            conn (Connection): Подключение устройства
+            message (dict): Кадр {'push': True, ...}
+        """
+        if not conn.writer.is_closing():
+            with self.metrics.time("send"):
+                write_frame(conn.writer, conn.encode(message))
+
+    async def perform_login(self, conn: Connection) -> tuple[str, str] | None:
+        """
+        Выполняет процесс аутентификации или возобновления сессии
+        устройства (см. Server.perform_login).
+
+        Returns:
+            tuple | None: Кортеж (имя устройства, UUID) или None при ошибке
+        """
+        try:
+            auth_data = await self.receive_data(conn)
+            if RESUME_KEY in auth_data:
+                resumed = self.prepare_resume(conn, auth_data)
+                if resumed is not None:
+                    response, codec, cipher = resumed
+                    response.update(
+                        await self.run_db(
+                            self.process_message,
+                            conn.device_uuid,
+                            auth_data.get(RESUME_DATA_KEY) or {},
+                        )
+                    )
+                    await self.send_data(conn, response)
+                    conn.upgrade(codec, cipher)
+                    return conn.device_name, conn.device_uuid
+                await self.send_data(conn, {"status": "expired"})
+                auth_data = await self.receive_data(conn)
+
+            if auth_data.get("password") != self.password:
+                return None
+
+            device_info = await self.receive_data(conn)
+            response, codec, cipher = self.prepare_login(conn, device_info)
+            await self.send_data(conn, response)
+            conn.upgrade(codec, cipher)
+
+            return conn.device_name, conn.device_uuid
+
+        except Exception as e:
+            self.log.error("Ошибка авторизации", error=str(e))
+            return None
+
+    async def reject_login(self, conn: Connection, retry_after: int) -> None:
+        """
+        Отвечает устройству, что сервер занят (см. Server.reject_login).
+
+        Args:
+            conn (Connection): Клиентское подключение
+            retry_after (int): Рекомендуемая задержка повторной попытки в секундах
+        """
+        try:
+            auth_data = await self.receive_data(conn)
+            if RESUME_KEY in auth_data:
+                await self.send_data(
+                    conn, {"status": "busy", "retry_after": retry_after}
+                )
+            elif auth_data.get("password") == self.password:
+                await self.receive_data(conn)
+                await self.send_data(
+                    conn, {"status": "busy", "retry_after": retry_after}
+                )
+        except Exception:
+            pass
+        finally:
+            conn.close()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Обрабатывает жизненный цикл клиентского подключения в цикле событий.
+
+        Args:
+            reader (asyncio.StreamReader): Поток чтения клиентского подключения
+            writer (asyncio.StreamWriter): Поток записи клиентского подключения
+        """
+        conn = Connection(
+            addr=writer.get_extra_info("peername"), reader=reader, writer=writer
+        )
+        retry_after = self.admission.try_admit()
+        if retry_after is not None:
+            try:
+                await asyncio.wait_for(
+                    self.reject_login(conn, retry_after), LOGIN_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                conn.close()
+            return
+
+        try:
+            device_info = await asyncio.wait_for(
+                self.perform_login(conn), LOGIN_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            device_info = None
+        if not device_info:
+            conn.close()
+            self.admission.release()
+            return
+
+        device_name, device_uuid = device_info
+        self.log.info(
+            "Подключение установлено",
+            uuid=device_uuid,
+            device=device_name,
+            resumed=conn.resumed,
+        )
+        if not conn.resumed:
+            await self.run_db(self.db_worker.add_device, device_uuid, device_name)
+
+        with self.lock:
+            self.connections.append(conn)
+        self.register_connection(conn)
+        try:
+            while self.running:
+                sensor_data = await self.receive_data(conn)
+                self.log.sampled(
+                    "Показания", uuid=device_uuid, device=device_name, data=sensor_data
+                )
+                response = await self.run_db(
+                    self.process_message, device_uuid, sensor_data
+                )
+                if self.draining:
+                    response[RECONNECT_KEY] = self.reconnect_delay()
+                    await self.send_data(conn, response)
+                    break
+                await self.send_data(conn, response)
+        except Exception as e:
+            self.log.warning(
+                "Соединение прервано", uuid=device_uuid, device=device_name, error=str(e)
+            )
+        finally:
+            self.unregister_push_target(conn)
+            conn.close()
+            with self.lock:
+                if conn in self.connections:
+                    self.connections.remove(conn)
+            await self.run_db(self.on_device_disconnected, conn)
+            self.admission.release()
+            self.log.info("Отключен", uuid=device_uuid, device=device_name)
+
+    @staticmethod
+    def raise_open_files_limit() -> None:
+        """
+        Поднимает мягкий лимит открытых дескрипторов до жёсткого,
+        чтобы процесс мог держать десятки тысяч соединений.
+        """
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    async def serve(self) -> None:
+        """
+        Запускает asyncio-сервер и обслуживает подключения до запроса
+        плавной остановки (SIGTERM или передача сокета новому процессу).
+        """
+        self.loop = asyncio.get_running_loop()
+        self.drain_requested = asyncio.Event()
+        # Слушающий сокет создаётся сервером (а не asyncio), чтобы его можно
+        # было передать новому процессу через ListenerHandoff. listen() для него
+        # вызывает asyncio с переданной очередью backlog, в том числе для
+        # сокета, унаследованного от прежнего процесса
+        if not self.inherited:
+            self.sock.bind((self.host, self.port))
+        self.server = await asyncio.start_server(
+            self.handle_connection, sock=self.sock, backlog=ASYNC_LISTEN_BACKLOG
+        )
+        self.running = True
+        self.start_background_tasks()
+        self.start_handoff()
+        if threading.current_thread() is threading.main_thread():
+            self.loop.add_signal_handler(signal.SIGTERM, self.request_drain)
+        self.log.info(
+            "Сервер (asyncio) запущен",
+            address=f"{self.host}:{self.port}",
+            takeover=self.inherited,
+        )
+
+        await self.drain_requested.wait()
+        await self.drain()
+
+    def request_drain(self) -> None:
+        """
+        Запрашивает плавную остановку. Может вызываться из любого потока.
+        """
+        self.loop.call_soon_threadsafe(self.drain_requested.set)
+
+    async def drain(self) -> None:
+        """
+        Плавно останавливает приём и обслуживание подключений (см. Server.drain).
+        Остановка фоновых задач и запись буферов выполняются в shutdown.
+        """
+        self.draining = True
+        self.server.close()
+        self.log.info("Плавная остановка", connections=len(self.connections))
+        self.notify_draining()
+
+        deadline = self.loop.time() + DRAIN_TIMEOUT
+        while self.connections and self.loop.time() < deadline:
+            await asyncio.sleep(0.5)
+
+    def start(self) -> None:
+        """
+        Запускает цикл событий сервера. После плавной остановки или
+        KeyboardInterrupt останавливает сервер с записью буферов.
+        """
+        self.raise_open_files_limit()
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """
+        Останавливает сервер и пул потоков БД.
+        """
+        super().shutdown()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -5,5 +5,100 @@ LOC_SOCK_SERV_PORT = 9095
 
 SEND_STATE_DELAY = 10
 
+# Планирование опроса: задержка устройства выбирается из
+# [delay, delay * (1 + SCHEDULE_SPREAD)] по наименее загруженной секунде,
+# под нагрузкой (SCHEDULE_TARGET_RATE выходов на связь в секунду) окно
+# расширяется до delay * SCHEDULE_MAX_STRETCH
+SCHEDULE_SPREAD = 1.0
+SCHEDULE_TARGET_RATE = 100
+SCHEDULE_MAX_STRETCH = 3
+SCHEDULE_WINDOW = 60
+
+# Проверка правил при получении показаний источника и отправка команд
+# исполнителю по его открытому подключению, не дожидаясь его опроса
+PUSH_COMMANDS = True
+
+# Время жизни токена возобновления сессии в секундах. Устройство с действующим
+# токеном переподключается одним кадром с показаниями вместо полного входа
+SESSION_TOKEN_TTL = 300
+
+# Плавная остановка (SIGTERM или передача сокета новому процессу): приём
+# подключений прекращается, устройствам предлагается переподключиться через
+# случайную задержку до DRAIN_RECONNECT_SPREAD секунд, по истечении
+# DRAIN_TIMEOUT оставшиеся подключения закрываются
+DRAIN_TIMEOUT = 60
+DRAIN_RECONNECT_SPREAD = 10
+# Unix-сокет для передачи слушающего сокета новому процессу (--takeover), "" - отключено
+TAKEOVER_SOCKET = "/tmp/iot-server.sock"
+
 ENCRYPTION_KEY = b"WahrheitUndLiebe"
 PASSWORD = "Tagiiiiil!!!"
+
+# "threads" - отдельный поток на каждое устройство, "asyncio" - один цикл событий
+SERVER_MODE = "threads"
+ASYNC_LISTEN_BACKLOG = 1024
+DB_EXECUTOR_WORKERS = 16
+# Тип БД: "mysql" - сервер MariaDB, "sqlite" - встроенная БД SQLite в режиме WAL
+# (файлы в каталоге data/ в корне проекта) для установки всех компонентов на одном компьютере
+DB_BACKEND = "mysql"
+# Пул соединений с БД (dbaccess) и число подготовленных на сервере запросов на соединение
+DB_POOL_SIZE = 20
+DB_PREPARED_CACHE_SIZE = 64
+RULES_REFRESH_INTERVAL = 5
+DEVICE_ID_CACHE_SIZE = 10000
+
+# Последние показания в памяти: замеров в кольцевом буфере на пару
+# (устройство, параметр), 16 байт на замер
+RECENT_READINGS_SIZE = 120
+
+# Отложенная запись показаний в БД
+INGEST_FLUSH_INTERVAL = 1.0
+INGEST_BATCH_SIZE = 500
+INGEST_MAX_PENDING = 10000
+INGEST_PUT_TIMEOUT = 5
+
+HEARTBEAT_FLUSH_INTERVAL = 5
+
+# Секции data_history по времени замера: "day" или "month". Секции создаются
+# заранее на HISTORY_PARTITIONS_AHEAD периодов вперёд, секции старше
+# HISTORY_RETENTION_DAYS дней удаляются целиком (0 - хранить всю историю)
+HISTORY_PARTITION_UNIT = "day"
+HISTORY_PARTITIONS_AHEAD = 7
+HISTORY_RETENTION_DAYS = 90
+HISTORY_MAINTENANCE_INTERVAL = 3600
+
+# Срок хранения агрегатов истории в днях по разрешениям (0 - хранить всё).
+# Минутные агрегаты нужны только графикам за короткий период и растут быстрее всех
+ROLLUP_RETENTION_DAYS = {"minute": 7, "hour": 400, "day": 0}
+
+# Число процессов-обработчиков. При значении больше 1 каждый процесс
+# слушает порт через SO_REUSEPORT, ядро распределяет между ними подключения
+WORKER_PROCESSES = 1
+WORKER_STATS_INTERVAL = 10
+
+# Пакеты замеров с метками времени устройства
+MAX_SAMPLES_PER_FRAME = 60
+MAX_CLOCK_SKEW = 60
+
+# Контроль допуска подключений (в каждом процессе-обработчике отдельно)
+LISTEN_BACKLOG = 512
+MAX_SESSIONS = 2000
+LOGIN_RATE = 50
+LOGIN_BURST = 100
+BUSY_RETRY_AFTER = 5
+LOGIN_TIMEOUT = 10
+REJECT_WORKERS = 4
+
+# HTTP-эндпоинт метрик в формате Prometheus (GET /metrics). 0 - отключён.
+# Процесс-обработчик с номером N слушает METRICS_PORT + 1 + N.
+# Там же web-сервер читает последние показания: GET /readings[?device=UUID]
+# и GET /readings/window?device=UUID&param=имя&seconds=300
+METRICS_ADDR = "127.0.0.1"
+METRICS_PORT = 9100
+
+# Журнал: уровень (DEBUG, INFO, WARNING, ERROR), формат ("text" или "json"),
+# запись каждого N-го сообщения о принятом кадре, ёмкость очереди записи
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "text"
+LOG_FRAME_SAMPLE = 10
+LOG_QUEUE_SIZE = 10000
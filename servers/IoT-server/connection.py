@@ -0,0 +1,129 @@
+import os
+import sys
+import socket
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from encryption import encrypt, decrypt_bytes
+from transport.session import SessionCipher
+from transport.wire_format import JSON_CODEC, JsonCodec
+from transport import FrameReader
+
+
+class Connection:
+    def __init__(
+        self,
+        sock: socket.socket = None,
+        addr: tuple = None,
+        reader: asyncio.StreamReader = None,
+        writer: asyncio.StreamWriter = None,
+    ):
+        """
+        Состояние подключения устройства: транспорт и согласованные параметры протокола.
+
+        Для потокового сервера задаётся sock, для asyncio-сервера - reader и writer.
+
+        Args:
+            sock (socket.socket, optional): Клиентский сокет
+            addr (tuple, optional): Кортеж (IP-адрес, порт) клиента
+            reader (asyncio.StreamReader, optional): Поток чтения
+            writer (asyncio.StreamWriter, optional): Поток записи
+
+        Attributes:
+            codec (JsonCodec): Формат сообщений, согласованный при входе
+            cipher (SessionCipher | None): Шифр сессии или None для AES-EAX с общим ключом
+            frames (FrameReader | None): Чтение кадров из sock с переиспользуемым буфером
+            device_name (str | None): Имя устройства после входа
+            device_uuid (str | None): UUID устройства после входа
+            push (bool): Устройство принимает команды без запроса
+            resumed (bool): Сессия возобновлена по токену без полного входа
+            send_lock (threading.Lock): Блокировка записи, чтобы ответ и команда,
+                отправленная из другого потока, не перемешивались и не нарушали
+                порядок счётчика шифра сессии
+        """
+        self.sock = sock
+        self.addr = addr
+        self.reader = reader
+        self.writer = writer
+        self.codec: JsonCodec = JSON_CODEC
+        self.cipher: SessionCipher | None = None
+        self.frames = FrameReader(sock) if sock is not None else None
+        self.device_name = None
+        self.device_uuid = None
+        self.push = False
+        self.resumed = False
+        self.send_lock = threading.Lock()
+
+    def encrypt(self, payload: bytes) -> bytes:
+        """
+        Шифрует сериализованное сообщение согласованным шифром.
+
+        Args:
+            payload (bytes): Сериализованное сообщение
+
+        Returns:
+            bytes: Зашифрованный кадр без заголовка длины
+        """
+        if self.cipher is not None:
+            return self.cipher.encrypt(payload)
+        return encrypt(payload)
+
+    def decrypt(self, payload: bytes) -> bytes:
+        """
+        Дешифрует кадр согласованным шифром.
+
+        Args:
+            payload (bytes): Зашифрованный кадр без заголовка длины
+
+        Returns:
+            bytes: Сериализованное сообщение
+        """
+        if self.cipher is not None:
+            return self.cipher.decrypt(payload)
+        return decrypt_bytes(payload)
+
+    def encode(self, data: dict) -> bytes:
+        """
+        Сериализует и шифрует сообщение.
+
+        Args:
+            data (dict): Сообщение
+
+        Returns:
+            bytes: Зашифрованный кадр без заголовка длины
+        """
+        return self.encrypt(self.codec.encode(data))
+
+    def decode(self, payload: bytes) -> dict:
+        """
+        Дешифрует и десериализует сообщение.
+
+        Args:
+            payload (bytes): Зашифрованный кадр без заголовка длины
+
+        Returns:
+            dict: Сообщение
+        """
+        return self.codec.decode(self.decrypt(payload))
+
+    def upgrade(self, codec: JsonCodec, cipher: SessionCipher | None) -> None:
+        """
+        Переключает подключение на согласованные при входе формат и шифр.
+
+        Args:
+            codec (JsonCodec): Формат сообщений
+            cipher (SessionCipher | None): Шифр сессии
+        """
+        self.codec = codec
+        self.cipher = cipher
+
+    def close(self) -> None:
+        """
+        Закрывает транспорт подключения.
+        """
+        if self.sock is not None:
+            self.sock.close()
+        if self.writer is not None:
+            self.writer.close()
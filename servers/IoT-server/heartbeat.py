@@ -0,0 +1,116 @@
+import threading
+from datetime import datetime
+
+from DBMS_worker import DBMS_worker
+
+
+class HeartbeatTracker:
+    def __init__(self, db_worker: DBMS_worker, flush_interval: float):
+        """
+        Учёт времени последней связи с устройствами в памяти.
+
+        Отметки копятся в памяти и раз в flush_interval секунд записываются
+        в devices.device_last_communication одним запросом UPDATE.
+
+        Args:
+            db_worker (DBMS_worker): Объект для работы с базой данных
+            flush_interval (float): Интервал записи отметок в секундах
+
+        Attributes:
+            last_seen (dict): {device_id: время последнего сообщения}
+            dirty (set): ID устройств, отметки которых ещё не записаны в БД
+        """
+        self.db_worker = db_worker
+        self.flush_interval = flush_interval
+        self.last_seen = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def touch(self, device_id: int) -> None:
+        """
+        Отмечает получение сообщения от устройства.
+
+        Args:
+            device_id (int): ID устройства
+        """
+        with self.lock:
+            self.last_seen[device_id] = datetime.now()
+            self.dirty.add(device_id)
+
+    def get_last_seen(self, device_id: int) -> datetime | None:
+        """
+        Возвращает точное время последнего сообщения устройства.
+
+        Args:
+            device_id (int): ID устройства
+
+        Returns:
+            datetime | None: Время последнего сообщения или None,
+            если устройство не выходило на связь с момента запуска сервера
+        """
+        return self.last_seen.get(device_id)
+
+    def flush(self, device_ids: list[int] = None) -> int:
+        """
+        Записывает несохранённые отметки в БД одним запросом.
+
+        Args:
+            device_ids (list[int], optional): Записать только указанные устройства
+
+        Returns:
+            int: Число записанных отметок
+        """
+        with self.lock:
+            if device_ids is None:
+                selected = self.dirty
+            else:
+                selected = self.dirty.intersection(device_ids)
+            timestamps = {device_id: self.last_seen[device_id] for device_id in selected}
+            self.dirty -= selected
+
+        if not timestamps:
+            return 0
+
+        if not self.db_worker.update_devices_communication_timestamps(timestamps):
+            with self.lock:
+                self.dirty |= timestamps.keys()
+            return 0
+        return len(timestamps)
+
+    def forget(self, device_id: int) -> None:
+        """
+        Записывает отметку отключившегося устройства и убирает его из памяти.
+
+        Args:
+            device_id (int): ID устройства
+        """
+        self.flush([device_id])
+        with self.lock:
+            if device_id not in self.dirty:
+                self.last_seen.pop(device_id, None)
+
+    def run(self) -> None:
+        """
+        Фоновый цикл периодической записи отметок.
+        """
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def start(self) -> None:
+        """
+        Запускает фоновую запись отметок.
+        """
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновую запись и сохраняет оставшиеся отметки.
+        """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self.flush()
@@ -0,0 +1,191 @@
+import threading
+from datetime import datetime, timedelta
+
+from DBMS_worker import DBMS_worker
+from dbaccess.migrations import ROLLUPS
+from logutil import Logger
+
+log = Logger("iot-server.history")
+
+UNIT_DAY = "day"
+UNIT_MONTH = "month"
+
+
+def period_start(moment: datetime, unit: str) -> datetime:
+    """
+    Args:
+        moment (datetime): Момент времени
+        unit (str): Период секции - UNIT_DAY или UNIT_MONTH
+
+    Returns:
+        datetime: Начало периода, содержащего moment
+    """
+    start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start.replace(day=1) if unit == UNIT_MONTH else start
+
+
+def next_period(start: datetime, unit: str) -> datetime:
+    """
+    Args:
+        start (datetime): Начало периода
+        unit (str): Период секции - UNIT_DAY или UNIT_MONTH
+
+    Returns:
+        datetime: Начало следующего периода
+    """
+    if unit == UNIT_MONTH:
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def partition_name(start: datetime, unit: str) -> str:
+    """
+    Args:
+        start (datetime): Начало периода секции
+        unit (str): Период секции - UNIT_DAY или UNIT_MONTH
+
+    Returns:
+        str: Имя секции вида p20261018 (день) или p202610 (месяц)
+    """
+    return start.strftime("p%Y%m" if unit == UNIT_MONTH else "p%Y%m%d")
+
+
+class HistoryRetention:
+    def __init__(
+        self,
+        db_worker: DBMS_worker,
+        unit: str,
+        ahead: int,
+        retention_days: int,
+        interval: float,
+        rollup_retention_days: dict = None,
+    ):
+        """
+        Обслуживание секций data_history и срока хранения агрегатов истории.
+
+        Раз в interval секунд заранее создаёт секции на ahead периодов вперёд,
+        чтобы новые показания не попадали в общую секцию p_future, и удаляет
+        секции, все строки которых старше retention_days дней. Удаление секции -
+        операция над метаданными, таблица не блокируется на время построчного DELETE.
+        Затем удаляет агрегаты history_minute/hour/day старше срока их разрешения.
+
+        Args:
+            db_worker (DBMS_worker): Объект для работы с базой данных
+            unit (str): Период секции - UNIT_DAY или UNIT_MONTH
+            ahead (int): Число будущих периодов, для которых секции создаются заранее
+            retention_days (int): Срок хранения истории в днях, 0 - без удаления
+            interval (float): Интервал обслуживания в секундах
+            rollup_retention_days (dict, optional): {разрешение ROLLUPS: срок хранения
+                агрегатов в днях, 0 - без удаления}. По умолчанию агрегаты не удаляются
+
+        Attributes:
+            created (int): Число созданных секций с момента запуска
+            dropped (int): Число удалённых секций с момента запуска
+        """
+        if unit not in (UNIT_DAY, UNIT_MONTH):
+            raise ValueError(f"Неизвестный период секций истории: {unit}")
+        self.db_worker = db_worker
+        self.unit = unit
+        self.ahead = ahead
+        self.retention_days = retention_days
+        self.interval = interval
+        self.rollup_retention_days = rollup_retention_days or {}
+        self.created = 0
+        self.dropped = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def plan(self, now: datetime = None) -> tuple[list[tuple[str, datetime]], datetime]:
+        """
+        Рассчитывает желаемые секции и границу удаления.
+
+        Args:
+            now (datetime, optional): Текущее время
+
+        Returns:
+            tuple: (список (имя секции, верхняя граница) от текущего периода
+            на ahead периодов вперёд, граница удаления)
+        """
+        now = now or datetime.now()
+        start = period_start(now, self.unit)
+        bounds = []
+        for _ in range(self.ahead + 1):
+            end = next_period(start, self.unit)
+            bounds.append((partition_name(start, self.unit), end))
+            start = end
+
+        if self.retention_days:
+            cutoff = now - timedelta(days=self.retention_days)
+        else:
+            cutoff = datetime.min
+        return bounds, cutoff
+
+    def rollup_cutoffs(self, now: datetime = None) -> dict[str, datetime]:
+        """
+        Args:
+            now (datetime, optional): Текущее время
+
+        Returns:
+            dict: {таблица агрегатов: граница удаления} для разрешений
+            с ограниченным сроком хранения
+        """
+        now = now or datetime.now()
+        return {
+            ROLLUPS[resolution][0]: now - timedelta(days=days)
+            for resolution, days in self.rollup_retention_days.items()
+            if days
+        }
+
+    def maintain(self) -> dict | None:
+        """
+        Создаёт недостающие будущие секции, удаляет устаревшие секции
+        и агрегаты истории. Агрегаты удаляет процесс, выполнивший
+        обслуживание секций.
+
+        Returns:
+            dict | None: {'created': list[str], 'dropped': list[str],
+            'rollups_deleted': int} (для SQLite также 'deleted' - число удалённых
+            строк истории) или None, если обслуживание выполняет другой процесс
+            или произошла ошибка
+        """
+        bounds, cutoff = self.plan()
+        result = self.db_worker.maintain_history_partitions(bounds, cutoff)
+        if result is not None:
+            cutoffs = self.rollup_cutoffs()
+            deleted = self.db_worker.delete_rollups_before(cutoffs) if cutoffs else None
+            result["rollups_deleted"] = sum((deleted or {}).values())
+        if result and (
+            result["created"]
+            or result["dropped"]
+            or result.get("deleted")
+            or result["rollups_deleted"]
+        ):
+            self.created += len(result["created"])
+            self.dropped += len(result["dropped"])
+            log.info("Секции истории обновлены", **result)
+        return result
+
+    def run(self) -> None:
+        """
+        Фоновый цикл обслуживания секций.
+        """
+        while True:
+            self.maintain()
+            if self.stop_event.wait(self.interval):
+                return
+
+    def start(self) -> None:
+        """
+        Запускает фоновое обслуживание секций.
+        """
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновое обслуживание секций.
+        """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
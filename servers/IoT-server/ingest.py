@@ -0,0 +1,234 @@
+import time
+import threading
+from datetime import datetime
+
+from mysql.connector import errors
+
+from DBMS_worker import DBMS_worker
+from logutil import Logger
+from metrics import Metrics
+
+log = Logger("iot-server.ingest")
+
+# Ошибки недоступности БД: пакет возвращается в буфер и повторяется целиком.
+# Остальные ошибки вызваны содержимым строк, такой пакет делится пополам
+# до строки с ошибкой, которая отбрасывается
+UNAVAILABLE_ERRORS = (errors.OperationalError, errors.InterfaceError, errors.PoolError)
+
+
+class IngestBatcher:
+    def __init__(
+        self,
+        db_worker: DBMS_worker,
+        flush_interval: float,
+        batch_size: int,
+        max_pending: int,
+        metrics: Metrics = None,
+    ):
+        """
+        Буфер отложенной записи показаний в actual_data.
+
+        Показания всех подключений копятся в общем буфере и записываются
+        одним многострочным upsert раз в flush_interval секунд или сразу
+        по достижении batch_size строк. При заполнении буфера до max_pending
+        строк добавление блокируется, пока фоновая запись не освободит место.
+
+        Каждый пакет записывается одной транзакцией. Если БД недоступна,
+        пакет возвращается в буфер; если запись не проходит из-за данных,
+        пакет делится пополам, пока строка с ошибкой не будет найдена
+        и отброшена, а остальные строки записаны.
+
+        Args:
+            db_worker (DBMS_worker): Объект для работы с базой данных
+            flush_interval (float): Максимальный интервал между записями в секундах
+            batch_size (int): Число строк, при котором запись начинается досрочно
+            max_pending (int): Максимальное число строк в буфере
+            metrics (Metrics, optional): Метрики сервера для учёта времени записи (этап db_upsert)
+
+        Attributes:
+            rows (list[tuple]): Буфер строк (device_id, параметр, значение, время)
+            flushed (int): Число записанных строк
+            flushes (int): Число выполненных записей в БД
+            dropped (int): Число строк, отброшенных из-за ошибки записи
+        """
+        self.db_worker = db_worker
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.metrics = metrics
+        self.rows = []
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.flushed = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def put(
+        self,
+        device_id: int,
+        data: dict,
+        timestamp: datetime = None,
+        timeout: float = None,
+    ) -> bool:
+        """
+        Добавляет показания устройства в буфер.
+
+        Args:
+            device_id (int): ID устройства
+            data (dict): Словарь {параметр: значение}
+            timestamp (datetime, optional): Время замера. По умолчанию - текущее
+            timeout (float, optional): Максимальное ожидание свободного места
+
+        Returns:
+            bool: False если место в буфере так и не освободилось
+        """
+        if not data:
+            return True
+
+        timestamp = timestamp or datetime.now()
+        rows = [(device_id, name, value, timestamp) for name, value in data.items()]
+        return self.put_rows(rows, timeout)
+
+    def put_samples(
+        self,
+        device_id: int,
+        samples: list[tuple[datetime, dict]],
+        timeout: float = None,
+    ) -> bool:
+        """
+        Добавляет в буфер пакет замеров устройства с их метками времени.
+
+        Args:
+            device_id (int): ID устройства
+            samples (list[tuple]): Замеры (время замера, {параметр: значение})
+            timeout (float, optional): Максимальное ожидание свободного места
+
+        Returns:
+            bool: False если место в буфере так и не освободилось
+        """
+        rows = [
+            (device_id, name, value, timestamp)
+            for timestamp, data in sorted(samples, key=lambda sample: sample[0])
+            for name, value in data.items()
+        ]
+        return self.put_rows(rows, timeout)
+
+    def put_rows(self, rows: list[tuple], timeout: float = None) -> bool:
+        """
+        Добавляет готовые строки в буфер, ожидая свободного места.
+
+        Args:
+            rows (list[tuple]): Строки (device_id, параметр, значение, время)
+            timeout (float, optional): Максимальное ожидание свободного места
+
+        Returns:
+            bool: False если место в буфере так и не освободилось
+        """
+        if not rows:
+            return True
+
+        with self.condition:
+            has_room = self.condition.wait_for(
+                lambda: not self.rows
+                or len(self.rows) + len(rows) <= self.max_pending,
+                timeout,
+            )
+            if not has_room:
+                return False
+
+            self.rows.extend(rows)
+            if len(self.rows) >= self.batch_size:
+                self.condition.notify_all()
+        return True
+
+    def flush(self) -> int:
+        """
+        Записывает накопленные строки в БД одной транзакцией.
+
+        Returns:
+            int: Число записанных строк
+        """
+        with self.flush_lock:
+            with self.condition:
+                rows, self.rows = self.rows, []
+                self.condition.notify_all()
+
+            if not rows:
+                return 0
+
+            started = time.perf_counter()
+            written = self.write(rows)
+            if self.metrics is not None:
+                self.metrics.observe("db_upsert", time.perf_counter() - started)
+            return written
+
+    def write(self, rows: list[tuple]) -> int:
+        """
+        Записывает строки одной транзакцией. При недоступности БД строки
+        возвращаются в буфер (в пределах max_pending), при ошибке в данных
+        запись повторяется по половинам, а строка с ошибкой отбрасывается.
+
+        Args:
+            rows (list[tuple]): Строки (device_id, параметр, значение, время)
+
+        Returns:
+            int: Число записанных строк
+        """
+        try:
+            self.db_worker.write_actual_data(rows)
+        except UNAVAILABLE_ERRORS as e:
+            log.warning(
+                "Ошибка записи показаний, строки возвращены в буфер",
+                rows=len(rows),
+                error=str(e),
+            )
+            with self.condition:
+                self.rows = (rows + self.rows)[-self.max_pending:]
+            return 0
+        except Exception as e:
+            if len(rows) == 1:
+                self.dropped += 1
+                log.error("Показание отброшено", row=repr(rows[0]), error=str(e))
+                return 0
+            middle = len(rows) // 2
+            return self.write(rows[:middle]) + self.write(rows[middle:])
+
+        self.flushed += len(rows)
+        self.flushes += 1
+        return len(rows)
+
+    def run(self) -> None:
+        """
+        Фоновый цикл записи буфера по интервалу или по размеру.
+        """
+        while self.running:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: len(self.rows) >= self.batch_size or not self.running,
+                    self.flush_interval,
+                )
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("Ошибка фоновой записи показаний", error=str(e))
+
+    def start(self) -> None:
+        """
+        Запускает фоновую запись буфера.
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновую запись и сохраняет оставшиеся показания.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+        self.flush()
@@ -1,22 +1,109 @@
+import os
+import sys
+import time
+import random
+import signal
 import socket
+import argparse
 import threading
 import uuid
+import logging
 import datetime
-import json
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
 
-from encryption import encrypt, decrypt
 from DBMS_worker import DBMS_worker
+from rule_index import RuleIndex
+from recent import RecentReadings
+from ingest import IngestBatcher
+from heartbeat import HeartbeatTracker
+from history import HistoryRetention
+from admission import AdmissionControl
+from sessions import SessionTokens
+from takeover import ListenerHandoff, receive_listener, confirm_takeover
+from schedule import PollScheduler
+from metrics import Metrics, MetricsServer
+from logutil import Logger, setup_logging
+from connection import Connection
+from transport.wire_format import (
+    JsonCodec,
+    negotiate,
+    BATCH_KEY,
+    TIMESTAMP_KEY,
+    PUSH_KEY,
+    RESUME_KEY,
+    RESUME_DATA_KEY,
+    RECONNECT_KEY,
+    split_sensor_values,
+)
+from transport.session import SessionCipher, negotiate_session
+from transport import send_frame
 from config import (
     NO_UUID,
     LOC_SOCK_SERV_ADDR,
     LOC_SOCK_SERV_PORT,
     PASSWORD,
+    ENCRYPTION_KEY,
     SEND_STATE_DELAY,
+    SCHEDULE_SPREAD,
+    SCHEDULE_TARGET_RATE,
+    SCHEDULE_MAX_STRETCH,
+    SCHEDULE_WINDOW,
+    PUSH_COMMANDS,
+    SESSION_TOKEN_TTL,
+    DRAIN_TIMEOUT,
+    DRAIN_RECONNECT_SPREAD,
+    TAKEOVER_SOCKET,
+    SERVER_MODE,
+    RULES_REFRESH_INTERVAL,
+    RECENT_READINGS_SIZE,
+    DEVICE_ID_CACHE_SIZE,
+    DB_BACKEND,
+    DB_POOL_SIZE,
+    DB_PREPARED_CACHE_SIZE,
+    INGEST_FLUSH_INTERVAL,
+    INGEST_BATCH_SIZE,
+    INGEST_MAX_PENDING,
+    INGEST_PUT_TIMEOUT,
+    HEARTBEAT_FLUSH_INTERVAL,
+    HISTORY_PARTITION_UNIT,
+    HISTORY_PARTITIONS_AHEAD,
+    HISTORY_RETENTION_DAYS,
+    HISTORY_MAINTENANCE_INTERVAL,
+    ROLLUP_RETENTION_DAYS,
+    MAX_SAMPLES_PER_FRAME,
+    MAX_CLOCK_SKEW,
+    WORKER_PROCESSES,
+    WORKER_STATS_INTERVAL,
+    LISTEN_BACKLOG,
+    MAX_SESSIONS,
+    LOGIN_RATE,
+    LOGIN_BURST,
+    BUSY_RETRY_AFTER,
+    LOGIN_TIMEOUT,
+    REJECT_WORKERS,
+    METRICS_ADDR,
+    METRICS_PORT,
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_FRAME_SAMPLE,
+    LOG_QUEUE_SIZE,
 )
 
 
 class Server:
-    def __init__(self, host: str, port: int, password: str, no_uuid: str):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        no_uuid: str,
+        reuse_port: bool = False,
+        metrics_port: int = METRICS_PORT,
+        listener: socket.socket = None,
+        takeover_conn: socket.socket = None,
+    ):
         """
         Инициализирует сервер IoT для управления умной теплицей.
 
@@ -25,95 +112,341 @@ class Server:
             port (int): Порт для входящих соединений
             password (str): Секретный пароль для аутентификации устройств
             no_uuid (str): Специальный UUID для новых неподключенных устройств
+            reuse_port (bool, optional): Слушать порт совместно с другими
+                процессами-обработчиками (SO_REUSEPORT)
+            metrics_port (int, optional): Порт HTTP-эндпоинта метрик, 0 - отключён
+            listener (socket.socket, optional): Уже слушающий сокет, полученный
+                от прежнего процесса (--takeover)
+            takeover_conn (socket.socket, optional): Соединение с прежним процессом
+                для подтверждения готовности
 
         Attributes:
             sock (socket.socket): Основной сокет сервера
             connections (list): Активные клиентские подключения
+            device_connections (dict): {UUID устройства: Connection} - текущее
+                подключение каждого устройства (последнее прошедшее вход)
+            push_targets (dict): {UUID устройства: Connection} - подключения,
+                принимающие команды без запроса
+            last_commands (dict): {UUID устройства: последний отправленный список команд}
+            rejected_values (int): Число отброшенных недопустимых значений показаний
+            rejected_samples (int): Число отброшенных замеров пакетов (без метки
+                времени или сверх MAX_SAMPLES_PER_FRAME)
             db_worker (DBMS_worker): Объект для работы с базой данных
+            rule_index (RuleIndex): Скомпилированный индекс правил в памяти
+            recent (RecentReadings): Последние показания устройств в памяти
+                для чтения web-сервером (GET /readings, /readings/window)
+            ingest (IngestBatcher): Буфер отложенной записи показаний
+            heartbeats (HeartbeatTracker): Время последней связи с устройствами
+            history (HistoryRetention): Создание и удаление секций data_history
+            admission (AdmissionControl): Ограничение числа сессий и частоты входов
+            session_tokens (SessionTokens): Выдача и проверка токенов возобновления сессии
+            scheduler (PollScheduler): Распределение выходов устройств на связь по времени
+            rejector (ThreadPoolExecutor): Потоки для ответа "busy" отклонённым устройствам
+            metrics (Metrics): Метрики горячего пути
+            metrics_server (MetricsServer | None): HTTP-эндпоинт метрик
+            log (Logger): Журнал сервера. Сообщения о кадрах пишутся выборочно
+            handoff (ListenerHandoff | None): Передача слушающего сокета новому процессу
             running (bool): Флаг активности сервера
+            draining (bool): Сервер не принимает подключения и отправляет устройства
+                на переподключение
         """
         self.host = host
         self.port = port
         self.password = password
         self.no_uuid = no_uuid
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.reuse_port = reuse_port
+        self.inherited = listener is not None
+        self.takeover_conn = takeover_conn
+        self.sock = listener or socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if not self.inherited:
+            # Перезапуск без --takeover не ждёт освобождения порта от TIME_WAIT
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.connections = []
-        self.db_worker = DBMS_worker("localhost", "root", "123", "GreenHouseLocal")
+        self.device_connections = {}
+        self.rejected_values = 0
+        self.rejected_samples = 0
+        self.push_targets = {}
+        self.last_commands = {}
+        self.log = Logger("iot-server", LOG_FRAME_SAMPLE)
+        self.metrics = Metrics()
+        self.db_worker = DBMS_worker(
+            "localhost",
+            "root",
+            "123",
+            "GreenHouseLocal",
+            DEVICE_ID_CACHE_SIZE,
+            DB_POOL_SIZE,
+            DB_PREPARED_CACHE_SIZE,
+            DB_BACKEND,
+        )
+        if self.db_worker.created:
+            self.db_worker.db.wait_observer = self.metrics.pool_wait.observe
+        self.rule_index = RuleIndex(
+            self.db_worker, RULES_REFRESH_INTERVAL, sync_values=reuse_port
+        )
+        self.recent = RecentReadings(RECENT_READINGS_SIZE)
+        self.ingest = IngestBatcher(
+            self.db_worker,
+            INGEST_FLUSH_INTERVAL,
+            INGEST_BATCH_SIZE,
+            INGEST_MAX_PENDING,
+            self.metrics,
+        )
+        self.heartbeats = HeartbeatTracker(self.db_worker, HEARTBEAT_FLUSH_INTERVAL)
+        self.history = HistoryRetention(
+            self.db_worker,
+            HISTORY_PARTITION_UNIT,
+            HISTORY_PARTITIONS_AHEAD,
+            HISTORY_RETENTION_DAYS,
+            HISTORY_MAINTENANCE_INTERVAL,
+            ROLLUP_RETENTION_DAYS,
+        )
+        self.admission = AdmissionControl(
+            MAX_SESSIONS, LOGIN_RATE, LOGIN_BURST, BUSY_RETRY_AFTER
+        )
+        self.session_tokens = SessionTokens(SESSION_TOKEN_TTL)
+        self.scheduler = PollScheduler(
+            SCHEDULE_SPREAD, SCHEDULE_TARGET_RATE, SCHEDULE_MAX_STRETCH, SCHEDULE_WINDOW
+        )
+        self.rejector = ThreadPoolExecutor(
+            max_workers=REJECT_WORKERS, thread_name_prefix="reject"
+        )
+        self.metrics_server = (
+            MetricsServer(self.metrics, METRICS_ADDR, metrics_port)
+            if metrics_port
+            else None
+        )
+        self.handoff = (
+            ListenerHandoff(TAKEOVER_SOCKET, self.sock, self.request_drain)
+            if TAKEOVER_SOCKET and not reuse_port
+            else None
+        )
+        self.register_metrics()
         self.running = False
+        self.draining = False
         self.lock = threading.Lock()
 
-    @staticmethod
-    def print_with_time(*args, **kwargs) -> None:
+    def register_metrics(self) -> None:
         """
-        Выводит сообщение с временной меткой в формате HH:MM:SS.
-
-        Args:
-            *args: Аргументы для передачи в стандартный print()
-            **kwargs: Именованные аргументы для print()
+        Регистрирует метрики, значения которых читаются из состояния сервера.
         """
-        print(f"({datetime.datetime.now().strftime('%H:%M:%S')}) ", end="")
-        print(*args, **kwargs)
+        self.metrics.add_callback(
+            "iot_sessions", "Активные сессии устройств",
+            lambda: self.admission.sessions,
+        )
+        self.metrics.add_callback(
+            "iot_connections", "Подключения, прошедшие вход",
+            lambda: len(self.connections),
+        )
+        self.metrics.add_callback(
+            "iot_ingest_pending", "Строки в буфере записи показаний",
+            lambda: len(self.ingest.rows),
+        )
+        self.metrics.add_callback(
+            "iot_ingest_rows_total", "Записанные в БД строки показаний",
+            lambda: self.ingest.flushed, kind="counter",
+        )
+        self.metrics.add_callback(
+            "iot_ingest_dropped_total", "Строки показаний, отброшенные из-за ошибки записи",
+            lambda: self.ingest.dropped, kind="counter",
+        )
+        self.metrics.add_callback(
+            "iot_readings_rejected_total", "Отброшенные недопустимые значения показаний",
+            lambda: self.rejected_values, kind="counter",
+        )
+        self.metrics.add_callback(
+            "iot_samples_rejected_total", "Отброшенные замеры пакетов",
+            lambda: self.rejected_samples, kind="counter",
+        )
+        self.metrics.add_callback(
+            "iot_rejected_total", "Подключения, отклонённые контролем допуска",
+            lambda: self.admission.rejected, kind="counter",
+        )
+        self.metrics.add_callback(
+            "iot_arrival_rate", "Средняя частота выходов устройств на связь, в секунду",
+            lambda: self.scheduler.stats()["arrival_rate_mean"],
+        )
+        self.metrics.add_callback(
+            "iot_arrival_rate_peak", "Пиковая частота выходов устройств на связь, в секунду",
+            lambda: self.scheduler.stats()["arrival_rate_peak"],
+        )
+        self.metrics.add_callback(
+            "iot_schedule_stretched_total", "Задержки опроса, увеличенные из-за нагрузки",
+            lambda: self.scheduler.stretched, kind="counter",
+        )
+        if self.db_worker.created:
+            self.metrics.add_callback(
+                "iot_db_connections", "Открытые соединения с БД",
+                lambda: self.db_worker.db.stats()["opened"],
+            )
+            self.metrics.add_callback(
+                "iot_db_prepared_hits_total", "Выполнения уже подготовленных запросов",
+                lambda: self.db_worker.db.stats()["prepared_hits"], kind="counter",
+            )
+        self.metrics.add_callback(
+            "iot_recent_buffers", "Кольцевые буферы последних показаний",
+            lambda: len(self.recent.buffers),
+        )
+        if self.metrics_server:
+            self.metrics_server.add_route("/schedule", self.get_schedule)
+            self.metrics_server.add_route("/readings", self.recent.latest)
+            self.metrics_server.add_route("/readings/window", self.recent.window)
 
-    @staticmethod
-    def print_as_device(device_name: str, device_uuid: str, data: object) -> None:
+    def get_schedule(self) -> dict:
         """
-        Форматирует вывод сообщения от имени устройства.
+        Возвращает картину распределения выходов устройств на связь.
 
-        Args:
-            device_name (str): Человекочитаемое имя устройства
-            device_uuid (str): Уникальный идентификатор устройства
-            data (object): Данные для отображения (автоматически конвертируются в JSON)
+        Returns:
+            dict: {'arrivals': list[int], 'upcoming': list[int], **PollScheduler.stats()} -
+            выходы на связь по секундам за последнее окно и запланированные на следующее
         """
-        Server.print_with_time(
-            f"{device_uuid}[{device_name}]: {json.dumps(data, ensure_ascii=False)}"
-        )
+        return {
+            "arrivals": self.scheduler.arrival_rates(),
+            "upcoming": self.scheduler.upcoming(SCHEDULE_WINDOW),
+            **self.scheduler.stats(),
+        }
 
-    def receive_data(self, conn: socket.socket) -> dict:
+    def receive_data(self, conn: Connection) -> dict:
         """
-        Принимает и десериализует данные из сокета.
+        Принимает и десериализует данные из сокета в согласованном формате.
 
         Args:
-            conn (socket.socket): Активное клиентское подключение
+            conn (Connection): Активное клиентское подключение
 
         Returns:
             dict: Расшифрованные данные в виде словаря
 
         Raises:
             JSONDecodeError: При получении некорректных данных
-            ConnectionResetError: При обрыве соединения
+            ConnectionError: При обрыве соединения или превышении MAX_FRAME_SIZE
         """
-        try:
-            raw_length = conn.recv(4)
-            if not raw_length:
-                raise ConnectionError("Соединение закрыто")
-            data_length = int.from_bytes(raw_length, "big")
-            encrypted_data = b''
-            while len(encrypted_data) < data_length:
-                packet = conn.recv(data_length - len(encrypted_data))
-                if not packet:
-                    raise ConnectionError("Не удалось прочитать все данные")
-                encrypted_data += packet
-            return json.loads(decrypt(encrypted_data))
-        except Exception as e:
-            raise
+        payload = conn.frames.read_frame()
+        self.metrics.observe("recv", conn.frames.payload_seconds)
+        return self.decode_frame(conn, payload)
+
+    def decode_frame(self, conn: Connection, payload: bytes) -> dict:
+        """
+        Дешифрует и десериализует принятый кадр с учётом времени этапов.
 
-    def send_data(self, conn: socket.socket, data: object) -> None:
+        Args:
+            conn (Connection): Клиентское подключение
+            payload (bytes): Зашифрованный кадр без заголовка длины
+
+        Returns:
+            dict: Сообщение
         """
-        Сериализует и отправляет данные через сокет.
+        self.metrics.inc("iot_frames_total", "Принятые кадры")
+        with self.metrics.time("decrypt"):
+            data = conn.decrypt(payload)
+        with self.metrics.time("parse"):
+            return conn.codec.decode(data)
+
+    def send_data(self, conn: Connection, data: object) -> None:
+        """
+        Сериализует в согласованном формате и отправляет данные через сокет.
 
         Args:
-            conn (socket.socket): Активное клиентское подключение
+            conn (Connection): Активное клиентское подключение
             data (object): Данные для отправки (обычно словарь)
 
         Raises:
             TypeError: При проблемах с сериализацией данных
             BrokenPipeError: При попытке записи в закрытый сокет
         """
-        encrypted_data = encrypt(json.dumps(data))
-        conn.sendall(len(encrypted_data).to_bytes(4, "big"))
-        conn.sendall(encrypted_data)
+        with self.metrics.time("send"), conn.send_lock:
+            send_frame(conn.sock, conn.encode(data))
 
-    def perform_login(self, conn: socket.socket) -> tuple[str, str] | None:
+    def push_commands(self, conn: Connection, commands: list[str]) -> None:
+        """
+        Отправляет устройству команды без его запроса.
+        Вызывается из потока устройства-источника показаний.
+
+        Args:
+            conn (Connection): Подключение устройства-исполнителя
+            commands (list[str]): Команды в формате "команда:интенсивность"
+        """
+        self.push_message(conn, {PUSH_KEY: True, "commands": commands})
+
+    def push_message(self, conn: Connection, message: dict) -> None:
+        """
+        Отправляет устройству кадр без его запроса.
+
+        Args:
+            conn (Connection): Подключение устройства
+            message (dict): Кадр {'push': True, ...}
+        """
+        try:
+            self.send_data(conn, message)
+        except OSError as e:
+            self.log.warning("Не удалось отправить кадр", uuid=conn.device_uuid, error=str(e))
+
+    def prepare_login(
+        self, conn: Connection, device_info: dict
+    ) -> tuple[dict, JsonCodec, SessionCipher | None]:
+        """
+        Регистрирует устройство в подключении и формирует ответ на вход.
+        Ответ содержит новый токен возобновления сессии.
+
+        Args:
+            conn (Connection): Клиентское подключение
+            device_info (dict): Метаданные устройства
+                {'device_name', 'uuid', 'formats', 'params', 'cipher', 'client_nonce', 'push'}
+
+        Returns:
+            tuple: (ответ устройству, кодек и шифр для последующих сообщений)
+        """
+        conn.device_name = device_info.get("device_name")
+        conn.device_uuid = device_info.get("uuid", self.no_uuid)
+
+        if conn.device_uuid == self.no_uuid:
+            conn.device_uuid = str(uuid.uuid4())
+            response = {"status": "registered", "uuid": conn.device_uuid}
+        else:
+            response = {"status": "authorized"}
+
+        response["max_samples"] = MAX_SAMPLES_PER_FRAME
+        codec, format_fields = negotiate(device_info)
+        response.update(format_fields)
+        cipher, cipher_fields = negotiate_session(device_info, ENCRYPTION_KEY)
+        response.update(cipher_fields)
+        if PUSH_COMMANDS and device_info.get("push"):
+            conn.push = True
+            response["push"] = True
+        response["session_token"] = self.session_tokens.issue(
+            conn.device_uuid, conn.device_name
+        )
+        response["session_ttl"] = SESSION_TOKEN_TTL
+        return response, codec, cipher
+
+    def prepare_resume(
+        self, conn: Connection, message: dict
+    ) -> tuple[dict, JsonCodec, SessionCipher | None] | None:
+        """
+        Проверяет токен возобновления сессии и формирует ответ без полного входа.
+
+        Args:
+            conn (Connection): Клиентское подключение
+            message (dict): Первый кадр устройства {'resume': токен, поля входа
+                кроме имени и UUID, 'data': показания}
+
+        Returns:
+            tuple | None: (ответ устройству, кодек, шифр) или None,
+            если токен недействителен
+        """
+        identity = self.session_tokens.verify(message.get(RESUME_KEY))
+        if identity is None:
+            return None
+        device_name, device_uuid = identity
+        response, codec, cipher = self.prepare_login(
+            conn, {**message, "device_name": device_name, "uuid": device_uuid}
+        )
+        response["status"] = "resumed"
+        conn.resumed = True
+        return response, codec, cipher
+
+    def perform_login(self, conn: Connection) -> tuple[str, str] | None:
         """
         Выполняет процесс аутентификации устройства.
 
@@ -121,38 +454,83 @@ class Server:
         1. Устройство отправляет словарь с паролем {'password': str}
         2. Сервер проверяет пароль
         3. Устройство отправляет метаданные {'device_name': str, 'uuid': str}
-        4. Сервер генерирует новый UUID при необходимости
+           и, опционально, поддерживаемые форматы {'formats': list, 'params': list}
+           и запрос шифра сессии {'cipher': 'session', 'client_nonce': hex}
+        4. Сервер генерирует новый UUID при необходимости, выбирает формат обмена
+           и выводит ключ сессии. Ответ на вход всегда передаётся в JSON с общим ключом,
+           дальнейшие сообщения - в выбранном формате и шифре
+
+        Возобновление сессии: вместо пароля устройство отправляет
+        {'resume': токен, поля входа, 'data': показания}. При действующем токене
+        показания сразу обрабатываются, а ответ на вход содержит задержку
+        и команды. Иначе сервер отвечает {'status': 'expired'} и ждёт
+        обычного входа в том же подключении
 
         Args:
-            conn (socket.socket): Клиентское подключение
+            conn (Connection): Клиентское подключение
 
         Returns:
             tuple | None: Кортеж (имя устройства, UUID) или None при ошибке
         """
         try:
             auth_data = self.receive_data(conn)
+            if RESUME_KEY in auth_data:
+                resumed = self.prepare_resume(conn, auth_data)
+                if resumed is not None:
+                    response, codec, cipher = resumed
+                    response.update(
+                        self.process_message(
+                            conn.device_uuid, auth_data.get(RESUME_DATA_KEY) or {}
+                        )
+                    )
+                    self.send_data(conn, response)
+                    conn.upgrade(codec, cipher)
+                    return conn.device_name, conn.device_uuid
+                self.send_data(conn, {"status": "expired"})
+                auth_data = self.receive_data(conn)
+
             if auth_data.get("password") != self.password:
                 return None
 
             device_info = self.receive_data(conn)
-            device_name = device_info.get("device_name")
-            device_uuid = device_info.get("uuid", self.no_uuid)
+            response, codec, cipher = self.prepare_login(conn, device_info)
+            self.send_data(conn, response)
+            conn.upgrade(codec, cipher)
 
-            if device_uuid == self.no_uuid:
-                device_uuid = str(uuid.uuid4())
-                self.send_data(conn, {"status": "registered", "uuid": device_uuid})
-            else:
-                self.send_data(conn, {"status": "authorized"})
-
-            return device_name, device_uuid
+            return conn.device_name, conn.device_uuid
 
         except Exception as e:
-            self.print_with_time(f"Ошибка авторизации: {e}")
+            self.log.error("Ошибка авторизации", error=str(e))
             return None
 
-    def process_sensor_data(self, device_uuid: str, data: dict) -> None:
+    def reject_login(self, conn: Connection, retry_after: int) -> None:
         """
-        Обрабатывает данные с датчиков и сохраняет в БД.
+        Отвечает устройству, не допущенному контролем подключений, что сервер занят.
+
+        Сообщения входа дочитываются, чтобы устройство получило ответ
+        {'status': 'busy', 'retry_after': int} вместо обрыва соединения.
+
+        Args:
+            conn (Connection): Клиентское подключение
+            retry_after (int): Рекомендуемая задержка повторной попытки в секундах
+        """
+        try:
+            auth_data = self.receive_data(conn)
+            if RESUME_KEY in auth_data:
+                self.send_data(conn, {"status": "busy", "retry_after": retry_after})
+            elif auth_data.get("password") == self.password:
+                self.receive_data(conn)
+                self.send_data(conn, {"status": "busy", "retry_after": retry_after})
+        except Exception:
+            pass
+        finally:
+            conn.close()
+
+    def process_sensor_data(self, device_uuid: str, data: dict) -> set[str]:
+        """
+        Обрабатывает данные с датчиков и ставит их в очередь на запись в БД.
+        При переполненном буфере ожидает освобождения места до INGEST_PUT_TIMEOUT секунд.
+        Параметры с нечисловыми значениями (None, логические, строки) отбрасываются.
 
         Args:
             device_uuid (str): UUID устройства-источника
@@ -164,91 +542,347 @@ class Server:
                     ...
                 }
 
+        Returns:
+            set[str]: Принятые параметры
+
+        Note:
+            Поле 'state' игнорируется при сохранении в БД
+        """
+        try:
+            sensor_data, rejected = split_sensor_values(data, ignore=("state",))
+            if rejected:
+                self.rejected_values += rejected
+                self.log.sampled(
+                    "Недопустимые значения показаний отброшены",
+                    level=logging.WARNING,
+                    uuid=device_uuid,
+                    rejected=rejected,
+                )
+            self.rule_index.update_values(device_uuid, sensor_data)
+            self.recent.add(device_uuid, sensor_data)
+
+            device_id = self.db_worker.get_device_id(device_uuid)
+            if device_id and not self.ingest.put(
+                device_id, sensor_data, timeout=INGEST_PUT_TIMEOUT
+            ):
+                self.log.warning("Буфер записи переполнен, показания отброшены", uuid=device_uuid)
+            return set(sensor_data)
+        except Exception as e:
+            self.log.error("Ошибка обработки данных", uuid=device_uuid, error=str(e))
+            return set()
+
+    def process_sensor_batch(self, device_uuid: str, samples: list[dict]) -> set[str]:
+        """
+        Обрабатывает пакет замеров с метками времени устройства и ставит их
+        в очередь на запись в БД одной группой строк.
+
+        Метки времени из будущего дальше MAX_CLOCK_SKEW секунд заменяются
+        текущим временем сервера. Замеры без числовой метки времени или сверх
+        MAX_SAMPLES_PER_FRAME и параметры с нечисловыми значениями отбрасываются
+        и учитываются в rejected_samples и rejected_values.
+
+        Args:
+            device_uuid (str): UUID устройства-источника
+            samples (list[dict]): Замеры [{'timestamp': float, параметр: значение, ...}]
+
+        Returns:
+            set[str]: Принятые параметры
+
         Note:
             Поле 'state' игнорируется при сохранении в БД
         """
         try:
-            sensor_data = {k: v for k, v in data.items() if k != "state"}
-            self.db_worker.add_device_data_batch(device_uuid, sensor_data)
+            now = datetime.datetime.now()
+            latest = now + datetime.timedelta(seconds=MAX_CLOCK_SKEW)
+            batch = []
+            parameters = set()
+            rejected_samples = max(0, len(samples) - MAX_SAMPLES_PER_FRAME)
+            rejected_values = 0
+            future_timestamps = 0
+            for sample in samples[:MAX_SAMPLES_PER_FRAME]:
+                try:
+                    moment = sample[TIMESTAMP_KEY]
+                    if isinstance(moment, bool):
+                        raise TypeError(moment)
+                    timestamp = datetime.datetime.fromtimestamp(moment)
+                except (TypeError, KeyError, ValueError, OverflowError, OSError):
+                    rejected_samples += 1
+                    continue
+                if timestamp > latest:
+                    timestamp = now
+                    future_timestamps += 1
+                data, rejected = split_sensor_values(sample, ignore=(TIMESTAMP_KEY, "state"))
+                rejected_values += rejected
+                self.rule_index.update_values(device_uuid, data, timestamp)
+                self.recent.add(device_uuid, data, timestamp)
+                batch.append((timestamp, data))
+                parameters.update(data)
+            if rejected_samples or rejected_values:
+                self.rejected_samples += rejected_samples
+                self.rejected_values += rejected_values
+                self.log.sampled(
+                    "Недопустимые замеры пакета отброшены",
+                    level=logging.WARNING,
+                    uuid=device_uuid,
+                    rejected_samples=rejected_samples,
+                    rejected_values=rejected_values,
+                    future_timestamps=future_timestamps,
+                )
+
+            device_id = self.db_worker.get_device_id(device_uuid)
+            if device_id and not self.ingest.put_samples(
+                device_id, batch, timeout=INGEST_PUT_TIMEOUT
+            ):
+                self.log.warning("Буфер записи переполнен, показания отброшены", uuid=device_uuid)
+            return parameters
         except Exception as e:
-            self.print_with_time(f"Ошибка обработки данных: {e}")
+            self.log.error("Ошибка обработки пакета данных", uuid=device_uuid, error=str(e))
+            return set()
 
     def check_rules(self, device_uuid: str) -> tuple[int, list[str]]:
         """
-        Проверяет активные правила для устройства и генерирует команды.
+        Генерирует команды по сработавшим правилам устройства.
+        Условия проверяются индексом правил при получении значений источников,
+        здесь берутся только уже сработавшие правила, без запросов к БД.
 
         Returns:
-            tuple[int, list[str]]: Задержка и список команд в формате "команда:интенсивность"
+            tuple[int, list[str]]: Задержка - наибольшая из SEND_STATE_DELAY и задержек
+            сработавших правил, и список команд в формате "команда:интенсивность"
         """
         try:
             commands = []
-            rules = self.db_worker.get_rules_by_target_device(device_uuid)
             custom_delay = SEND_STATE_DELAY
 
-            for rule in rules:
-                if not rule["is_active"]:
-                    continue
+            for rule in self.rule_index.active_rules(device_uuid):
+                if rule.delay is not None:
+                    custom_delay = max(custom_delay, rule.delay)
 
-                current_value = (
-                    self.db_worker.get_actual_data(
-                        rule["source_device"], rule["parameter"]
+                if rule.command_name is None:
+                    self.log.warning(
+                        "Команда правила пропущена (некорректная интенсивность)",
+                        rule_id=rule.rule_id,
+                        command=rule.command,
                     )
-                    .get(rule["parameter"], {})
-                    .get("value", 0)
-                )
-
-                condition_met = False
-                if rule["condition"] == 1:  # >
-                    condition_met = current_value > rule["threshold"]
-                elif rule["condition"] == 2:  # <
-                    condition_met = current_value < rule["threshold"]
-                elif rule["condition"] == 3:  # ==
-                    condition_met = current_value == rule["threshold"]
-                elif rule["condition"] == 4:  # !=
-                    condition_met = current_value != rule["threshold"]
-
-                if condition_met:
-                    parts = rule["message"].split("~")
-                    command_str = parts[0]
-                    if len(parts) > 1 and parts[1].isdigit():
-                        custom_delay = max(custom_delay, int(parts[1]))
-                    
-                    if ':' not in command_str:
-                        self.print_with_time(f"Правило {rule['rule_id']}: команда '{command_str}' пропущена (нет интенсивности).")
-                        continue
-                    command_name, intensity_str = command_str.split(':', 1)
-                    
-                    if not intensity_str.isdigit():
-                        self.print_with_time(f"Правило {rule['rule_id']}: интенсивность '{intensity_str}' не число. Пропуск.")
-                        continue
-                    new_intensity = int(intensity_str)
-                    
-                    found_index = None
-                    for i, cmd in enumerate(commands):
-                        existing_name, sep, existing_intensity = cmd.partition(':')
-                        if existing_name == command_name:
-                            found_index = i
-                            break
-                    
-                    if found_index is not None:
-                        existing_intensity = int(existing_intensity) if existing_intensity.isdigit() else 0
-                        updated_intensity = max(existing_intensity, new_intensity)
-                        commands[found_index] = f"{command_name}:{updated_intensity}"
-                    else:
-                        commands.append(f"{command_name}:{new_intensity}")
+                    continue
+                command_name = rule.command_name
+                new_intensity = rule.intensity
+                
+                found_index = None
+                for i, cmd in enumerate(commands):
+                    existing_name, sep, existing_intensity = cmd.partition(':')
+                    if existing_name == command_name:
+                        found_index = i
+                        break
+                
+                if found_index is not None:
+                    existing_intensity = int(existing_intensity) if existing_intensity.isdigit() else 0
+                    updated_intensity = max(existing_intensity, new_intensity)
+                    commands[found_index] = f"{command_name}:{updated_intensity}"
+                else:
+                    commands.append(f"{command_name}:{new_intensity}")
             
             return (custom_delay, commands)
         except Exception as e:
-            self.print_with_time(f"Ошибка проверки правил: {e}")
+            self.log.error("Ошибка проверки правил", uuid=device_uuid, error=str(e))
             return (SEND_STATE_DELAY, [])
 
-    def handle_connection(self, conn: socket.socket, addr: tuple) -> None:
+    def start_background_tasks(self) -> None:
+        """
+        Запускает фоновые задачи сервера: обновление индекса правил,
+        отложенную запись показаний и времени связи с устройствами,
+        обслуживание секций истории.
+        """
+        self.rule_index.start()
+        self.ingest.start()
+        self.heartbeats.start()
+        self.history.start()
+        if self.metrics_server:
+            self.metrics_server.start()
+
+    def stop_background_tasks(self) -> None:
+        """
+        Останавливает фоновые задачи сервера и сохраняет буферизованные показания.
+        """
+        if self.metrics_server:
+            self.metrics_server.stop()
+        self.rule_index.stop()
+        self.ingest.stop()
+        self.heartbeats.stop()
+        self.history.stop()
+
+    def process_message(self, device_uuid: str, sensor_data: dict) -> dict:
+        """
+        Обрабатывает одно сообщение устройства и формирует ответ.
+
+        Args:
+            device_uuid (str): UUID устройства-отправителя
+            sensor_data (dict): Принятые показатели устройства или пакет замеров {'samples': list}
+
+        Returns:
+            dict: Ответ устройству {'delay': int, 'commands': list[str]}. Задержку
+            назначает планировщик опроса, чтобы выходы устройств на связь не совпадали
+        """
+        device_id = self.db_worker.get_device_id(device_uuid)
+        if device_id:
+            self.heartbeats.touch(device_id)
+        if BATCH_KEY in sensor_data:
+            parameters = self.process_sensor_batch(device_uuid, sensor_data[BATCH_KEY])
+        else:
+            parameters = self.process_sensor_data(device_uuid, sensor_data)
+        if self.push_targets:
+            with self.metrics.time("push"):
+                self.push_source_rules(device_uuid, parameters)
+        with self.metrics.time("rules"):
+            delay, commands = self.check_rules(device_uuid)
+        self.remember_commands(device_uuid, commands)
+        return {"delay": self.scheduler.assign(device_uuid, delay), "commands": commands}
+
+    def remember_commands(self, device_uuid: str, commands: list[str]) -> bool:
+        """
+        Запоминает команды, отправленные устройству.
+
+        Args:
+            device_uuid (str): UUID устройства
+            commands (list[str]): Отправленные команды
+
+        Returns:
+            bool: True если команды отличаются от отправленных в прошлый раз
+        """
+        with self.lock:
+            changed = self.last_commands.get(device_uuid) != commands
+            self.last_commands[device_uuid] = commands
+        return changed
+
+    def push_source_rules(self, source_uuid: str, parameters) -> None:
+        """
+        Проверяет правила, зависящие от только что полученных параметров,
+        и сразу отправляет изменившиеся команды исполнителям, подключённым
+        к этому процессу с поддержкой команд без запроса. Остальные
+        исполнители получат команды в ответе на свой следующий кадр.
+
+        Args:
+            source_uuid (str): UUID устройства-источника
+            parameters (Iterable[str]): Названия полученных параметров
+        """
+        targets = {
+            rule.target_device
+            for parameter in parameters
+            for rule in self.rule_index.rules_for_source(source_uuid, parameter)
+        }
+        # Источнику команды придут в ответе на текущий кадр
+        targets.discard(source_uuid)
+
+        for target_uuid in targets:
+            conn = self.push_targets.get(target_uuid)
+            if conn is None:
+                continue
+            _, commands = self.check_rules(target_uuid)
+            if self.remember_commands(target_uuid, commands) and commands:
+                self.push_commands(conn, commands)
+                self.metrics.inc("iot_pushed_total", "Кадры команд, отправленные без запроса")
+
+    def register_connection(self, conn: Connection) -> None:
+        """
+        Делает подключение текущим для устройства и, если устройство
+        принимает команды без запроса, регистрирует его для них.
+
+        Args:
+            conn (Connection): Подключение после входа
+        """
+        with self.lock:
+            self.device_connections[conn.device_uuid] = conn
+        self.register_push_target(conn)
+
+    def register_push_target(self, conn: Connection) -> None:
+        """
+        Регистрирует подключение, принимающее команды без запроса.
+
+        Args:
+            conn (Connection): Подключение после входа
+        """
+        if conn.push:
+            with self.lock:
+                self.push_targets[conn.device_uuid] = conn
+
+    def unregister_push_target(self, conn: Connection) -> None:
+        """
+        Снимает регистрацию подключения, если устройство не переподключилось заново.
+
+        Args:
+            conn (Connection): Закрываемое подключение
+        """
+        with self.lock:
+            if self.push_targets.get(conn.device_uuid) is conn:
+                del self.push_targets[conn.device_uuid]
+
+    def on_device_disconnected(self, conn: Connection) -> None:
+        """
+        Сохраняет время последней связи отключившегося устройства,
+        освобождает его место в расписании опроса и удаляет его
+        последние показания из памяти.
+
+        Если устройство уже переподключилось (например, возобновило сессию
+        по токену раньше, чем закрылось прежнее подключение), состояние
+        новой сессии не трогается.
+
+        Args:
+            conn (Connection): Закрытое подключение устройства
+        """
+        device_uuid = conn.device_uuid
+        with self.lock:
+            if self.device_connections.get(device_uuid) is not conn:
+                return
+            del self.device_connections[device_uuid]
+            self.last_commands.pop(device_uuid, None)
+        self.scheduler.forget(device_uuid)
+        self.recent.forget(device_uuid)
+        device_id = self.db_worker.get_device_id(device_uuid)
+        if device_id:
+            self.heartbeats.forget(device_id)
+
+    def get_device_last_seen(self, device_uuid: str) -> datetime.datetime | None:
+        """
+        Возвращает точное время последнего сообщения подключённого устройства.
+
+        Args:
+            device_uuid (str): UUID устройства
+
+        Returns:
+            datetime | None: Время из памяти сервера или None, если устройство не на связи
+        """
+        device_id = self.db_worker.get_device_id(device_uuid)
+        return self.heartbeats.get_last_seen(device_id) if device_id else None
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает счётчики работы сервера.
+
+        Returns:
+            dict: {'connections', 'sessions', 'rejected', 'ingest_rows',
+                'ingest_flushes', 'ingest_pending', 'cache_hits', 'cache_misses',
+                'arrival_rate', 'push_targets'}
+        """
+        cache = self.db_worker.device_ids.stats()
+        admission = self.admission.stats()
+        return {
+            "connections": len(self.connections),
+            "sessions": admission["sessions"],
+            "rejected": admission["rejected"],
+            "ingest_rows": self.ingest.flushed,
+            "ingest_flushes": self.ingest.flushes,
+            "ingest_pending": len(self.ingest.rows),
+            "cache_hits": cache["hits"],
+            "cache_misses": cache["misses"],
+            "arrival_rate": self.scheduler.stats()["arrival_rate_mean"],
+            "push_targets": len(self.push_targets),
+        }
+
+    def handle_connection(self, conn: Connection) -> None:
         """
         Обрабатывает жизненный цикл клиентского подключения.
 
         Args:
-            conn (socket.socket): Новое клиентское подключение
-            addr (tuple): Кортеж (IP-адрес, порт) клиента
+            conn (Connection): Новое клиентское подключение
 
         Workflow:
             1. Аутентификация устройства
@@ -263,58 +897,166 @@ class Server:
         device_info = self.perform_login(conn)
         if not device_info:
             conn.close()
+            with self.lock:
+                if conn in self.connections:
+                    self.connections.remove(conn)
+            self.admission.release()
             return
 
+        conn.sock.settimeout(None)
         device_name, device_uuid = device_info
-        self.print_as_device(device_name, device_uuid, "Подключение установлено")
-        self.db_worker.add_device(device_uuid, device_name)
+        self.log.info(
+            "Подключение установлено",
+            uuid=device_uuid,
+            device=device_name,
+            resumed=conn.resumed,
+        )
+        if not conn.resumed:
+            self.db_worker.add_device(device_uuid, device_name)
+        self.register_connection(conn)
 
         try:
             while self.running:
                 sensor_data = self.receive_data(conn)
-                self.print_as_device(device_name, device_uuid, sensor_data)
-                self.db_worker.update_device_communication_timestamp(device_uuid)
-
-                self.process_sensor_data(device_uuid, sensor_data)
-                delay, commands = self.check_rules(device_uuid)
-                response = {"delay": delay, "commands": commands}
+                self.log.sampled(
+                    "Показания", uuid=device_uuid, device=device_name, data=sensor_data
+                )
+                response = self.process_message(device_uuid, sensor_data)
+                if self.draining:
+                    response[RECONNECT_KEY] = self.reconnect_delay()
+                    self.send_data(conn, response)
+                    break
                 self.send_data(conn, response)
         except Exception as e:
-            self.print_as_device(device_name, device_uuid, f"Ошибка: {str(e)}")
+            self.log.warning(
+                "Соединение прервано", uuid=device_uuid, device=device_name, error=str(e)
+            )
         finally:
+            self.unregister_push_target(conn)
             conn.close()
             with self.lock:
                 if conn in self.connections:
                     self.connections.remove(conn)
-            self.print_as_device(device_name, device_uuid, "Отключен")
+            self.on_device_disconnected(conn)
+            self.admission.release()
+            self.log.info("Отключен", uuid=device_uuid, device=device_name)
 
     def start(self) -> None:
         """
         Запускает основной цикл работы сервера.
 
         Actions:
-            1. Привязывает сокет к указанному адресу
+            1. Привязывает сокет к указанному адресу, если сокет не получен
+               от прежнего процесса
             2. Переходит в режим прослушивания
             3. Для каждого нового подключения:
+               - Проверяет лимиты сессий и частоты входов, при превышении
+                 отвечает "busy" в отдельном пуле потоков
                - Создает отдельный поток
                - Добавляет в список активных соединений
-            4. Обрабатывает KeyboardInterrupt для плавного завершения
+            4. По SIGTERM или после передачи сокета новому процессу
+               выполняет плавную остановку (drain)
+            5. Обрабатывает KeyboardInterrupt для немедленного завершения
         """
-        self.sock.bind((self.host, self.port))
-        self.sock.listen(5)
+        if not self.inherited:
+            self.sock.bind((self.host, self.port))
+            self.sock.listen(LISTEN_BACKLOG)
+        # Периодический выход из accept для проверки флага draining
+        self.sock.settimeout(1.0)
         self.running = True
-        self.print_with_time(f"Сервер запущен на {self.host}:{self.port}")
+        self.start_background_tasks()
+        self.start_handoff()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.request_drain())
+        self.log.info(
+            "Сервер запущен", address=f"{self.host}:{self.port}", takeover=self.inherited
+        )
 
         try:
-            while self.running:
-                conn, addr = self.sock.accept()
+            while self.running and not self.draining:
+                try:
+                    sock, addr = self.sock.accept()
+                except socket.timeout:
+                    continue
+                sock.settimeout(LOGIN_TIMEOUT)
+                conn = Connection(sock, addr)
+
+                retry_after = self.admission.try_admit()
+                if retry_after is not None:
+                    self.rejector.submit(self.reject_login, conn, retry_after)
+                    continue
+
                 with self.lock:
                     self.connections.append(conn)
                 threading.Thread(
-                    target=self.handle_connection, args=(conn, addr), daemon=True
+                    target=self.handle_connection, args=(conn,), daemon=True
                 ).start()
         except KeyboardInterrupt:
             self.shutdown()
+            return
+        self.drain()
+
+    def start_handoff(self) -> None:
+        """
+        Подтверждает прежнему процессу приём подключений (при --takeover)
+        и открывает Unix-сокет для передачи слушающего сокета следующему.
+        """
+        if self.takeover_conn is not None:
+            confirm_takeover(self.takeover_conn)
+            self.takeover_conn = None
+        if self.handoff:
+            self.handoff.start()
+
+    def request_drain(self) -> None:
+        """
+        Запрашивает плавную остановку (по SIGTERM или после передачи сокета).
+        Приём подключений прекращается в цикле accept, затем вызывается drain.
+        """
+        self.draining = True
+
+    @staticmethod
+    def reconnect_delay() -> int:
+        """
+        Returns:
+            int: Случайная задержка переподключения, чтобы устройства
+            не переподключались одновременно
+        """
+        return random.randint(1, max(1, DRAIN_RECONNECT_SPREAD))
+
+    def notify_draining(self) -> None:
+        """
+        Сразу отправляет предложение переподключиться устройствам, принимающим
+        кадры без запроса. Остальные получат его в ответе на свой следующий кадр.
+        """
+        with self.lock:
+            targets = list(self.push_targets.values())
+        for conn in targets:
+            self.push_message(
+                conn,
+                {PUSH_KEY: True, "commands": [], RECONNECT_KEY: self.reconnect_delay()},
+            )
+
+    def drain(self) -> None:
+        """
+        Плавно останавливает сервер.
+
+        Actions:
+            1. Закрывает свою копию слушающего сокета (если сокет передан
+               новому процессу, он продолжает принимать подключения)
+            2. Предлагает подключённым устройствам переподключиться через
+               случайную задержку
+            3. Ждёт отключения устройств не дольше DRAIN_TIMEOUT секунд
+            4. Останавливает сервер с записью буферизованных показаний
+        """
+        self.draining = True
+        self.sock.close()
+        self.log.info("Плавная остановка", connections=len(self.connections))
+        self.notify_draining()
+
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while self.connections and time.monotonic() < deadline:
+            time.sleep(0.5)
+        self.shutdown()
 
     def shutdown(self) -> None:
         """
@@ -323,10 +1065,13 @@ class Server:
         Actions:
             1. Устанавливает флаг running=False
             2. Закрывает все активные подключения
-            3. Освобождает ресурсы сокета
-            4. Выводит статус завершения
+            3. Останавливает фоновые задачи и дописывает буферизованные показания
+            4. Освобождает ресурсы сокета
+            5. Выводит статус завершения
         """
         self.running = False
+        if self.handoff:
+            self.handoff.stop()
         with self.lock:
             for conn in self.connections:
                 try:
@@ -334,15 +1079,53 @@ class Server:
                 except Exception:
                     pass
             self.connections.clear()
+        self.rejector.shutdown(wait=False, cancel_futures=True)
+        self.stop_background_tasks()
         self.sock.close()
-        self.print_with_time("Сервер остановлен")
+        self.log.info("Сервер остановлен")
 
 
 if __name__ == "__main__":
-    server = Server(
-        host=LOC_SOCK_SERV_ADDR,
-        port=LOC_SOCK_SERV_PORT,
-        password=PASSWORD,
-        no_uuid=NO_UUID,
+    parser = argparse.ArgumentParser(description="IoT-сервер умной теплицы")
+    parser.add_argument(
+        "--takeover",
+        action="store_true",
+        help="принять слушающий сокет у работающего сервера через TAKEOVER_SOCKET",
     )
-    server.start()
+    args = parser.parse_args()
+    setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE)
+
+    if SERVER_MODE == "asyncio":
+        from async_server import AsyncServer as server_class
+    else:
+        server_class = Server
+
+    server_kwargs = {
+        "host": LOC_SOCK_SERV_ADDR,
+        "port": LOC_SOCK_SERV_PORT,
+        "password": PASSWORD,
+        "no_uuid": NO_UUID,
+    }
+
+    if args.takeover and WORKER_PROCESSES == 1:
+        listener, takeover_conn = receive_listener(TAKEOVER_SOCKET)
+        server_kwargs.update(listener=listener, takeover_conn=takeover_conn)
+
+    if WORKER_PROCESSES > 1 and hasattr(socket, "SO_REUSEPORT"):
+        if args.takeover:
+            Logger("iot-server").info(
+                "Процессы-обработчики слушают порт через SO_REUSEPORT вместе с "
+                "прежними, остановите прежний сервер сигналом SIGTERM"
+            )
+        from workers import WorkerPool
+
+        WorkerPool(
+            server_class, server_kwargs, WORKER_PROCESSES, WORKER_STATS_INTERVAL
+        ).start()
+    else:
+        if WORKER_PROCESSES > 1:
+            Logger("iot-server").warning(
+                "SO_REUSEPORT не поддерживается, сервер запущен одним процессом"
+            )
+        server = server_class(**server_kwargs)
+        server.start()
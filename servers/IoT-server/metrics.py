@@ -0,0 +1,266 @@
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Границы корзин гистограмм в секундах
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        """
+        Гистограмма длительностей с фиксированными корзинами.
+
+        Args:
+            buckets (tuple, optional): Верхние границы корзин по возрастанию
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Учитывает одно измерение.
+
+        Args:
+            value (float): Длительность в секундах
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name: str, labels: str = "") -> list[str]:
+        """
+        Формирует строки гистограммы в текстовом формате Prometheus.
+
+        Args:
+            name (str): Имя метрики
+            labels (str, optional): Метки вида 'stage="recv"'
+
+        Returns:
+            list[str]: Строки _bucket, _sum и _count
+        """
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+
+        prefix = f"{labels}," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {total}")
+        lines.append(f"{name}_count{suffix} {count}")
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        """
+        Метрики горячего пути IoT-сервера.
+
+        Attributes:
+            stages (dict): {этап: Histogram} - длительность этапов обработки кадра
+                (recv, decrypt, parse, rules, send, db_upsert)
+            pool_wait (Histogram): Время получения соединения из пула БД
+            counters (dict): {имя: (описание, значение)}
+            callbacks (dict): {имя: (описание, тип, функция текущего значения)}
+        """
+        self.stages = {}
+        self.pool_wait = Histogram()
+        self.counters = {}
+        self.callbacks = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        Учитывает длительность этапа.
+
+        Args:
+            stage (str): Название этапа
+            seconds (float): Длительность в секундах
+        """
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        """
+        Измеряет длительность блока with и учитывает её как этап stage.
+
+        Args:
+            stage (str): Название этапа
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def inc(self, name: str, description: str, value: int = 1) -> None:
+        """
+        Увеличивает счётчик.
+
+        Args:
+            name (str): Имя метрики
+            description (str): Описание для строки HELP
+            value (int, optional): Приращение
+        """
+        with self.lock:
+            _, current = self.counters.get(name, (description, 0))
+            self.counters[name] = (description, current + value)
+
+    def add_callback(
+        self, name: str, description: str, func, kind: str = "gauge"
+    ) -> None:
+        """
+        Регистрирует метрику, значение которой вычисляется при чтении метрик.
+
+        Args:
+            name (str): Имя метрики
+            description (str): Описание для строки HELP
+            func (callable): Функция без аргументов, возвращающая число
+            kind (str, optional): Тип метрики: "gauge" или "counter"
+        """
+        self.callbacks[name] = (description, kind, func)
+
+    def render(self) -> str:
+        """
+        Формирует все метрики в текстовом формате Prometheus.
+
+        Returns:
+            str: Текст для ответа на /metrics
+        """
+        lines = [
+            "# HELP iot_stage_seconds Длительность этапов обработки кадра",
+            "# TYPE iot_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            lines.extend(histogram.render("iot_stage_seconds", f'stage="{stage}"'))
+
+        lines.append("# HELP iot_db_pool_wait_seconds Время получения соединения из пула БД")
+        lines.append("# TYPE iot_db_pool_wait_seconds histogram")
+        lines.extend(self.pool_wait.render("iot_db_pool_wait_seconds"))
+
+        with self.lock:
+            counters = dict(self.counters)
+        for name, (description, value) in sorted(counters.items()):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+
+        for name, (description, kind, func) in sorted(self.callbacks.items()):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {func()}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    def __init__(self, metrics: Metrics, host: str, port: int):
+        """
+        HTTP-сервер, отдающий метрики на GET /metrics
+        и дополнительные JSON-ресурсы, зарегистрированные через add_route.
+
+        Args:
+            metrics (Metrics): Источник метрик
+            host (str): Адрес прослушивания
+            port (int): Порт прослушивания
+
+        Attributes:
+            routes (dict): {путь: функция, возвращающая JSON-объект}
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.routes = {}
+        self.httpd = None
+
+    def add_route(self, path: str, func) -> None:
+        """
+        Регистрирует JSON-ресурс для GET-запросов. Параметры строки запроса
+        передаются в функцию именованными аргументами (строками); при
+        неизвестном или некорректном параметре ответ - 400.
+
+        Args:
+            path (str): Путь, например "/schedule"
+            func (callable): Функция, возвращающая сериализуемый объект
+        """
+        self.routes[path] = func
+
+    def make_handler(self) -> type:
+        """
+        Создаёт класс обработчика запросов, связанный с метриками сервера.
+
+        Returns:
+            type: Подкласс BaseHTTPRequestHandler
+        """
+        metrics = self.metrics
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                path = url.path
+                if path == "/metrics":
+                    body = metrics.render().encode("utf-8")
+                    content_type = CONTENT_TYPE
+                elif path in routes:
+                    try:
+                        result = routes[path](**dict(parse_qsl(url.query)))
+                    except (TypeError, ValueError):
+                        self.send_error(400)
+                        return
+                    body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                    content_type = JSON_CONTENT_TYPE
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> None:
+        """
+        Запускает HTTP-сервер в фоновом потоке.
+        """
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self.make_handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        """
+        Останавливает HTTP-сервер.
+        """
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
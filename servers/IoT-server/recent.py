@@ -0,0 +1,201 @@
+import time
+import threading
+from array import array
+from datetime import datetime
+
+
+class RingBuffer:
+    __slots__ = ("size", "timestamps", "values", "head", "count", "newest")
+
+    def __init__(self, size: int):
+        """
+        Кольцевой буфер последних замеров одного параметра устройства.
+
+        Метки времени и значения хранятся в двух массивах array("d")
+        фиксированной длины: новый замер записывается на место самого старого,
+        память под буфер выделяется один раз и не растёт.
+
+        Args:
+            size (int): Число хранимых замеров
+
+        Attributes:
+            timestamps (array): Метки времени замеров (Unix-время, с)
+            values (array): Значения замеров
+            head (int): Позиция следующей записи
+            count (int): Число заполненных позиций
+            newest (int): Позиция замера с наибольшей меткой времени
+        """
+        self.size = size
+        self.timestamps = array("d", bytes(8 * size))
+        self.values = array("d", bytes(8 * size))
+        self.head = 0
+        self.count = 0
+        self.newest = 0
+
+    def append(self, timestamp: float, value: float) -> None:
+        index = self.head
+        overwrites_newest = self.count == self.size and index == self.newest
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+        self.head = (index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+        if overwrites_newest:
+            # Самый новый замер вытеснен - ищется следующий по всему буферу
+            self.newest = max(range(self.size), key=self.timestamps.__getitem__)
+        elif self.count == 1 or timestamp >= self.timestamps[self.newest]:
+            self.newest = index
+
+    def latest(self) -> tuple[float, float] | None:
+        """
+        Замеры из пакетов могут прийти не по порядку, поэтому последним
+        считается замер с наибольшей меткой времени, а не последний добавленный.
+
+        Returns:
+            tuple[float, float] | None: (метка времени, значение) самого нового
+            замера или None, если замеров нет
+        """
+        if not self.count:
+            return None
+        return self.timestamps[self.newest], self.values[self.newest]
+
+    def since(self, start: float) -> list[tuple[float, float]]:
+        """
+        Возвращает замеры не старше start в порядке поступления.
+
+        Замеры из пакетов с метками времени устройства могут прийти
+        не по порядку, поэтому просматривается весь буфер.
+
+        Args:
+            start (float): Начало окна (Unix-время, с)
+
+        Returns:
+            list[tuple[float, float]]: [(метка времени, значение), ...]
+        """
+        first = (self.head - self.count) % self.size
+        points = []
+        for offset in range(self.count):
+            index = (first + offset) % self.size
+            timestamp = self.timestamps[index]
+            if timestamp >= start:
+                points.append((timestamp, self.values[index]))
+        return points
+
+
+class RecentReadings:
+    def __init__(self, size: int):
+        """
+        Последние показания устройств в памяти процесса.
+
+        Для каждой пары (устройство, параметр) хранится RingBuffer на size
+        замеров. Последние значения и короткие окна для оперативных экранов
+        web-сервера отдаются отсюда через HTTP-эндпоинт метрик, без запросов
+        к БД. Показания приходят сюда в момент приёма, ещё до записи
+        буфером IngestBatcher. Буферы устройства удаляются при его
+        отключении (forget), поэтому память не растёт с каждым новым UUID.
+
+        Args:
+            size (int): Замеров на пару (устройство, параметр)
+
+        Attributes:
+            buffers (dict): {(UUID устройства, параметр): RingBuffer}
+            by_device (dict): {UUID устройства: {параметр: RingBuffer}}
+        """
+        self.size = size
+        self.buffers = {}
+        self.by_device = {}
+        self.lock = threading.Lock()
+
+    def add(self, device_uuid: str, data: dict, timestamp: datetime = None) -> None:
+        """
+        Добавляет показания устройства. Нечисловые значения пропускаются.
+
+        Args:
+            device_uuid (str): UUID устройства-источника
+            data (dict): Словарь {параметр: значение}
+            timestamp (datetime, optional): Время замера. По умолчанию - текущее
+        """
+        moment = timestamp.timestamp() if timestamp else time.time()
+        with self.lock:
+            for parameter, value in data.items():
+                if not isinstance(value, (int, float)):
+                    continue
+                buffer = self.buffers.get((device_uuid, parameter))
+                if buffer is None:
+                    buffer = RingBuffer(self.size)
+                    self.buffers[(device_uuid, parameter)] = buffer
+                    self.by_device.setdefault(device_uuid, {})[parameter] = buffer
+                buffer.append(moment, value)
+
+    def forget(self, device_uuid: str) -> None:
+        """
+        Удаляет буферы отключившегося устройства.
+
+        Args:
+            device_uuid (str): UUID устройства
+        """
+        with self.lock:
+            for parameter in self.by_device.pop(device_uuid, {}):
+                del self.buffers[(device_uuid, parameter)]
+
+    def latest(self, device: str = None) -> dict:
+        """
+        Возвращает последние значения параметров.
+
+        Args:
+            device (str, optional): UUID устройства. По умолчанию - все устройства
+
+        Returns:
+            dict: {UUID устройства: {параметр: {"value": значение,
+            "timestamp": Unix-время замера}}}
+        """
+        with self.lock:
+            if device is None:
+                devices = self.by_device.items()
+            else:
+                devices = [(device, self.by_device.get(device, {}))]
+            result = {}
+            for device_uuid, parameters in devices:
+                values = {}
+                for parameter, buffer in parameters.items():
+                    timestamp, value = buffer.latest()
+                    values[parameter] = {"value": value, "timestamp": timestamp}
+                result[device_uuid] = values
+            return result
+
+    def window(self, device: str, param: str, seconds: str = "300") -> dict:
+        """
+        Возвращает замеры параметра за последние seconds секунд
+        (не больше size последних замеров).
+
+        Args:
+            device (str): UUID устройства
+            param (str): Название параметра
+            seconds (str, optional): Длина окна в секундах
+
+        Returns:
+            dict: {"device": UUID, "param": параметр,
+            "points": [[Unix-время, значение], ...]}
+
+        Raises:
+            ValueError: Длина окна - не число
+        """
+        start = time.time() - float(seconds)
+        with self.lock:
+            buffer = self.buffers.get((device, param))
+            points = buffer.since(start) if buffer else []
+        return {"device": device, "param": param, "points": [list(point) for point in points]}
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Число устройств и буферов, замеров в буферах и занятая память (байт)
+        """
+        with self.lock:
+            return {
+                "devices": len(self.by_device),
+                "buffers": len(self.buffers),
+                "readings": sum(buffer.count for buffer in self.buffers.values()),
+                "bytes": len(self.buffers) * self.size * 16,
+            }
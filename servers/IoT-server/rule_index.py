@@ -0,0 +1,456 @@
+import bisect
+import operator
+import threading
+import time
+from datetime import datetime
+
+from DBMS_worker import DBMS_worker
+from logutil import Logger
+
+log = Logger("iot-server.rules")
+
+
+CONDITION_GT = 1
+CONDITION_LT = 2
+CONDITION_EQ = 3
+CONDITION_NE = 4
+
+CONDITIONS = {
+    CONDITION_GT: operator.gt,  # >
+    CONDITION_LT: operator.lt,  # <
+    CONDITION_EQ: operator.eq,  # ==
+    CONDITION_NE: operator.ne,  # !=
+}
+
+
+class CompiledRule:
+    __slots__ = (
+        "rule_id",
+        "source_device",
+        "parameter",
+        "condition_id",
+        "condition",
+        "threshold",
+        "target_device",
+        "message",
+        "command",
+        "command_name",
+        "intensity",
+        "delay",
+    )
+
+    def __init__(self, rule: dict):
+        """
+        Правило автоматизации с заранее разобранной командой.
+
+        Args:
+            rule (dict): Правило в формате DBMS_worker.get_active_rules()
+
+        Attributes:
+            command (str): Команда до символа '~'
+            command_name (str | None): Имя команды или None, если команда некорректна
+            intensity (int | None): Интенсивность команды
+            delay (int | None): Задержка из сообщения правила ('~delay')
+        """
+        self.rule_id = rule["rule_id"]
+        self.source_device = rule["source_device"]
+        self.parameter = rule["parameter"]
+        self.condition_id = rule["condition"]
+        self.condition = CONDITIONS.get(self.condition_id)
+        self.threshold = rule["threshold"]
+        self.target_device = rule["target_device"]
+        self.message = rule["message"]
+
+        parts = self.message.split("~")
+        self.command = parts[0]
+        self.delay = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+
+        self.command_name = None
+        self.intensity = None
+        name, sep, intensity = self.command.partition(":")
+        if sep and intensity.isdigit():
+            self.command_name = name
+            self.intensity = int(intensity)
+
+    def matches(self, value: int) -> bool:
+        """
+        Проверяет выполнение условия правила для значения.
+
+        Args:
+            value (int): Текущее значение параметра
+
+        Returns:
+            bool: True если условие выполнено
+        """
+        return self.condition is not None and self.condition(value, self.threshold)
+
+
+class ThresholdIndex:
+    def __init__(self, rules: list[CompiledRule]):
+        """
+        Правила одного параметра одного источника, упорядоченные по порогам.
+
+        Правила '>' и '<' хранятся в списках, отсортированных по порогу:
+        условию value > threshold удовлетворяет префикс первого списка,
+        value < threshold - суффикс второго. Правила '!=' - всё, кроме
+        отрезка с порогом, равным значению. Правила '==' - словарь по порогу.
+        Границы находятся двоичным поиском, поэтому поиск сработавших правил
+        занимает O(log n + k), где k - число сработавших правил, а поиск правил,
+        которые могли изменить состояние при переходе значения от old к new, -
+        O(log n + m), где m - число правил с порогом между old и new.
+
+        Args:
+            rules (list[CompiledRule]): Правила с общим источником и параметром.
+                Правила с неизвестным условием не срабатывают и не индексируются
+        """
+        greater, less, not_equal = [], [], []
+        self.equal = {}
+        self.not_equal_by_threshold = {}
+        for rule in rules:
+            if rule.condition_id == CONDITION_GT:
+                greater.append(rule)
+            elif rule.condition_id == CONDITION_LT:
+                less.append(rule)
+            elif rule.condition_id == CONDITION_NE:
+                not_equal.append(rule)
+                self.not_equal_by_threshold.setdefault(rule.threshold, []).append(rule)
+            elif rule.condition_id == CONDITION_EQ:
+                self.equal.setdefault(rule.threshold, []).append(rule)
+
+        self.greater, self.greater_thresholds = self.sort_by_threshold(greater)
+        self.less, self.less_thresholds = self.sort_by_threshold(less)
+        self.not_equal, self.not_equal_thresholds = self.sort_by_threshold(not_equal)
+
+    @staticmethod
+    def sort_by_threshold(rules: list[CompiledRule]) -> tuple[list, list]:
+        """
+        Returns:
+            tuple[list, list]: Правила, отсортированные по порогу, и их пороги
+        """
+        rules = sorted(rules, key=lambda rule: rule.threshold)
+        return rules, [rule.threshold for rule in rules]
+
+    def match(self, value: int) -> list[CompiledRule]:
+        """
+        Находит все правила, условие которых выполнено для значения.
+
+        Args:
+            value (int): Значение параметра
+
+        Returns:
+            list[CompiledRule]: Сработавшие правила
+        """
+        matched = self.greater[:bisect.bisect_left(self.greater_thresholds, value)]
+        matched += self.less[bisect.bisect_right(self.less_thresholds, value):]
+        matched += self.equal.get(value, ())
+        if self.not_equal:
+            left = bisect.bisect_left(self.not_equal_thresholds, value)
+            right = bisect.bisect_right(self.not_equal_thresholds, value, left)
+            matched += self.not_equal[:left]
+            matched += self.not_equal[right:]
+        return matched
+
+    def between(self, old: int, new: int) -> list[CompiledRule]:
+        """
+        Находит правила, состояние которых могло измениться при переходе
+        значения от old к new. Остальные правила сработали или не сработали
+        для обоих значений одинаково.
+
+        Args:
+            old (int): Прежнее значение параметра
+            new (int): Новое значение параметра
+
+        Returns:
+            list[CompiledRule]: Правила для повторной проверки
+        """
+        if old == new:
+            return []
+        low, high = min(old, new), max(old, new)
+        changed = self.greater[
+            bisect.bisect_left(self.greater_thresholds, low):
+            bisect.bisect_right(self.greater_thresholds, high)
+        ]
+        changed += self.less[
+            bisect.bisect_left(self.less_thresholds, low):
+            bisect.bisect_right(self.less_thresholds, high)
+        ]
+        for value in (old, new):
+            changed += self.equal.get(value, ())
+            changed += self.not_equal_by_threshold.get(value, ())
+        return changed
+
+
+class RuleIndex:
+    def __init__(
+        self, db_worker: DBMS_worker, refresh_interval: float, sync_values: bool = False
+    ):
+        """
+        Скомпилированный индекс активных правил в памяти сервера.
+
+        Правила загружаются из БД целиком и перечитываются только при изменении
+        счётчика версий rules_version, который увеличивают триггеры таблицы rules.
+        Последние значения параметров хранятся здесь же, поэтому проверка правил
+        на такте устройства не выполняет ни одного SQL-запроса.
+
+        Условия правил проверяются не на такте исполнителя, а при изменении
+        значения параметра: индекс порогов источника сразу даёт все сработавшие
+        правила, и они переносятся в набор активных правил исполнителя.
+
+        Если устройства распределены между несколькими процессами, значения
+        параметров с других процессов попадают в индекс только через БД,
+        поэтому при sync_values они перечитываются на каждой проверке версии.
+
+        Args:
+            db_worker (DBMS_worker): Объект для работы с базой данных
+            refresh_interval (float): Период проверки версии правил в секундах
+            sync_values (bool, optional): Перечитывать значения параметров из БД
+
+        Attributes:
+            by_target (dict): {UUID исполнителя: [CompiledRule]}
+            by_source (dict): {(UUID источника, параметр): [CompiledRule]}
+            thresholds (dict): {(UUID источника, параметр): ThresholdIndex}
+            active (dict): {UUID исполнителя: {rule_id: CompiledRule}} - сработавшие правила
+            values (dict): {(UUID, параметр): (значение, время замера)}
+            version (int | None): Версия загруженного набора правил
+        """
+        self.db_worker = db_worker
+        self.refresh_interval = refresh_interval
+        self.sync_values = sync_values
+        self.by_target = {}
+        self.by_source = {}
+        self.thresholds = {}
+        self.active = {}
+        self.values = {}
+        self.version = None
+        self.running = False
+        self.lock = threading.Lock()
+
+    def rebuild(self, rules: list[dict]) -> None:
+        """
+        Строит индекс заново и атомарно подменяет текущий.
+
+        Args:
+            rules (list[dict]): Активные правила из DBMS_worker.get_active_rules()
+        """
+        by_target = {}
+        by_source = {}
+        for rule in rules:
+            compiled = CompiledRule(rule)
+            by_target.setdefault(compiled.target_device, []).append(compiled)
+            by_source.setdefault(
+                (compiled.source_device, compiled.parameter), []
+            ).append(compiled)
+        thresholds = {key: ThresholdIndex(group) for key, group in by_source.items()}
+
+        with self.lock:
+            for rule in rules:
+                self.store_value(
+                    (rule["source_device"], rule["parameter"]),
+                    rule["value"],
+                    rule["timestamp"],
+                )
+            self.by_target = by_target
+            self.by_source = by_source
+            self.thresholds = thresholds
+            self.active = {}
+            for key, index in thresholds.items():
+                for rule in index.match(self.current_value(key)):
+                    self.activate(rule)
+
+    def refresh(self) -> bool:
+        """
+        Перечитывает правила, если их версия в БД изменилась.
+        При sync_values иначе обновляет только значения параметров.
+        Если правила прочитать не удалось, остаются прежние индекс и версия,
+        и попытка повторяется на следующей проверке.
+
+        Returns:
+            bool: True если индекс был перестроен
+        """
+        version = self.db_worker.get_rules_version()
+        if version is None or (version == self.version and not self.sync_values):
+            return False
+        rules = self.db_worker.get_active_rules()
+        if rules is None:
+            return False
+        if version == self.version:
+            self.load_values(rules)
+            return False
+
+        self.rebuild(rules)
+        self.version = version
+        return True
+
+    def load_values(self, rules: list[dict]) -> None:
+        """
+        Обновляет значения параметров-источников, не перестраивая индекс.
+
+        Args:
+            rules (list[dict]): Активные правила из DBMS_worker.get_active_rules()
+        """
+        for rule in rules:
+            self.set_value(
+                rule["source_device"], rule["parameter"], rule["value"], rule["timestamp"]
+            )
+
+    def refresh_loop(self) -> None:
+        """
+        Фоновый цикл проверки версии правил.
+        """
+        while self.running:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                log.error("Ошибка обновления индекса правил", error=str(e))
+
+    def start(self) -> None:
+        """
+        Загружает правила и запускает фоновое обновление индекса.
+        """
+        self.refresh()
+        self.running = True
+        threading.Thread(target=self.refresh_loop, daemon=True).start()
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновое обновление индекса.
+        """
+        self.running = False
+
+    def set_value(
+        self, device_uuid: str, parameter: str, value: int, timestamp: datetime
+    ) -> None:
+        """
+        Сохраняет значение параметра, если оно новее уже известного.
+
+        Args:
+            device_uuid (str): UUID устройства-источника
+            parameter (str): Название параметра
+            value (int): Значение параметра
+            timestamp (datetime): Время замера
+        """
+        key = (device_uuid, parameter)
+        with self.lock:
+            previous = self.current_value(key)
+            if self.store_value(key, value, timestamp) and key in self.thresholds:
+                self.rematch(key, previous, value)
+
+    def store_value(self, key: tuple, value: int, timestamp: datetime) -> bool:
+        """
+        Сохраняет значение, если оно новее уже известного. Вызывается под self.lock.
+
+        Args:
+            key (tuple): (UUID устройства, параметр)
+            value (int): Значение параметра
+            timestamp (datetime): Время замера
+
+        Returns:
+            bool: True если значение сохранено
+        """
+        current = self.values.get(key)
+        if current is None or current[1] is None or (
+            timestamp is not None and timestamp >= current[1]
+        ):
+            self.values[key] = (value, timestamp)
+            return True
+        return False
+
+    def current_value(self, key: tuple) -> int:
+        """
+        Returns:
+            int: Последнее значение параметра или 0, как в get_value
+        """
+        value = self.values.get(key)
+        return 0 if value is None else value[0]
+
+    def activate(self, rule: CompiledRule) -> None:
+        """Добавляет правило в активные правила исполнителя. Вызывается под self.lock"""
+        self.active.setdefault(rule.target_device, {})[rule.rule_id] = rule
+
+    def rematch(self, key: tuple, old: int, new: int) -> None:
+        """
+        Перепроверяет правила параметра, состояние которых могло измениться
+        при переходе значения от old к new, и обновляет активные правила
+        исполнителей. Вызывается под self.lock.
+
+        Args:
+            key (tuple): (UUID источника, параметр)
+            old (int): Прежнее значение параметра
+            new (int): Новое значение параметра
+        """
+        for rule in self.thresholds[key].between(old, new):
+            if rule.matches(new):
+                self.activate(rule)
+            else:
+                self.active.get(rule.target_device, {}).pop(rule.rule_id, None)
+
+    def update_values(
+        self, device_uuid: str, data: dict, timestamp: datetime = None
+    ) -> None:
+        """
+        Обновляет последние значения параметров устройства.
+
+        Args:
+            device_uuid (str): UUID устройства-источника
+            data (dict): Словарь {параметр: значение}
+            timestamp (datetime, optional): Время замера. По умолчанию - текущее
+        """
+        now = timestamp or datetime.now()
+        for parameter, value in data.items():
+            self.set_value(device_uuid, parameter, value, now)
+
+    def get_value(self, device_uuid: str, parameter: str, default: int = 0) -> int:
+        """
+        Возвращает последнее известное значение параметра.
+
+        Args:
+            device_uuid (str): UUID устройства-источника
+            parameter (str): Название параметра
+            default (int): Значение при отсутствии данных
+
+        Returns:
+            int: Последнее значение параметра
+        """
+        value = self.values.get((device_uuid, parameter))
+        return default if value is None else value[0]
+
+    def rules_for_target(self, target_uuid: str) -> list[CompiledRule]:
+        """
+        Возвращает активные правила для устройства-исполнителя.
+
+        Args:
+            target_uuid (str): UUID целевого устройства
+
+        Returns:
+            list[CompiledRule]: Список правил
+        """
+        return self.by_target.get(target_uuid, [])
+
+    def active_rules(self, target_uuid: str) -> list[CompiledRule]:
+        """
+        Возвращает правила устройства-исполнителя, условия которых сейчас выполнены.
+
+        Args:
+            target_uuid (str): UUID целевого устройства
+
+        Returns:
+            list[CompiledRule]: Сработавшие правила в порядке rule_id
+        """
+        with self.lock:
+            rules = list(self.active.get(target_uuid, {}).values())
+        rules.sort(key=lambda rule: rule.rule_id)
+        return rules
+
+    def rules_for_source(self, source_uuid: str, parameter: str) -> list[CompiledRule]:
+        """
+        Возвращает активные правила, зависящие от параметра устройства-источника.
+
+        Args:
+            source_uuid (str): UUID устройства-источника
+            parameter (str): Название параметра
+
+        Returns:
+            list[CompiledRule]: Список правил
+        """
+        return self.by_source.get((source_uuid, parameter), [])
@@ -0,0 +1,190 @@
+import math
+import time
+import threading
+
+
+class PollScheduler:
+    def __init__(
+        self,
+        spread: float,
+        target_rate: int,
+        max_stretch: float,
+        window: int,
+    ):
+        """
+        Планировщик задержек опроса устройств.
+
+        Сервер не возвращает всем устройствам одну и ту же задержку: для каждого
+        устройства выбирается секунда следующего выхода на связь, на которую
+        запланировано меньше всего устройств. Устройства, подключившиеся
+        одновременно, за один цикл расходятся по всему интервалу и не приходят
+        к серверу и БД пачками.
+
+        Запрошенная задержка (SEND_STATE_DELAY или задержка правила) - нижняя
+        граница: устройство не опрашивается чаще. Выбор идёт среди задержек
+        [delay, delay + delay * spread]. Если во всех этих секундах уже
+        запланировано target_rate устройств, окно расширяется до
+        delay * max_stretch - при высокой нагрузке устройства опрашиваются реже.
+
+        Args:
+            spread (float): Ширина окна выбора как доля запрошенной задержки
+            target_rate (int): Желаемое максимальное число выходов на связь в секунду
+            max_stretch (float): Во сколько раз задержку можно увеличить под нагрузкой
+            window (int): Сколько последних секунд хранить историю выходов на связь
+
+        Attributes:
+            scheduled (dict): {секунда: число устройств, запланированных на неё}
+            assigned (dict): {UUID устройства: запланированная секунда}
+            arrivals (list): Число выходов на связь по секундам за последние window секунд
+            stretched (int): Число задержек, увеличенных из-за нагрузки
+        """
+        self.spread = spread
+        self.target_rate = target_rate
+        self.max_stretch = max(1.0, max_stretch)
+        self.window = window
+        self.scheduled = {}
+        self.assigned = {}
+        self.arrivals = [0] * window
+        self.arrivals_second = self.now()
+        self.stretched = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def now() -> int:
+        return int(time.monotonic())
+
+    def advance(self, second: int) -> None:
+        """
+        Сдвигает историю выходов на связь и удаляет прошедшие секунды расписания.
+        Вызывается под self.lock.
+
+        Args:
+            second (int): Текущая секунда
+        """
+        passed = second - self.arrivals_second
+        if passed <= 0:
+            return
+        if passed >= self.window:
+            self.arrivals = [0] * self.window
+        else:
+            self.arrivals = self.arrivals[passed:] + [0] * passed
+        self.arrivals_second = second
+
+        for slot in [slot for slot in self.scheduled if slot < second]:
+            del self.scheduled[slot]
+
+    def release(self, device_uuid: str) -> None:
+        """
+        Снимает место устройства в расписании. Вызывается под self.lock.
+
+        Args:
+            device_uuid (str): UUID устройства
+        """
+        slot = self.assigned.pop(device_uuid, None)
+        if slot in self.scheduled:
+            self.scheduled[slot] -= 1
+            if not self.scheduled[slot]:
+                del self.scheduled[slot]
+
+    def pick_delay(self, second: int, delay: int) -> int:
+        """
+        Выбирает задержку с наименее загруженной секундой выхода на связь.
+        Из равных выбирается меньшая задержка. Вызывается под self.lock.
+
+        Args:
+            second (int): Текущая секунда
+            delay (int): Запрошенная задержка в секундах
+
+        Returns:
+            int: Назначенная задержка в секундах
+        """
+        widest = max(delay, math.ceil(delay * self.max_stretch))
+        last = min(widest, delay + math.ceil(delay * self.spread))
+
+        best, best_load = delay, None
+        candidate = delay
+        while candidate <= widest:
+            load = self.scheduled.get(second + candidate, 0)
+            if best_load is None or load < best_load:
+                best, best_load = candidate, load
+            # Окно пройдено и свободное место найдено - дальше не растягиваем
+            if candidate >= last and best_load < self.target_rate:
+                break
+            candidate += 1
+
+        if best > last:
+            self.stretched += 1
+        return best
+
+    def assign(self, device_uuid: str, delay: int) -> int:
+        """
+        Отмечает выход устройства на связь и назначает ему задержку до следующего.
+
+        Args:
+            device_uuid (str): UUID устройства
+            delay (int): Запрошенная задержка в секундах
+
+        Returns:
+            int: Назначенная задержка в секундах (не меньше запрошенной)
+        """
+        if delay <= 0:
+            return delay
+        second = self.now()
+        with self.lock:
+            self.advance(second)
+            self.arrivals[-1] += 1
+            self.release(device_uuid)
+            assigned = self.pick_delay(second, delay)
+            slot = second + assigned
+            self.scheduled[slot] = self.scheduled.get(slot, 0) + 1
+            self.assigned[device_uuid] = slot
+        return assigned
+
+    def forget(self, device_uuid: str) -> None:
+        """
+        Убирает отключившееся устройство из расписания.
+
+        Args:
+            device_uuid (str): UUID устройства
+        """
+        with self.lock:
+            self.release(device_uuid)
+
+    def arrival_rates(self) -> list[int]:
+        """
+        Returns:
+            list[int]: Число выходов на связь в каждую из последних window
+            завершившихся секунд, от старых к новым
+        """
+        with self.lock:
+            self.advance(self.now())
+            return self.arrivals[:-1]
+
+    def upcoming(self, seconds: int) -> list[int]:
+        """
+        Args:
+            seconds (int): Горизонт в секундах
+
+        Returns:
+            list[int]: Число запланированных выходов на связь в каждую из
+            следующих seconds секунд
+        """
+        second = self.now()
+        with self.lock:
+            return [self.scheduled.get(second + i, 0) for i in range(1, seconds + 1)]
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: {'arrival_rate_mean', 'arrival_rate_peak', 'scheduled_devices',
+                'stretched'} - средняя и пиковая частота выходов на связь за окно
+        """
+        rates = self.arrival_rates()
+        with self.lock:
+            scheduled_devices = len(self.assigned)
+        return {
+            "arrival_rate_mean": round(sum(rates) / len(rates), 2) if rates else 0,
+            "arrival_rate_peak": max(rates, default=0),
+            "scheduled_devices": scheduled_devices,
+            "stretched": self.stretched,
+        }
@@ -0,0 +1,77 @@
+import hmac
+import json
+import time
+import base64
+import hashlib
+
+from config import ENCRYPTION_KEY
+
+TAG_SIZE = 16
+
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokens:
+    def __init__(self, ttl: int):
+        """
+        Выдача и проверка токенов возобновления сессии.
+
+        Токен содержит UUID и имя устройства и время истечения, подписанные
+        HMAC-SHA256 ключом, выведенным из ENCRYPTION_KEY. Сервер не хранит
+        выданные токены, поэтому токен принимает любой процесс-обработчик,
+        в том числе после перезапуска сервера.
+
+        Args:
+            ttl (int): Время жизни токена в секундах
+        """
+        self.ttl = ttl
+        self.key = hmac.new(ENCRYPTION_KEY, b"session-token", hashlib.sha256).digest()
+
+    def sign(self, body: bytes) -> bytes:
+        return hmac.new(self.key, body, hashlib.sha256).digest()[:TAG_SIZE]
+
+    def issue(self, device_uuid: str, device_name: str) -> str:
+        """
+        Выдаёт токен возобновления сессии.
+
+        Args:
+            device_uuid (str): UUID устройства
+            device_name (str): Имя устройства
+
+        Returns:
+            str: Токен вида "данные.подпись" в base64url
+        """
+        body = json.dumps(
+            {"uuid": device_uuid, "name": device_name, "expires": int(time.time()) + self.ttl},
+            separators=(",", ":"),
+        ).encode("utf-8")
+        return f"{b64encode(body)}.{b64encode(self.sign(body))}"
+
+    def verify(self, token: str) -> tuple[str, str] | None:
+        """
+        Проверяет подпись и срок действия токена.
+
+        Args:
+            token (str): Токен, предъявленный устройством
+
+        Returns:
+            tuple | None: (имя устройства, UUID) или None, если токен
+            повреждён, подделан или истёк
+        """
+        try:
+            body_text, tag_text = token.split(".")
+            body = b64decode(body_text)
+            if not hmac.compare_digest(self.sign(body), b64decode(tag_text)):
+                return None
+            claims = json.loads(body)
+        except (AttributeError, ValueError):
+            return None
+        if claims.get("expires", 0) < time.time():
+            return None
+        return claims.get("name"), claims.get("uuid")
@@ -0,0 +1,120 @@
+import os
+import sys
+import socket
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from logutil import Logger
+
+log = Logger("iot-server.takeover")
+
+HANDOFF_MESSAGE = b"listener"
+READY_MESSAGE = b"ready"
+HANDOFF_TIMEOUT = 10
+
+
+class ListenerHandoff:
+    def __init__(self, path: str, listener: socket.socket, on_handoff):
+        """
+        Передача слушающего сокета новому процессу сервера через Unix-сокет.
+
+        Новый процесс подключается к path и получает дескриптор слушающего
+        сокета (SCM_RIGHTS). Сокет остаётся открытым в обоих процессах,
+        поэтому входящие подключения не теряются: их очередь в ядре общая.
+        Когда новый процесс сообщает о готовности, вызывается on_handoff -
+        текущий процесс перестаёт принимать подключения и переходит к drain.
+
+        Args:
+            path (str): Путь Unix-сокета
+            listener (socket.socket): Слушающий сокет сервера
+            on_handoff (callable): Функция без аргументов, вызываемая после передачи
+        """
+        self.path = path
+        self.listener = listener
+        self.on_handoff = on_handoff
+        self.sock = None
+
+    def start(self) -> None:
+        """
+        Открывает Unix-сокет и ждёт новый процесс в фоновом потоке.
+        Прежний файл сокета удаляется: им владел предыдущий процесс.
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        self.sock.listen(1)
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        """
+        Передаёт слушающий сокет первому подключившемуся процессу.
+        """
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(HANDOFF_TIMEOUT)
+                    socket.send_fds(conn, [HANDOFF_MESSAGE], [self.listener.fileno()])
+                    if conn.recv(len(READY_MESSAGE)) != READY_MESSAGE:
+                        raise ConnectionError("Новый процесс не подтвердил готовность")
+                except OSError as e:
+                    log.warning("Передача слушающего сокета не удалась", error=str(e))
+                    continue
+            log.info("Слушающий сокет передан новому процессу")
+            self.stop(unlink=False)
+            self.on_handoff()
+            return
+
+    def stop(self, unlink: bool = True) -> None:
+        """
+        Закрывает Unix-сокет.
+
+        Args:
+            unlink (bool, optional): Удалить файл сокета. После передачи
+                файлом уже владеет новый процесс
+        """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            if unlink and os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+def receive_listener(path: str) -> tuple[socket.socket, socket.socket]:
+    """
+    Получает слушающий сокет у работающего процесса сервера.
+
+    Args:
+        path (str): Путь Unix-сокета работающего процесса
+
+    Returns:
+        tuple: (слушающий сокет, соединение для подтверждения готовности через
+        confirm_takeover)
+
+    Raises:
+        ConnectionError: Если процесс не передал дескриптор
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(HANDOFF_TIMEOUT)
+    conn.connect(path)
+    message, fds, _, _ = socket.recv_fds(conn, len(HANDOFF_MESSAGE), 1)
+    if message != HANDOFF_MESSAGE or not fds:
+        conn.close()
+        raise ConnectionError("Слушающий сокет не получен")
+    return socket.socket(fileno=fds[0]), conn
+
+
+def confirm_takeover(conn: socket.socket) -> None:
+    """
+    Сообщает прежнему процессу, что новый процесс принимает подключения.
+
+    Args:
+        conn (socket.socket): Соединение из receive_listener
+    """
+    with conn:
+        conn.sendall(READY_MESSAGE)
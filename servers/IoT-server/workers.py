@@ -0,0 +1,203 @@
+import os
+import sys
+import time
+import queue
+import signal
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from logutil import Logger, setup_logging
+from config import METRICS_PORT, LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, DRAIN_TIMEOUT
+
+log = Logger("iot-server.workers")
+
+
+def run_worker(
+    server_class: type,
+    server_kwargs: dict,
+    worker_id: int,
+    stats_queue: multiprocessing.Queue,
+    stats_interval: float,
+) -> None:
+    """
+    Точка входа процесса-обработчика: запускает сервер на общем порту
+    и периодически отправляет его счётчики в родительский процесс.
+    Эндпоинт метрик у каждого обработчика свой: METRICS_PORT + 1 + worker_id.
+
+    Args:
+        server_class (type): Server или AsyncServer
+        server_kwargs (dict): Аргументы конструктора сервера
+        worker_id (int): Номер процесса-обработчика
+        stats_queue (multiprocessing.Queue): Очередь для счётчиков
+        stats_interval (float): Период отправки счётчиков в секундах
+    """
+    setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE)
+    metrics_port = METRICS_PORT + 1 + worker_id if METRICS_PORT else 0
+    server = server_class(**server_kwargs, reuse_port=True, metrics_port=metrics_port)
+
+    def report_stats():
+        while True:
+            time.sleep(stats_interval)
+            if server.running:
+                stats_queue.put((worker_id, server.get_stats()))
+
+    threading.Thread(target=report_stats, daemon=True).start()
+    server.start()
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        server_class: type,
+        server_kwargs: dict,
+        processes: int,
+        stats_interval: float,
+    ):
+        """
+        Пул процессов IoT-сервера, совместно слушающих один порт.
+
+        Каждый процесс создаёт собственный сервер со своим пулом соединений
+        к БД, индексом правил и буферами; общей у процессов остаётся только БД.
+        Родительский процесс не принимает подключения: он перезапускает
+        упавшие обработчики и выводит суммарные счётчики.
+
+        Args:
+            server_class (type): Server или AsyncServer
+            server_kwargs (dict): Аргументы конструктора сервера
+            processes (int): Число процессов-обработчиков
+            stats_interval (float): Период вывода счётчиков в секундах
+
+        Attributes:
+            workers (dict): {номер обработчика: multiprocessing.Process}
+            stats (dict): {номер обработчика: последние счётчики}
+            draining (bool): Получен SIGTERM, обработчики больше не перезапускаются
+        """
+        self.server_class = server_class
+        self.server_kwargs = server_kwargs
+        self.processes = processes
+        self.stats_interval = stats_interval
+        # spawn: обработчики не наследуют состояние родителя (сокеты, потоки)
+        self.context = multiprocessing.get_context("spawn")
+        self.stats_queue = self.context.Queue()
+        self.workers = {}
+        self.stats = {}
+        self.draining = False
+
+    def spawn(self, worker_id: int) -> None:
+        """
+        Запускает процесс-обработчик.
+
+        Args:
+            worker_id (int): Номер обработчика
+        """
+        process = self.context.Process(
+            target=run_worker,
+            args=(
+                self.server_class,
+                self.server_kwargs,
+                worker_id,
+                self.stats_queue,
+                self.stats_interval,
+            ),
+            name=f"iot-worker-{worker_id}",
+        )
+        process.start()
+        self.workers[worker_id] = process
+
+    def aggregate_stats(self) -> dict:
+        """
+        Суммирует последние счётчики всех обработчиков.
+
+        Returns:
+            dict: Сумма счётчиков Server.get_stats() по всем обработчикам
+        """
+        total = {}
+        for stats in self.stats.values():
+            for key, value in stats.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    def supervise(self) -> None:
+        """
+        Собирает счётчики обработчиков и перезапускает завершившиеся процессы.
+        """
+        next_report = time.monotonic() + self.stats_interval
+        while not self.draining:
+            try:
+                worker_id, stats = self.stats_queue.get(timeout=1)
+                self.stats[worker_id] = stats
+            except queue.Empty:
+                pass
+
+            for worker_id, process in list(self.workers.items()):
+                if not process.is_alive():
+                    log.warning(
+                        "Обработчик завершился, перезапуск",
+                        worker=worker_id,
+                        exitcode=process.exitcode,
+                    )
+                    self.stats.pop(worker_id, None)
+                    self.spawn(worker_id)
+
+            if time.monotonic() >= next_report:
+                next_report += self.stats_interval
+                total = self.aggregate_stats()
+                if total:
+                    log.info(
+                        "Статистика",
+                        workers=f"{len(self.stats)}/{self.processes}",
+                        **total,
+                    )
+
+    def start(self) -> None:
+        """
+        Запускает обработчики и наблюдает за ними до KeyboardInterrupt или SIGTERM.
+        Обработчики получают SIGINT вместе с родителем и завершаются сами;
+        SIGTERM родитель пересылает обработчикам, и они плавно останавливаются.
+        """
+        for worker_id in range(self.processes):
+            self.spawn(worker_id)
+        log.info(
+            "Процессы-обработчики запущены",
+            processes=self.processes,
+            address=f"{self.server_kwargs['host']}:{self.server_kwargs['port']}",
+        )
+
+        signal.signal(signal.SIGTERM, self.request_drain)
+        try:
+            self.supervise()
+        except KeyboardInterrupt:
+            self.shutdown()
+            return
+        self.drain()
+
+    def request_drain(self, signum, frame) -> None:
+        """
+        Обработчик SIGTERM: завершает наблюдение за обработчиками.
+        """
+        self.draining = True
+
+    def drain(self) -> None:
+        """
+        Пересылает SIGTERM обработчикам и ждёт их плавной остановки.
+        """
+        log.info("Плавная остановка обработчиков", processes=len(self.workers))
+        for process in self.workers.values():
+            if process.is_alive():
+                process.terminate()
+        self.shutdown(timeout=DRAIN_TIMEOUT + 5)
+
+    def shutdown(self, timeout: float = 10) -> None:
+        """
+        Дожидается завершения обработчиков, зависшие останавливает принудительно.
+
+        Args:
+            timeout (float, optional): Время ожидания каждого обработчика в секундах
+        """
+        for process in self.workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        log.info("Все обработчики остановлены")
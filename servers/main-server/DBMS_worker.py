@@ -1,99 +1,93 @@
-import mysql.connector
+import os
+import sys
 from datetime import datetime
 
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from dbaccess import open_database
+
 
 class DBMS_worker:
-    def __init__(self, host: str, user: str, password: str, db_name: str):
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        password: str,
+        db_name: str,
+        pool_size: int = 10,
+        backend: str = "mysql",
+    ):
         """
-        Инициализирует соединение с MySQL сервером и подключается к базе данных.
+        Инициализирует пул соединений с MySQL сервером и подключается к базе данных.
+        Если база не существует - создает её вместе с таблицей пользователей.
+
+        Каждый запрос выполняется на своём соединении из пула, поэтому объект
+        используется из потоков обработки клиентов без общего курсора.
 
         Args:
             host (str): Хост MySQL сервера
             user (str): Имя пользователя
             password (str): Пароль пользователя
             db_name (str): Название базы данных
+            pool_size (int, optional): Наибольшее число соединений с БД
+            backend (str, optional): Тип БД: "mysql" или "sqlite" (встроенная,
+                host, user и password не используются)
 
         Attributes:
             created (bool): Флаг успешного подключения
             error (str): Сообщение об ошибке при неудачном подключении
+            db (Database): Общий пул соединений (dbaccess)
         """
         try:
-            self.cnx = mysql.connector.connect(
-                host=host, user=user, password=password, autocommit=True
-            )
-            self.cursor = self.cnx.cursor(buffered=True)
-            self.connect_to_db(db_name)
+            self.db = open_database(backend, host, user, password, db_name, pool_size)
+            self.create_tables()
             self.created = True
         except Exception as e:
             self.created = False
             self.error = str(e)
 
-    def connect_to_db(self, db_name: str) -> None:
-        """
-        Подключается к указанной базе данных. Если база не существует - создает её.
-
-        Args:
-            db_name (str): Название базы данных для подключения
+    def create_tables(self) -> None:
         """
-        try:
-            self.cursor.execute(f"USE {db_name}")
-        except mysql.connector.Error as err:
-            if err.errno == mysql.connector.errorcode.ER_BAD_DB_ERROR:
-                self.create_db(db_name)
-            else:
-                raise
-
-    def create_db(self, db_name: str) -> None:
-        """
-        Создает новую базу данных и все необходимые таблицы:
-        - devices (устройства)
-        - actual_data (актуальные показатели)
-        - data_history (история изменений)
-        - rules (правила обработки данных)
-        - tasks (задачи для устройств)
-
-        Также создает триггеры для автоматического сохранения истории изменений.
+        Создает таблицу пользователей с датой окончания подписки, если её нет.
+        Запрос подходит и для SQLite (AUTO_INCREMENT переводится в AUTOINCREMENT).
         """
-        self.cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
-        self.cursor.execute(f"USE {db_name}")
-
-        self.cursor.execute(
+        self.db.execute(
             """
             CREATE TABLE IF NOT EXISTS users (
-                user_id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INTEGER PRIMARY KEY AUTO_INCREMENT,
                 user_login VARCHAR(255) UNIQUE NOT NULL,
                 user_subscription_until DATETIME NOT NULL
             )
-        """
+        """,
+            prepared=False,
         )
 
     def add_user(self, login: str, subscription_end: datetime) -> int:
         """Добавление пользователя с подпиской"""
         try:
-            self.cursor.execute(
+            return self.db.execute(
                 """
                 INSERT INTO users (user_login, user_subscription_until)
                 VALUES (%s, %s)
                 """,
                 (login, subscription_end),
-            )
-            self.cnx.commit()
-            return self.cursor.lastrowid
+            ).lastrowid
         except mysql.connector.Error as e:
             print(f"Ошибка добавления пользователя: {e}")
             return -1
 
     def check_subscription(self, login: str) -> dict:
         """Проверка активности подписки"""
-        self.cursor.execute(
+        result = self.db.query_one(
             """
-            SELECT user_subscription_until 
-            FROM users 
+            SELECT user_subscription_until
+            FROM users
             WHERE user_login = %s
             """,
             (login,),
         )
-        result = self.cursor.fetchone()
 
         if not result:
             return {"active": False, "reason": "User not found"}
@@ -105,7 +99,3 @@ class DBMS_worker:
             "active": is_active,
             "until": subscription_end.isoformat() if is_active else None,
         }
-
-    def __del__(self):
-        self.cursor.close()
-        self.cnx.close()
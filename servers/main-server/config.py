@@ -2,3 +2,11 @@ MAIN_SERV_ADDR = "localhost"
 MAIN_SERV_PORT = 9050
 
 ENCRYPTION_KEY = b"WahrheitUndLiebe"
+
+# Тип БД: "mysql" - сервер MariaDB, "sqlite" - встроенная БД SQLite в режиме WAL
+# (файлы в каталоге data/ в корне проекта) для установки всех компонентов на одном компьютере
+DB_BACKEND = "mysql"
+
+# Журнал: уровень (DEBUG, INFO, WARNING, ERROR) и формат ("text" или "json")
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "text"
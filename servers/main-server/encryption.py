@@ -3,12 +3,13 @@ from Crypto.Cipher import AES
 from config import ENCRYPTION_KEY
 
 
-def encrypt(message: str) -> bytes:
+def encrypt(message: str | bytes) -> bytes:
     """
-    Шифрует строковое сообщение с использованием AES в режиме EAX.
+    Шифрует сообщение с использованием AES в режиме EAX.
 
     Args:
-        message (str): Исходное сообщение для шифрования
+        message (str | bytes): Исходное сообщение для шифрования.
+            Строки предварительно кодируются в UTF-8
 
     Returns:
         bytes: Зашифрованные данные в формате:
@@ -21,7 +22,7 @@ def encrypt(message: str) -> bytes:
     """
     cipher = AES.new(ENCRYPTION_KEY, AES.MODE_EAX)
 
-    byte_message = message.encode("utf-8")
+    byte_message = message.encode("utf-8") if isinstance(message, str) else message
     cipher_message, tag = cipher.encrypt_and_digest(byte_message)
     nonce = cipher.nonce
     byte_data = tag + nonce + cipher_message
@@ -29,6 +30,30 @@ def encrypt(message: str) -> bytes:
     return byte_data
 
 
+def decrypt_bytes(byte_data: bytes) -> bytes:
+    """
+    Дешифрует данные из формата AES-EAX без декодирования в строку.
+
+    Args:
+        byte_data (bytes): Данные в формате [тег][nonce][шифротекст]
+
+    Returns:
+        bytes: Расшифрованное исходное сообщение
+
+    Raises:
+        ValueError: При неверном формате данных или аутентификационном теге
+    """
+    tag = byte_data[:16]
+    nonce = byte_data[16:32]
+    cipher_message = byte_data[32:]
+
+    try:
+        cipher = AES.new(ENCRYPTION_KEY, AES.MODE_EAX, nonce=nonce)
+        return cipher.decrypt_and_verify(cipher_message, tag)
+    except ValueError:
+        raise ValueError("Ошибка дешифрования. Невалидные данные")
+
+
 def decrypt(byte_data: bytes) -> str:
     """
     Дешифрует данные из формата AES-EAX.
@@ -51,15 +76,9 @@ def decrypt(byte_data: bytes) -> str:
         3. Дешифрует сообщение
         4. Проверяет кодировку UTF-8
     """
-    tag = byte_data[:16]
-    nonce = byte_data[16:32]
-    cipher_message = byte_data[32:]
+    byte_message = decrypt_bytes(byte_data)
 
     try:
-        cipher = AES.new(ENCRYPTION_KEY, AES.MODE_EAX, nonce=nonce)
-        byte_message = cipher.decrypt_and_verify(cipher_message, tag)
         return byte_message.decode("utf-8")
-    except ValueError:
-        raise ValueError("Ошибка дешифрования. Невалидные данные")
     except UnicodeDecodeError:
         raise ValueError("Ошибка дешифрования. Сообщение использует не UTF-8")
@@ -1,10 +1,18 @@
+import os
+import sys
 import socket
-import struct
 import json
 from threading import Thread
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
 from encryption import encrypt, decrypt
+from transport import recv_frame, send_frame
+from logutil import Logger, setup_logging
 from DBMS_worker import DBMS_worker
-from config import MAIN_SERV_ADDR, MAIN_SERV_PORT
+from config import MAIN_SERV_ADDR, MAIN_SERV_PORT, LOG_LEVEL, LOG_FORMAT, DB_BACKEND
+
+log = Logger("main-server")
 
 
 class MainServer:
@@ -12,7 +20,11 @@ class MainServer:
         self.host = host
         self.port = port
         self.db = DBMS_worker(
-            host="localhost", user="root", password="123", db_name="GreenHouseMain"
+            host="localhost",
+            user="root",
+            password="123",
+            db_name="GreenHouseMain",
+            backend=DB_BACKEND,
         )
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -20,54 +32,42 @@ class MainServer:
     def handle_client(self, conn, addr):
         """Обработка клиентского соединения"""
         try:
-            raw_length = conn.recv(4)
-            if len(raw_length) != 4:
-                print("Некорректная длина данных")
+            try:
+                encrypted_data = recv_frame(conn)
+            except ConnectionError as e:
+                log.warning("Некорректный запрос", addr=addr, error=str(e))
                 return
 
-            data_length = struct.unpack("!I", raw_length)[0]
-
-            encrypted_data = bytearray()
-            while len(encrypted_data) < data_length:
-                chunk = conn.recv(min(4096, data_length - len(encrypted_data)))
-                if not chunk:
-                    print("Соединение разорвано")
-                    return
-                encrypted_data.extend(chunk)
-
             try:
-                decrypted = decrypt(bytes(encrypted_data))
+                decrypted = decrypt(encrypted_data)
             except Exception as e:
-                print(f"Декодирование не удалось: {str(e)}")
+                log.warning("Декодирование не удалось", addr=addr, error=str(e))
                 return
 
             try:
                 request = json.loads(decrypted)
             except json.JSONDecodeError as e:
-                print(f"Ошибка декодирования JSON: {str(e)}")
-                print(f"Данные: {decrypted}")
+                log.warning(
+                    "Ошибка декодирования JSON", addr=addr, error=str(e), data=decrypted
+                )
                 return
 
             if "email" not in request:
-                print("Не указан 'email' в запросе")
+                log.warning("Не указан 'email' в запросе", addr=addr)
                 return
 
-            print(f"Проверка подписки для: {request['email']}")
+            log.debug("Проверка подписки", email=request["email"])
 
             response = self.db.check_subscription(request["email"])
-            print(f"Статус подписки: {response}")
+            log.info("Статус подписки", email=request["email"], status=response)
 
             response_str = json.dumps(response)
             encrypted_response = encrypt(response_str)
 
-            conn.sendall(struct.pack("!I", len(encrypted_response)))
-            conn.sendall(encrypted_response)
+            send_frame(conn, encrypted_response)
 
         except Exception as e:
-            print(f"Ошибка обработки запроса: {e}")
-            import traceback
-
-            traceback.print_exc()
+            log.logger.exception("Ошибка обработки запроса: %s", e)
         finally:
             conn.close()
 
@@ -75,7 +75,7 @@ class MainServer:
         """Запуск сервера"""
         self.socket.bind((self.host, self.port))
         self.socket.listen(5)
-        print(f"Главный сервер запущен на {self.host}:{self.port}")
+        log.info("Главный сервер запущен", address=f"{self.host}:{self.port}")
 
         while True:
             conn, addr = self.socket.accept()
@@ -84,5 +84,6 @@ class MainServer:
 
 
 if __name__ == "__main__":
+    setup_logging(LOG_LEVEL, LOG_FORMAT)
     server = MainServer(MAIN_SERV_ADDR, MAIN_SERV_PORT)
     server.start()
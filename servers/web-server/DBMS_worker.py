@@ -1,194 +1,64 @@
+import os
+import sys
+
 import mysql.connector
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from dbaccess import open_database
+from dbaccess.migrations import apply_migrations, ROLLUPS
+
 
 class DBMS_worker:
-    def __init__(self, host: str, user: str, password: str, db_name: str):
-        """
-        Инициализирует соединение с MySQL сервером и подключается к базе данных.
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        password: str,
+        db_name: str,
+        pool_size: int = 10,
+        prepared_cache_size: int = 64,
+        backend: str = "mysql",
+    ):
+        """
+        Инициализирует пул соединений с MySQL сервером и подключается к базе данных.
+        Если база не существует - создает её. Схема приводится к актуальной версии
+        миграциями (dbaccess/migrations.py).
+
+        Каждый запрос выполняется на своём соединении из пула, поэтому объект
+        используется из всех потоков Flask без общего курсора.
 
         Args:
             host (str): Хост MySQL сервера
             user (str): Имя пользователя
             password (str): Пароль пользователя
             db_name (str): Название базы данных
+            pool_size (int, optional): Наибольшее число соединений с БД
+            prepared_cache_size (int, optional): Подготовленных запросов на соединение
+            backend (str, optional): Тип БД: "mysql" или "sqlite" (встроенная,
+                host, user и password не используются)
 
         Attributes:
             created (bool): Флаг успешного подключения
             error (str): Сообщение об ошибке при неудачном подключении
+            db (Database): Общий пул соединений (dbaccess); его методы query,
+                query_one, query_dicts и execute доступны и напрямую
         """
         try:
-            self.cnx = mysql.connector.connect(
-                host=host, user=user, password=password, autocommit=True
+            self.db = open_database(
+                backend, host, user, password, db_name, pool_size, prepared_cache_size
             )
-            self.cursor = self.cnx.cursor(buffered=True)
-            self.connect_to_db(db_name)
+            with self.db.connection() as conn:
+                apply_migrations(conn)
+            self.query = self.db.query
+            self.query_one = self.db.query_one
+            self.query_dicts = self.db.query_dicts
+            self.execute = self.db.execute
             self.created = True
         except Exception as e:
             self.created = False
             self.error = str(e)
 
-    def connect_to_db(self, db_name: str) -> None:
-        """
-        Подключается к указанной базе данных. Если база не существует - создает её.
-
-        Args:
-            db_name (str): Название базы данных для подключения
-        """
-        try:
-            self.cursor.execute(f"USE {db_name}")
-        except mysql.connector.Error as err:
-            if err.errno == mysql.connector.errorcode.ER_BAD_DB_ERROR:
-                self.create_db(db_name)
-            else:
-                raise
-
-    def create_db(self, db_name: str) -> None:
-        """
-        Создает новую базу данных и все необходимые таблицы:
-        - devices (устройства)
-        - actual_data (актуальные показатели)
-        - data_history (история изменений)
-        - rules (правила обработки данных)
-        - tasks (задачи для устройств)
-
-        Также создает триггеры для автоматического сохранения истории изменений.
-        """
-        self.cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
-        self.cursor.execute(f"USE {db_name}")
-
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS sectors (
-                sector_id INTEGER NOT NULL AUTO_INCREMENT,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                PRIMARY KEY (sector_id)
-            );
-            """
-        )
-
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS devices (
-                device_id INTEGER NOT NULL AUTO_INCREMENT,
-                device_uuid CHAR(36) UNIQUE,
-                device_name VARCHAR(255),
-                sector_id INTEGER DEFAULT NULL,
-                device_last_communication DATETIME DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (device_id),
-                FOREIGN KEY (sector_id) REFERENCES sectors(sector_id) ON DELETE SET NULL
-            );
-        """
-        )
-
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS actual_data (
-                data_id INTEGER NOT NULL AUTO_INCREMENT,
-                data_device_id INTEGER,
-                data_name VARCHAR(255),
-                data_value INTEGER,
-                data_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (data_id),
-                UNIQUE KEY device_param (data_device_id, data_name),
-                FOREIGN KEY (data_device_id)
-                REFERENCES devices(device_id)
-                ON DELETE CASCADE
-            );
-        """
-        )
-
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS data_history (
-                data_id INTEGER NOT NULL AUTO_INCREMENT,
-                data_device_id INTEGER,
-                data_name VARCHAR(255),
-                data_value INTEGER,
-                data_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (data_id),
-                FOREIGN KEY (data_device_id)
-                REFERENCES devices(device_id)
-                ON DELETE CASCADE
-            );
-        """
-        )
-
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS rules (
-                rule_id INTEGER NOT NULL AUTO_INCREMENT,
-                rule_data_id INTEGER,
-                rule_condition INTEGER,
-                rule_value INTEGER,
-                rule_device_id INTEGER,
-                rule_message VARCHAR(255),
-                is_active BOOLEAN DEFAULT TRUE,
-                PRIMARY KEY (rule_id),
-                FOREIGN KEY (rule_data_id)
-                REFERENCES actual_data(data_id)
-                ON DELETE CASCADE,
-                FOREIGN KEY (rule_device_id)
-                REFERENCES devices(device_id)
-                ON DELETE CASCADE
-            );
-        """
-        )
-
-        self.cursor.execute(
-            """
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER NOT NULL AUTO_INCREMENT,
-            email VARCHAR(255) NOT NULL UNIQUE,
-            password_hash VARCHAR(255) NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (user_id)
-        );
-        """
-        )
-
-        self.cursor.execute(
-            """
-            CREATE TRIGGER IF NOT EXISTS after_actual_data_insert
-            AFTER INSERT ON actual_data
-            FOR EACH ROW
-            INSERT INTO data_history (
-                data_device_id, 
-                data_name, 
-                data_value, 
-                data_timestamp
-            )
-            VALUES (
-                NEW.data_device_id,
-                NEW.data_name, 
-                NEW.data_value, 
-                NEW.data_timestamp
-            );
-        """
-        )
-
-        self.cursor.execute(
-            """
-            CREATE TRIGGER IF NOT EXISTS after_actual_data_update
-            AFTER UPDATE ON actual_data
-            FOR EACH ROW
-            BEGIN
-                INSERT INTO data_history (
-                    data_device_id, 
-                    data_name, 
-                    data_value, 
-                    data_timestamp
-                )
-                VALUES (
-                    NEW.data_device_id, 
-                    NEW.data_name, 
-                    NEW.data_value, 
-                    NEW.data_timestamp
-                );
-            END;
-        """
-        )
-
     def get_device_id(self, device_uuid: str) -> int | None:
         """
         Получает ID устройства по его UUID.
@@ -199,7 +69,7 @@ class DBMS_worker:
         Returns:
             int | None: ID устройства или None если не найдено
         """
-        self.cursor.execute(
+        query_result = self.db.query_one(
             """
             SELECT device_id
             FROM devices
@@ -207,7 +77,6 @@ class DBMS_worker:
             """,
             (device_uuid,),
         )
-        query_result = self.cursor.fetchone()
         if query_result:
             return query_result[0]
         else:
@@ -226,7 +95,7 @@ class DBMS_worker:
             bool: True при успешном добавлении
         """
         try:
-            self.cursor.execute(
+            self.db.execute(
                 """
                 INSERT INTO devices (device_uuid, device_name, sector_id)
                 VALUES (%s, %s, %s)
@@ -248,14 +117,13 @@ class DBMS_worker:
             bool: True при успешном удалении
         """
         try:
-            self.cursor.execute(
+            return self.db.execute(
                 """
                 DELETE FROM devices 
                 WHERE device_id = %s
                 """,
                 (device_id,),
-            )
-            return self.cursor.rowcount > 0
+            ).rowcount > 0
         except mysql.connector.Error as e:
             return False
 
@@ -271,26 +139,24 @@ class DBMS_worker:
             bool: True при успешном обновлении
         """
         try:
-            self.cursor.execute(
+            if not self.db.query_one(
                 """
                 SELECT sector_id 
                 FROM sectors 
                 WHERE sector_id = %s
                 """,
                 (sector_id,),
-            )
-            if not self.cursor.fetchone():
+            ):
                 return False
 
-            self.cursor.execute(
+            return self.db.execute(
                 """
                 UPDATE devices 
                 SET sector_id = %s 
                 WHERE device_id = %s
                 """,
                 (sector_id, device_id),
-            )
-            return self.cursor.rowcount > 0
+            ).rowcount > 0
         except mysql.connector.Error as e:
             return False
 
@@ -305,15 +171,14 @@ class DBMS_worker:
             bool: True при успешном обновлении
         """
         try:
-            self.cursor.execute(
+            return self.db.execute(
                 """
                 UPDATE devices 
                 SET sector_id = NULL 
                 WHERE device_id = %s
                 """,
                 (device_id,),
-            )
-            return self.cursor.rowcount > 0
+            ).rowcount > 0
         except mysql.connector.Error as e:
             return False
 
@@ -329,14 +194,13 @@ class DBMS_worker:
             int | None: ID созданного сектора или None при ошибке
         """
         try:
-            self.cursor.execute(
+            return self.db.execute(
                 """
                 INSERT INTO sectors (name, description)
                 VALUES (%s, %s)
                 """,
                 (name, description),
-            )
-            return self.cursor.lastrowid
+            ).lastrowid
         except mysql.connector.Error as e:
             print(f"[Ошибка] Не удалось создать сектор: {e}")
             return None
@@ -352,10 +216,9 @@ class DBMS_worker:
             bool: True если сектор был удален, False если не существовал
         """
         try:
-            self.cursor.execute(
+            return self.db.execute(
                 "DELETE FROM sectors WHERE sector_id = %s", (sector_id,)
-            )
-            return self.cursor.rowcount > 0
+            ).rowcount > 0
         except mysql.connector.Error as e:
             print(f"[Ошибка] Не удалось удалить сектор {sector_id}: {e}")
             return False
@@ -379,7 +242,7 @@ class DBMS_worker:
         try:
             values = [(device_id, param, value) for param, value in data.items()]
 
-            self.cursor.executemany(
+            self.db.executemany(
                 """
                 INSERT INTO actual_data 
                     (data_device_id, data_name, data_value)
@@ -425,8 +288,7 @@ class DBMS_worker:
                 query += " AND data_name = %s"
                 params.append(parameter_name)
 
-            self.cursor.execute(query, params)
-            results = self.cursor.fetchall()
+            results = self.db.query(query, params)
 
             return {row[0]: {"value": row[1], "timestamp": row[2]} for row in results}
         except mysql.connector.Error as e:
@@ -464,7 +326,7 @@ class DBMS_worker:
             if not source_device_id or not target_device_id:
                 return None
 
-            self.cursor.execute(
+            data_row = self.db.query_one(
                 """
                 SELECT data_id 
                 FROM actual_data 
@@ -473,11 +335,10 @@ class DBMS_worker:
                 """,
                 (source_device_id, data_name),
             )
-            data_row = self.cursor.fetchone()
             if not data_row:
                 return None
 
-            self.cursor.execute(
+            return self.db.execute(
                 """
                 INSERT INTO rules (
                     rule_data_id,
@@ -488,8 +349,7 @@ class DBMS_worker:
                 ) VALUES (%s, %s, %s, %s, %s)
                 """,
                 (data_row[0], condition, threshold, target_device_id, message),
-            )
-            return self.cursor.lastrowid
+            ).lastrowid
 
         except Exception as e:
             return None
@@ -518,7 +378,7 @@ class DBMS_worker:
             return []
 
         try:
-            self.cursor.execute(
+            result = self.db.query(
                 """
                 SELECT 
                     r.rule_id,
@@ -546,7 +406,7 @@ class DBMS_worker:
                     "message": row[5],
                     "is_active": row[6],
                 }
-                for row in self.cursor.fetchall()
+                for row in result
             ]
         except Exception as e:
             return []
@@ -562,39 +422,102 @@ class DBMS_worker:
             bool: True если правило было удалено
         """
         try:
-            self.cursor.execute("DELETE FROM rules WHERE rule_id = %s", (rule_id,))
-            return self.cursor.rowcount > 0
+            return self.db.execute(
+                "DELETE FROM rules WHERE rule_id = %s", (rule_id,)
+            ).rowcount > 0
         except Exception as e:
             return False
 
+    def get_history(
+        self, param: str, sector_id: int | None, days: int | None, resolution: str
+    ) -> list[tuple]:
+        """
+        Точки графика истории параметра.
+
+        Args:
+            param (str): Название параметра
+            sector_id (int | None): Фильтр по сектору, None - все секторы
+            days (int | None): Период в днях до текущего момента, None - вся история
+            resolution (str): "raw" - замеры data_history, иначе ключ ROLLUPS -
+                агрегаты history_minute/hour/day
+
+        Returns:
+            list[tuple]: Строки (sector_id, имя сектора, unix-время, среднее значение,
+            имя устройства, минимум, максимум) по возрастанию времени
+        """
+        if resolution == "raw":
+            query = """
+                SELECT
+                    s.sector_id,
+                    s.name as sector_name,
+                    UNIX_TIMESTAMP(dh.data_timestamp) as timestamp,
+                    dh.data_value,
+                    d.device_name,
+                    dh.data_value,
+                    dh.data_value
+                FROM data_history dh
+                JOIN devices d ON dh.data_device_id = d.device_id
+                LEFT JOIN sectors s ON d.sector_id = s.sector_id
+                WHERE dh.data_name = %s
+            """
+            time_column = "dh.data_timestamp"
+        else:
+            # Умножение на 1.0 - дробное среднее и в SQLite, где деление целых целое
+            query = f"""
+                SELECT
+                    s.sector_id,
+                    s.name as sector_name,
+                    UNIX_TIMESTAMP(h.bucket) as timestamp,
+                    1.0 * h.value_sum / h.value_count,
+                    d.device_name,
+                    h.value_min,
+                    h.value_max
+                FROM {ROLLUPS[resolution][0]} h
+                JOIN devices d ON h.data_device_id = d.device_id
+                LEFT JOIN sectors s ON d.sector_id = s.sector_id
+                WHERE h.data_name = %s
+            """
+            time_column = "h.bucket"
+        params = [param]
+
+        if sector_id is not None:
+            query += " AND s.sector_id = %s"
+            params.append(sector_id)
+
+        if days is not None:
+            query += f" AND {time_column} >= NOW() - INTERVAL %s DAY"
+            params.append(days)
+
+        query += f" ORDER BY {time_column} ASC"
+
+        return self.db.query(query, params)
+
     def get_sector_devices(self, sector_id: int) -> list[int]:
         """Получаем список ID устройств в секторе"""
-        self.cursor.execute(
+        rows = self.db.query(
             "SELECT device_id FROM devices WHERE sector_id = %s", (sector_id,)
         )
-        return [row[0] for row in self.cursor.fetchall()]
+        return [row[0] for row in rows]
 
     def add_user(self, email: str, password_hash: str) -> int | None:
         """Добавляет пользователя без привязки к подписке"""
         try:
-            self.cursor.execute(
+            return self.db.execute(
                 """
                 INSERT INTO users (email, password_hash)
                 VALUES (%s, %s)
                 """,
                 (email, password_hash),
-            )
-            return self.cursor.lastrowid
+            ).lastrowid
         except mysql.connector.Error as e:
             print(f"Ошибка добавления пользователя: {e}")
             return None
 
     def get_user_by_email(self, email: str) -> dict | None:
         """Возвращает пользователя по email"""
-        self.cursor.execute(
+        result = self.db.query_one(
             "SELECT user_id, email, password_hash FROM users WHERE email = %s", (email,)
         )
-        result = self.cursor.fetchone()
         if result:
             return {
                 "user_id": result[0],
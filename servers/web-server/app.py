@@ -1,3 +1,5 @@
+import os
+import sys
 from functools import wraps
 from flask import (
     Flask,
@@ -12,14 +14,28 @@ from flask import (
 )
 import json
 import socket
-import struct
+import mysql.connector
 from threading import Lock
 from collections import defaultdict
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
 from DBMS_worker import DBMS_worker
+from live import LiveReadings
+from dbaccess.migrations import ROLLUPS
 from encryption import encrypt, decrypt
-from config import REMOTE_SERV_ADDR, REMOTE_SERV_PORT
+from transport import recv_frame, send_frame
+from config import (
+    REMOTE_SERV_ADDR,
+    REMOTE_SERV_PORT,
+    HISTORY_MAX_POINTS,
+    DB_BACKEND,
+    LIVE_READINGS_URLS,
+    LIVE_READINGS_TIMEOUT,
+    LIVE_WINDOW_MAX_SECONDS,
+)
 
 app = Flask(__name__)
 app.secret_key = "super secret key"
@@ -27,10 +43,12 @@ app.config["SUBSCRIPTION_SERVER"] = (REMOTE_SERV_ADDR, REMOTE_SERV_PORT)
 app.config["SOCKET_TIMEOUT"] = 5
 socket_lock = Lock()
 
-db = DBMS_worker("localhost", "root", "123", "GreenHouseLocal")
+db = DBMS_worker("localhost", "root", "123", "GreenHouseLocal", backend=DB_BACKEND)
 if not db.created:
     raise RuntimeError(f"Ошибка подключения к БД: {db.error}")
 
+live = LiveReadings(LIVE_READINGS_URLS, LIVE_READINGS_TIMEOUT)
+
 
 def login_required(f):
     """
@@ -148,6 +166,9 @@ def logout():
 def dashboard():
     """
     Главная информационная панель с метриками
+
+    Последние показания берутся из памяти IoT-сервера, а при его
+    недоступности или отсутствии там устройств сектора - из таблицы actual_data.
     
     Returns:
         render_template: Страница dashboard с данными секторов
@@ -157,15 +178,14 @@ def dashboard():
         500: При внутренних ошибках сервера
     """
     try:
-        db.cursor.execute("SELECT COUNT(*) FROM devices")
-        devices_total = db.cursor.fetchone()[0]
+        devices_total = db.query_one("SELECT COUNT(*) FROM devices")[0]
+
+        active_rules = db.query_one("SELECT COUNT(*) FROM rules WHERE is_active = TRUE")[0]
 
-        db.cursor.execute("SELECT COUNT(*) FROM rules WHERE is_active = TRUE")
-        active_rules = db.cursor.fetchone()[0]
+        readings = live.latest()
 
         sectors = []
-        db.cursor.execute("SELECT * FROM sectors")
-        for sector_row in db.cursor.fetchall():
+        for sector_row in db.query("SELECT * FROM sectors"):
             sector = {
                 "sector_id": sector_row[0],
                 "name": sector_row[1],
@@ -173,18 +193,23 @@ def dashboard():
                 "metrics": {},
             }
 
-            db.cursor.execute(
+            rows = db.query(
                 """
-                SELECT d.device_id 
+                SELECT d.device_id, d.device_uuid
                 FROM devices d 
                 WHERE d.sector_id = %s
             """,
                 (sector["sector_id"],),
             )
-            device_ids = [row[0] for row in db.cursor.fetchall()]
-
-            if device_ids:
-                db.cursor.execute(
+            device_ids = [row[0] for row in rows]
+
+            metrics = {}
+            if readings is not None:
+                metrics = live_metrics(readings, [row[1] for row in rows])
+            # Устройства, не выходившие на связь после запуска IoT-сервера,
+            # есть только в actual_data
+            if not metrics and device_ids:
+                rows = db.query(
                     f"""
                     SELECT a.data_name, a.data_value 
                     FROM actual_data a
@@ -193,11 +218,10 @@ def dashboard():
                     ORDER BY a.data_timestamp DESC
                 """,
                     device_ids,
+                    prepared=False,
                 )
-                metrics = {row[0]: row[1] for row in db.cursor.fetchall()}
-                sector["metrics"] = dict(
-                    sorted(metrics.items(), key=lambda item: item[0])
-                )
+                metrics = {row[0]: row[1] for row in rows}
+            sector["metrics"] = dict(sorted(metrics.items(), key=lambda item: item[0]))
 
             sectors.append(sector)
 
@@ -218,6 +242,53 @@ def dashboard():
         return f"Ошибка базы данных: {str(e)}", 500
 
 
+def live_metrics(readings: dict, device_uuids: list[str]) -> dict:
+    """
+    Последние значения параметров группы устройств из памяти IoT-сервера
+
+    Args:
+        readings (dict): Ответ LiveReadings.latest()
+        device_uuids (list[str]): UUID устройств группы
+
+    Returns:
+        dict: {параметр: значение} - по параметру, измеряемому несколькими
+        устройствами, берётся самый свежий замер
+    """
+    latest = {}
+    for device_uuid in device_uuids:
+        for param, reading in readings.get(device_uuid, {}).items():
+            if param not in latest or reading["timestamp"] > latest[param]["timestamp"]:
+                latest[param] = reading
+    return {
+        param: int(reading["value"]) if reading["value"].is_integer() else reading["value"]
+        for param, reading in latest.items()
+    }
+
+
+@app.route("/api/readings/<device_uuid>/<param>")
+@login_required
+def live_window(device_uuid, param):
+    """
+    Замеры параметра устройства за последние секунды из памяти IoT-сервера
+    для оперативных графиков, без запросов к БД
+
+    Args:
+        device_uuid (str): UUID устройства
+        param (str): Название параметра
+
+    Returns:
+        jsonify: {"points": [[Unix-время, значение], ...]}
+        или ошибка 503, если IoT-сервер недоступен
+    """
+    seconds = min(
+        request.args.get("seconds", 300, type=int), LIVE_WINDOW_MAX_SECONDS
+    )
+    points = live.window(device_uuid, param, seconds)
+    if points is None:
+        return jsonify({"error": "IoT-сервер недоступен"}), 503
+    return jsonify({"points": points})
+
+
 def get_sectors_with_stats():
     """
     Получение списка секторов с расширенной статистикой
@@ -231,7 +302,7 @@ def get_sectors_with_stats():
             - last_activity (datetime)
     """
     try:
-        db.cursor.execute(
+        return db.query_dicts(
             """
             SELECT s.sector_id, s.name, s.description, 
                    COUNT(d.device_id) as device_count,
@@ -242,8 +313,6 @@ def get_sectors_with_stats():
             GROUP BY s.sector_id
         """
         )
-        columns = [col[0] for col in db.cursor.description]
-        return [dict(zip(columns, row)) for row in db.cursor.fetchall()]
     except Exception as e:
         return []
 
@@ -274,28 +343,25 @@ def manage_sectors():
             return redirect(url_for("manage_sectors"))
 
         try:
-            db.cursor.execute(
+            if db.query_one(
                 "SELECT sector_id FROM sectors WHERE LOWER(name) = LOWER(%s)", (name,)
-            )
-            if db.cursor.fetchone():
+            ):
                 flash("Сектор с таким названием уже существует", "error")
                 return redirect(url_for("manage_sectors"))
 
-            db.cursor.execute(
+            db.execute(
                 "INSERT INTO sectors (name, description) VALUES (%s, %s)",
                 (name, description),
             )
-            db.cnx.commit()
             flash("Сектор успешно создан", "success")
 
         except mysql.connector.Error as err:
-            db.cnx.rollback()
             flash(f"Ошибка базы данных: {err.msg}", "error")
 
         return redirect(url_for("manage_sectors"))
 
     try:
-        db.cursor.execute(
+        sectors = db.query_dicts(
             """
             SELECT s.sector_id, 
                    s.name, 
@@ -307,8 +373,6 @@ def manage_sectors():
             ORDER BY s.sector_id
         """
         )
-        columns = [col[0] for col in db.cursor.description]
-        sectors = [dict(zip(columns, row)) for row in db.cursor.fetchall()]
 
     except mysql.connector.Error as err:
         flash(f"Ошибка загрузки секторов: {err.msg}", "error")
@@ -340,15 +404,14 @@ def update_sector(sector_id):
         return redirect(url_for("manage_sectors"))
 
     try:
-        db.cursor.execute(
+        if db.query_one(
             "SELECT sector_id FROM sectors WHERE LOWER(name) = LOWER(%s) AND sector_id != %s",
             (new_name, sector_id),
-        )
-        if db.cursor.fetchone():
+        ):
             flash("Сектор с таким названием уже существует", "error")
             return redirect(url_for("manage_sectors"))
 
-        db.cursor.execute(
+        db.execute(
             "UPDATE sectors SET name = %s, description = %s WHERE sector_id = %s",
             (new_name, new_description, sector_id),
         )
@@ -418,7 +481,6 @@ def manage_devices():
         if device_id and new_sector_id:
             db.assign_device_to_sector(int(device_id), int(new_sector_id))
 
-    db.cursor.execute("SELECT * FROM devices")
     devices = [
         dict(
             zip(
@@ -432,13 +494,12 @@ def manage_devices():
                 row,
             )
         )
-        for row in db.cursor.fetchall()
+        for row in db.query("SELECT * FROM devices")
     ]
 
-    db.cursor.execute("SELECT * FROM sectors")
     sectors = [
         dict(zip(["sector_id", "name", "description"], row))
-        for row in db.cursor.fetchall()
+        for row in db.query("SELECT * FROM sectors")
     ]
 
     response = make_response(
@@ -496,7 +557,7 @@ def manage_rules():
         if all([data_id, condition, value, device_id, command, load, delay]):
             rule_message = f"{command}:{load}~{delay}"
 
-            db.cursor.execute(
+            db.execute(
                 """
                 INSERT INTO rules (
                     rule_data_id, 
@@ -509,7 +570,7 @@ def manage_rules():
                 (data_id, condition, value, device_id, rule_message),
             )
 
-    db.cursor.execute(
+    rows = db.query(
         """
         SELECT 
             a.data_id, 
@@ -522,10 +583,10 @@ def manage_rules():
     )
     available_data = [
         dict(zip(["data_id", "data_name", "sector_name"], row))
-        for row in db.cursor.fetchall()
+        for row in rows
     ]
 
-    db.cursor.execute(
+    rows = db.query(
         """
         SELECT 
             d.device_id, 
@@ -537,10 +598,10 @@ def manage_rules():
     )
     actuators = [
         dict(zip(["device_id", "device_name", "sector_name"], row))
-        for row in db.cursor.fetchall()
+        for row in rows
     ]
 
-    db.cursor.execute(
+    rules = db.query_dicts(
         """
         SELECT 
             r.rule_id,
@@ -558,8 +619,6 @@ def manage_rules():
         JOIN sectors s ON d.sector_id = s.sector_id
     """
     )
-    columns = [col[0] for col in db.cursor.description]
-    rules = [dict(zip(columns, row)) for row in db.cursor.fetchall()]
 
     return render_template(
         "rules.html", rules=rules, available_data=available_data, actuators=actuators
@@ -578,7 +637,7 @@ def toggle_rule(rule_id):
     Returns:
         redirect: Перенаправление на страницу управления правилами
     """
-    db.cursor.execute(
+    db.execute(
         """
         UPDATE rules 
         SET is_active = NOT is_active 
@@ -624,15 +683,8 @@ def check_subscription(email: str) -> bool:
                 sock.settimeout(app.config["SOCKET_TIMEOUT"])
                 sock.connect(app.config["SUBSCRIPTION_SERVER"])
 
-                sock.sendall(struct.pack("!I", len(encrypted_data)))
-                sock.sendall(encrypted_data)
-
-                length_data = sock.recv(4)
-                if len(length_data) != 4:
-                    return False
-
-                response_length = struct.unpack("!I", length_data)[0]
-                response = sock.recv(response_length)
+                send_frame(sock, encrypted_data)
+                response = recv_frame(sock)
 
                 decrypted = decrypt(response)
                 return json.loads(decrypted)
@@ -657,72 +709,94 @@ def get_condition_symbol(condition: int) -> str:
     return symbols.get(condition, "UNKNOWN")
 
 
+# Периоды истории в днях (None - вся история) и длительность интервалов агрегатов в секундах
+HISTORY_RANGES = {"24h": 1, "7d": 7, "30d": 30, "all": None}
+ROLLUP_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+def choose_resolution(time_range: str) -> str:
+    """
+    Выбор разрешения истории для периода
+
+    Args:
+        time_range (str): Ключ HISTORY_RANGES
+
+    Returns:
+        str: Самое подробное разрешение из ROLLUPS, при котором период
+        укладывается в HISTORY_MAX_POINTS точек; для всей истории - "day"
+    """
+    days = HISTORY_RANGES.get(time_range)
+    if days is None:
+        return "day"
+    for resolution, seconds in ROLLUP_SECONDS.items():
+        if days * 86400 / seconds <= HISTORY_MAX_POINTS:
+            return resolution
+    return "day"
+
+
 @app.route("/history")
 @login_required
 def history():
     """
     Отображение исторических данных
-    
+
+    Точки берутся из агрегатов history_minute/hour/day (среднее за интервал,
+    а также минимум и максимум) в разрешении, выбранном по периоду, или
+    из data_history при resolution=raw.
+
     Returns:
         render_template: Страница с графиками и фильтрами
     """
     try:
-        db.cursor.execute(
-            """
-            SELECT DISTINCT data_name 
-            FROM data_history
+        # Список параметров по суточным агрегатам, а не по всей data_history
+        rows = db.query(
+            f"""
+            SELECT DISTINCT data_name
+            FROM {ROLLUPS["day"][0]}
             ORDER BY data_name
         """
         )
-        available_params = [row[0] for row in db.cursor.fetchall()]
+        available_params = [row[0] for row in rows]
 
-        db.cursor.execute("SELECT sector_id, name FROM sectors")
-        sectors = [dict(zip(["id", "name"], row)) for row in db.cursor.fetchall()]
+        rows = db.query("SELECT sector_id, name FROM sectors")
+        sectors = [dict(zip(["id", "name"], row)) for row in rows]
 
         selected_param = request.args.get(
             "param", available_params[0] if available_params else ""
         )
         selected_sector = request.args.get("sector", "all")
         time_range = request.args.get("range", "24h")
+        if time_range not in HISTORY_RANGES:
+            time_range = "24h"
+        selected_resolution = request.args.get("resolution", "auto")
+        if selected_resolution != "raw" and selected_resolution not in ROLLUPS:
+            selected_resolution = "auto"
+        resolution = (
+            choose_resolution(time_range)
+            if selected_resolution == "auto"
+            else selected_resolution
+        )
 
-        query = """
-            SELECT 
-                s.sector_id,
-                s.name as sector_name,
-                UNIX_TIMESTAMP(dh.data_timestamp) as timestamp,
-                dh.data_value,
-                d.device_name
-            FROM data_history dh
-            JOIN devices d ON dh.data_device_id = d.device_id
-            LEFT JOIN sectors s ON d.sector_id = s.sector_id
-            WHERE dh.data_name = %s
-        """
-        params = [selected_param]
-
-        if selected_sector != "all":
-            query += " AND s.sector_id = %s"
-            params.append(selected_sector)
-
-        if time_range == "24h":
-            query += " AND dh.data_timestamp >= NOW() - INTERVAL 1 DAY"
-        elif time_range == "7d":
-            query += " AND dh.data_timestamp >= NOW() - INTERVAL 7 DAY"
-
-        query += " ORDER BY dh.data_timestamp ASC"
-
-        db.cursor.execute(query, params)
-        results = db.cursor.fetchall()
+        results = db.get_history(
+            selected_param,
+            None if selected_sector == "all" else selected_sector,
+            HISTORY_RANGES[time_range],
+            resolution,
+        )
 
         history_data = []
         sector_data = defaultdict(list)
 
         for row in results:
+            value = round(float(row[3]), 2)
             history_data.append(
                 {
                     "timestamp": datetime.fromtimestamp(
                         row[2]
                     ),
-                    "value": row[3],
+                    "value": value,
+                    "min": row[5],
+                    "max": row[6],
                     "device": row[4],
                     "sector": row[1],
                 }
@@ -734,7 +808,7 @@ def history():
                     "sector_id": sector_id,
                     "sector_name": row[1] or "Не назначено",
                     "timestamp": datetime.fromtimestamp(row[2]),
-                    "value": row[3],
+                    "value": value,
                     "device": row[4],
                 }
             )
@@ -760,6 +834,8 @@ def history():
             selected_param=selected_param,
             selected_sector=selected_sector,
             time_range=time_range,
+            selected_resolution=selected_resolution,
+            resolution=resolution,
             sector_data=sector_data,
             history_json=json.dumps(history_json),
             history_data=history_data,
@@ -781,8 +857,9 @@ def validate_credentials(email: str, password: str) -> bool:
         bool: Результат проверки
     """
     try:
-        db.cursor.execute("SELECT password_hash FROM users WHERE email = %s", (email,))
-        result = db.cursor.fetchone()
+        result = db.query_one(
+            "SELECT password_hash FROM users WHERE email = %s", (email,)
+        )
         if result and check_password_hash(result[0], password):
             return True
         return False
@@ -2,3 +2,19 @@ REMOTE_SERV_ADDR = "localhost"
 REMOTE_SERV_PORT = 9050
 
 ENCRYPTION_KEY = b"WahrheitUndLiebe"
+
+# Тип БД: "mysql" - сервер MariaDB, "sqlite" - встроенная БД SQLite в режиме WAL
+# (файлы в каталоге data/ в корне проекта) для установки всех компонентов на одном компьютере
+DB_BACKEND = "mysql"
+
+# Наибольшее число точек на графике истории: /history выбирает самое подробное
+# разрешение (минута, час, день), при котором период укладывается в это число
+HISTORY_MAX_POINTS = 2000
+
+# Последние показания из памяти IoT-сервера (GET /readings эндпоинта метрик)
+# для главной панели и оперативных графиков без запросов к БД. При
+# WORKER_PROCESSES > 1 указываются эндпоинты всех обработчиков: METRICS_PORT + 1 + N.
+# Если ни один адрес не ответил за LIVE_READINGS_TIMEOUT секунд, показания читаются из БД
+LIVE_READINGS_URLS = ["http://127.0.0.1:9100"]
+LIVE_READINGS_TIMEOUT = 0.5
+LIVE_WINDOW_MAX_SECONDS = 3600
@@ -0,0 +1,68 @@
+import json
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+
+class LiveReadings:
+    def __init__(self, urls: list[str], timeout: float):
+        """
+        Чтение последних показаний из памяти IoT-сервера (GET /readings
+        и /readings/window HTTP-эндпоинта метрик) без запросов к БД.
+
+        При нескольких процессах-обработчиках у каждого свои устройства,
+        поэтому опрашиваются все адреса, а ответы объединяются.
+
+        Args:
+            urls (list[str]): Адреса эндпоинтов IoT-сервера, например "http://127.0.0.1:9100"
+            timeout (float): Наибольшее ожидание ответа одного адреса в секундах
+        """
+        self.urls = urls
+        self.timeout = timeout
+
+    def _get(self, url: str, path: str, params: dict = None):
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        with urlopen(url + path, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def latest(self) -> dict | None:
+        """
+        Returns:
+            dict | None: {UUID устройства: {параметр: {"value", "timestamp"}}}
+            или None, если ни один адрес не ответил
+        """
+        readings = None
+        for url in self.urls:
+            try:
+                answer = self._get(url, "/readings")
+            except (OSError, ValueError):
+                continue
+            readings = readings or {}
+            readings.update(answer)
+        return readings
+
+    def window(self, device: str, param: str, seconds: int) -> list | None:
+        """
+        Args:
+            device (str): UUID устройства
+            param (str): Название параметра
+            seconds (int): Длина окна в секундах
+
+        Returns:
+            list | None: [[Unix-время, значение], ...] из процесса, принимающего
+            устройство, или None, если ни один адрес не ответил
+        """
+        points = None
+        for url in self.urls:
+            try:
+                answer = self._get(
+                    url,
+                    "/readings/window",
+                    {"device": device, "param": param, "seconds": seconds},
+                )
+            except (OSError, ValueError):
+                continue
+            if answer["points"]:
+                return answer["points"]
+            points = []
+        return points
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "servers", "IoT-server"))
+
+import DBMS_worker as dbms_module  # noqa: E402
+from dbaccess import SqliteDatabase  # noqa: E402
+
+
+@pytest.fixture
+def db_worker(tmp_path, monkeypatch):
+    """DBMS_worker IoT-сервера на встроенной БД SQLite во временном каталоге"""
+    monkeypatch.setattr(
+        dbms_module,
+        "open_database",
+        lambda backend, host, user, password, db_name, *args: SqliteDatabase(
+            db_name, *args, directory=str(tmp_path)
+        ),
+    )
+    worker = dbms_module.DBMS_worker(None, None, None, "GreenHouseTest", backend="sqlite")
+    assert worker.created, getattr(worker, "error", None)
+    yield worker
+    worker.db.close()
+
+
+@pytest.fixture
+def device_id(db_worker):
+    """ID устройства, добавленного в тестовую БД"""
+    db_worker.add_device("00000000-0000-0000-0000-000000000001", "sensor")
+    return db_worker.get_device_id("00000000-0000-0000-0000-000000000001")
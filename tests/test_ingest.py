@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from mysql.connector import errors
+
+from ingest import IngestBatcher
+
+MOMENT = datetime(2026, 10, 18, 12, 30, 15)
+
+
+class FakeWorker:
+    """Запись показаний в список; строки со значением "bad" вызывают ошибку данных"""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+        self.unavailable = False
+
+    def write_actual_data(self, rows):
+        self.calls += 1
+        if self.unavailable:
+            raise errors.OperationalError(msg="database is locked")
+        if any(row[2] == "bad" for row in rows):
+            raise errors.DatabaseError(msg="bad value")
+        self.rows.extend(rows)
+
+
+def make_batcher(worker, max_pending=100):
+    return IngestBatcher(worker, flush_interval=1, batch_size=10, max_pending=max_pending)
+
+
+def test_flush_writes_buffered_rows():
+    worker = FakeWorker()
+    batcher = make_batcher(worker)
+    batcher.put(1, {"temperature": 24, "humidity": 60}, MOMENT)
+    assert batcher.flush() == 2
+    assert worker.rows == [(1, "temperature", 24, MOMENT), (1, "humidity", 60, MOMENT)]
+    assert batcher.rows == []
+    assert batcher.flushes == 1
+
+
+def test_bad_row_is_dropped_and_rest_written():
+    worker = FakeWorker()
+    batcher = make_batcher(worker)
+    batcher.put_rows([(1, f"p{i}", i, MOMENT) for i in range(7)] + [(1, "x", "bad", MOMENT)])
+    assert batcher.flush() == 7
+    assert len(worker.rows) == 7
+    assert batcher.dropped == 1
+    assert batcher.rows == []
+
+
+def test_unavailable_database_requeues_batch():
+    worker = FakeWorker()
+    worker.unavailable = True
+    batcher = make_batcher(worker)
+    batcher.put(1, {"temperature": 24}, MOMENT)
+    assert batcher.flush() == 0
+    assert batcher.rows == [(1, "temperature", 24, MOMENT)]
+    assert batcher.dropped == 0
+
+    worker.unavailable = False
+    assert batcher.flush() == 1
+    assert worker.rows == [(1, "temperature", 24, MOMENT)]
+
+
+def test_requeue_keeps_max_pending_newest_rows():
+    worker = FakeWorker()
+    worker.unavailable = True
+    batcher = make_batcher(worker, max_pending=3)
+    batcher.put_rows([(1, f"p{i}", i, MOMENT) for i in range(3)])
+    batcher.flush()
+    assert [row[1] for row in batcher.rows] == ["p0", "p1", "p2"]
+
+
+def test_put_samples_orders_by_timestamp():
+    worker = FakeWorker()
+    batcher = make_batcher(worker)
+    later = MOMENT.replace(minute=31)
+    batcher.put_samples(1, [(later, {"temperature": 25}), (MOMENT, {"temperature": 24})])
+    assert [row[3] for row in batcher.rows] == [MOMENT, later]
+
+
+def test_put_times_out_when_buffer_is_full():
+    batcher = make_batcher(FakeWorker(), max_pending=2)
+    assert batcher.put_rows([(1, "a", 1, MOMENT), (1, "b", 2, MOMENT)])
+    assert not batcher.put(1, {"c": 3}, MOMENT, timeout=0.01)
+
+
+def test_stop_flushes_remaining_rows():
+    worker = FakeWorker()
+    batcher = make_batcher(worker)
+    batcher.start()
+    batcher.put(1, {"temperature": 24}, MOMENT)
+    batcher.stop()
+    assert worker.rows == [(1, "temperature", 24, MOMENT)]
+
+
+def test_flush_into_database_skips_non_numeric_values(db_worker, device_id):
+    batcher = make_batcher(db_worker)
+    batcher.put_rows(
+        [(device_id, "temperature", 24, MOMENT), (device_id, "humidity", None, MOMENT)]
+    )
+    batcher.flush()
+    assert batcher.rows == []
+    assert db_worker.db.query("SELECT data_name, data_value FROM data_history") == [
+        ("temperature", 24)
+    ]
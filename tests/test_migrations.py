@@ -0,0 +1,44 @@
+import pytest
+
+from dbaccess import SqliteDatabase
+from dbaccess.migrations import (
+    INDEX_CHECKS,
+    LATEST_VERSION,
+    MIGRATIONS,
+    apply_migrations,
+    check_indexes,
+)
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = SqliteDatabase("GreenHouseMigrations", directory=str(tmp_path))
+    yield db
+    db.close()
+
+
+def test_migrations_create_indexes(database):
+    with database.connection() as conn:
+        assert apply_migrations(conn) == [version for version, _, _ in MIGRATIONS]
+        assert check_indexes(conn) == []
+
+
+@pytest.mark.parametrize(
+    "description, query, params, table, index",
+    INDEX_CHECKS,
+    ids=[check[0] for check in INDEX_CHECKS],
+)
+def test_checked_queries_do_not_scan_tables(database, description, query, params, table, index):
+    with database.connection() as conn:
+        apply_migrations(conn)
+        plan = [row[-1] for row in conn.query(f"EXPLAIN QUERY PLAN {query}", params)]
+    assert f"SCAN {table}" not in plan, plan
+
+
+def test_second_run_is_noop(database):
+    with database.connection() as conn:
+        apply_migrations(conn)
+        assert apply_migrations(conn) == []
+        versions = conn.query("SELECT version FROM schema_version ORDER BY version")
+    assert versions[-1] == (LATEST_VERSION,)
+    assert len(versions) == len(MIGRATIONS)
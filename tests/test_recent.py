@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from recent import RecentReadings, RingBuffer
+
+
+def test_latest_is_newest_sample_not_last_appended():
+    buffer = RingBuffer(4)
+    buffer.append(10.0, 1)
+    buffer.append(30.0, 3)
+    buffer.append(20.0, 2)
+    assert buffer.latest() == (30.0, 3)
+
+
+def test_latest_after_newest_sample_is_overwritten():
+    buffer = RingBuffer(3)
+    buffer.append(50.0, 5)
+    buffer.append(10.0, 1)
+    buffer.append(30.0, 3)
+    buffer.append(20.0, 2)
+    assert buffer.latest() == (30.0, 3)
+    assert buffer.since(0) == [(10.0, 1), (30.0, 3), (20.0, 2)]
+
+
+def test_forget_drops_device_buffers():
+    readings = RecentReadings(4)
+    moment = datetime(2026, 10, 18, 12, 30, 15)
+    readings.add("a", {"temperature": 24, "state": "on"}, moment)
+    readings.add("b", {"temperature": 20}, moment)
+    assert readings.latest("a") == {
+        "a": {"temperature": {"value": 24, "timestamp": moment.timestamp()}}
+    }
+
+    readings.forget("a")
+    assert readings.latest() == {
+        "b": {"temperature": {"value": 20, "timestamp": moment.timestamp()}}
+    }
+    assert readings.stats()["buffers"] == 1
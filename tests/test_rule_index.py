@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+from rule_index import RuleIndex, CONDITION_GT, CONDITION_LT, CONDITION_EQ, CONDITION_NE
+
+MOMENT = datetime(2026, 10, 18, 12, 30, 15)
+SOURCE = "source"
+TARGET = "target"
+
+
+def rule(rule_id, condition, threshold, message="heat:50", value=0):
+    return {
+        "rule_id": rule_id,
+        "source_device": SOURCE,
+        "parameter": "temperature",
+        "condition": condition,
+        "threshold": threshold,
+        "target_device": TARGET,
+        "message": message,
+        "value": value,
+        "timestamp": MOMENT,
+    }
+
+
+def active_ids(index):
+    return [compiled.rule_id for compiled in index.active_rules(TARGET)]
+
+
+def make_index(rules):
+    index = RuleIndex(None, refresh_interval=1)
+    index.rebuild(rules)
+    return index
+
+
+def test_compiled_rule_parses_command_and_delay():
+    index = make_index([rule(1, CONDITION_GT, 10, message="heat:50~30")])
+    compiled = index.rules_for_target(TARGET)[0]
+    assert (compiled.command_name, compiled.intensity, compiled.delay) == ("heat", 50, 30)
+
+
+def test_rules_activated_by_stored_value():
+    index = make_index(
+        [rule(1, CONDITION_GT, 10, value=15), rule(2, CONDITION_LT, 10, value=15)]
+    )
+    assert active_ids(index) == [1]
+
+
+def test_value_change_rematches_rules():
+    index = make_index(
+        [
+            rule(1, CONDITION_GT, 20),
+            rule(2, CONDITION_LT, 10),
+            rule(3, CONDITION_EQ, 15),
+            rule(4, CONDITION_NE, 15),
+        ]
+    )
+    assert active_ids(index) == [2, 4]
+
+    index.set_value(SOURCE, "temperature", 15, MOMENT + timedelta(seconds=1))
+    assert active_ids(index) == [3]
+
+    index.set_value(SOURCE, "temperature", 25, MOMENT + timedelta(seconds=2))
+    assert active_ids(index) == [1, 4]
+
+
+def test_older_value_is_ignored():
+    index = make_index([rule(1, CONDITION_GT, 20)])
+    index.set_value(SOURCE, "temperature", 25, MOMENT + timedelta(seconds=2))
+    index.set_value(SOURCE, "temperature", 5, MOMENT + timedelta(seconds=1))
+    assert index.get_value(SOURCE, "temperature") == 25
+    assert active_ids(index) == [1]
+
+
+def test_update_values_for_unknown_parameter():
+    index = make_index([rule(1, CONDITION_GT, 20)])
+    index.update_values(SOURCE, {"humidity": 80}, MOMENT + timedelta(seconds=1))
+    assert index.get_value(SOURCE, "humidity") == 80
+    assert active_ids(index) == []
+
+
+def test_refresh_rebuilds_only_on_new_version():
+    class FakeWorker:
+        version = 1
+        rules = [rule(1, CONDITION_GT, 10, value=15)]
+
+        def get_rules_version(self):
+            return self.version
+
+        def get_active_rules(self):
+            return self.rules
+
+    worker = FakeWorker()
+    index = RuleIndex(worker, refresh_interval=1)
+    assert index.refresh()
+    assert not index.refresh()
+
+    worker.version = 2
+    worker.rules = []
+    assert index.refresh()
+    assert active_ids(index) == []
+
+
+def test_failed_rules_query_keeps_index():
+    class FakeWorker:
+        version = 1
+        rules = [rule(1, CONDITION_GT, 10, value=15)]
+
+        def get_rules_version(self):
+            return self.version
+
+        def get_active_rules(self):
+            return self.rules
+
+    worker = FakeWorker()
+    index = RuleIndex(worker, refresh_interval=1, sync_values=True)
+    index.refresh()
+
+    worker.version = 2
+    worker.rules = None
+    assert not index.refresh()
+    assert index.version == 1
+    assert active_ids(index) == [1]
+
+    worker.rules = [rule(1, CONDITION_GT, 10, value=15), rule(2, CONDITION_LT, 10, value=15)]
+    assert index.refresh()
+    assert index.version == 2
+    assert active_ids(index) == [1]
@@ -0,0 +1,65 @@
+import pytest
+
+from schedule import PollScheduler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемая текущая секунда планировщика"""
+    state = {"now": 1000}
+    monkeypatch.setattr(PollScheduler, "now", staticmethod(lambda: state["now"]))
+    return state
+
+
+def make_scheduler(target_rate=2, max_stretch=2.0):
+    return PollScheduler(spread=0.5, target_rate=target_rate, max_stretch=max_stretch, window=10)
+
+
+def test_devices_connecting_together_are_spread(clock):
+    scheduler = make_scheduler(target_rate=1)
+    delays = [scheduler.assign(f"device-{i}", 10) for i in range(6)]
+    assert delays == [10, 11, 12, 13, 14, 15]
+    assert scheduler.stretched == 0
+
+
+def test_delay_is_never_below_requested(clock):
+    scheduler = make_scheduler(target_rate=100)
+    assert all(scheduler.assign(f"device-{i}", 10) >= 10 for i in range(50))
+
+
+def test_delay_is_stretched_under_load(clock):
+    scheduler = make_scheduler(target_rate=1, max_stretch=2.0)
+    delays = [scheduler.assign(f"device-{i}", 4) for i in range(8)]
+    assert max(delays) == 8
+    assert scheduler.stretched == delays.count(7) + delays.count(8)
+
+
+def test_reassign_and_forget_release_slot(clock):
+    scheduler = make_scheduler()
+    scheduler.assign("device", 10)
+    scheduler.assign("device", 10)
+    assert sum(scheduler.scheduled.values()) == 1
+
+    scheduler.forget("device")
+    assert scheduler.scheduled == {}
+    assert scheduler.stats()["scheduled_devices"] == 0
+
+
+def test_non_positive_delay_is_not_scheduled(clock):
+    scheduler = make_scheduler()
+    assert scheduler.assign("device", 0) == 0
+    assert scheduler.assigned == {}
+
+
+def test_arrival_rates_and_upcoming(clock):
+    scheduler = make_scheduler()
+    scheduler.assign("a", 3)
+    scheduler.assign("b", 3)
+    clock["now"] += 1
+    scheduler.assign("c", 3)
+    clock["now"] += 1
+
+    rates = scheduler.arrival_rates()
+    assert rates[-2:] == [2, 1]
+    assert scheduler.upcoming(3) == [1, 1, 1]
+    assert scheduler.stats()["arrival_rate_peak"] == 2
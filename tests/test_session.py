@@ -0,0 +1,67 @@
+import pytest
+
+from transport.session import (
+    CIPHER_SESSION,
+    SessionCipher,
+    negotiate_session,
+    new_session_nonce,
+    session_from_response,
+)
+
+
+SECRET = b"WahrheitUndLiebe"
+
+
+def session_pair():
+    client_nonce = new_session_nonce()
+    server, response = negotiate_session(
+        {"cipher": CIPHER_SESSION, "client_nonce": client_nonce.hex()}, SECRET
+    )
+    return session_from_response(response, client_nonce, SECRET), server
+
+
+def test_messages_roundtrip_in_both_directions():
+    device, server = session_pair()
+    for i in range(3):
+        assert server.decrypt(device.encrypt(f"ping {i}".encode())) == f"ping {i}".encode()
+        assert device.decrypt(server.encrypt(b"pong")) == b"pong"
+
+
+def test_replayed_message_is_rejected():
+    device, server = session_pair()
+    frame = device.encrypt(b"state")
+    server.decrypt(frame)
+    with pytest.raises(ValueError):
+        server.decrypt(frame)
+
+
+def test_tampered_message_is_rejected():
+    device, server = session_pair()
+    frame = bytearray(device.encrypt(b"state"))
+    frame[0] ^= 1
+    with pytest.raises(ValueError):
+        server.decrypt(bytes(frame))
+
+
+def test_own_messages_are_not_accepted():
+    cipher = SessionCipher(b"k" * 16, is_server=True)
+    with pytest.raises(ValueError):
+        cipher.decrypt(cipher.encrypt(b"state"))
+
+
+@pytest.mark.parametrize(
+    "device_info",
+    [{}, {"cipher": CIPHER_SESSION, "client_nonce": "zz"}, {"cipher": CIPHER_SESSION}],
+)
+def test_legacy_mode_without_valid_nonce(device_info):
+    assert negotiate_session(device_info, SECRET) == (None, {})
+
+
+def test_different_secrets_do_not_match():
+    client_nonce = new_session_nonce()
+    server, response = negotiate_session(
+        {"cipher": CIPHER_SESSION, "client_nonce": client_nonce.hex()}, SECRET
+    )
+    device = session_from_response(response, client_nonce, b"k" * 16)
+    with pytest.raises(ValueError):
+        server.decrypt(device.encrypt(b"state"))
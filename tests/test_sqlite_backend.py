@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+import pytest
+from mysql.connector import errors
+
+from dbaccess.sqlite import translate
+
+MOMENT = datetime(2026, 10, 18, 12, 30, 15)
+
+
+def actual_value(db_worker, device_id, name="temperature"):
+    return db_worker.db.query_one(
+        "SELECT data_value, data_timestamp FROM actual_data"
+        " WHERE data_device_id = %s AND data_name = %s",
+        (device_id, name),
+    )
+
+
+def history_count(db_worker, device_id):
+    return db_worker.db.query_one(
+        "SELECT COUNT(*) FROM data_history WHERE data_device_id = %s", (device_id,)
+    )[0]
+
+
+def test_translate_mysql_constructs():
+    assert translate("SELECT * FROM t WHERE a = %s") == "SELECT * FROM t WHERE a = ?"
+    assert translate("INSERT IGNORE INTO t") == "INSERT OR IGNORE INTO t"
+    assert (
+        translate("ON DUPLICATE KEY UPDATE v = GREATEST(v, VALUES(v))")
+        == "ON CONFLICT DO UPDATE SET v = MAX(v, excluded.v)"
+    )
+    assert "datetime('now', 'localtime', '-' || ? || ' days')" in translate(
+        "WHERE t < NOW() - INTERVAL %s DAY"
+    )
+
+
+def test_translate_keeps_default_current_timestamp():
+    assert translate("t DATETIME DEFAULT CURRENT_TIMESTAMP") == (
+        "t DATETIME DEFAULT CURRENT_TIMESTAMP"
+    )
+
+
+def test_write_actual_data(db_worker, device_id):
+    db_worker.write_actual_data([(device_id, "temperature", 24, MOMENT)])
+    assert actual_value(db_worker, device_id) == (24, MOMENT)
+    assert history_count(db_worker, device_id) == 1
+
+
+def test_older_sample_does_not_replace_current_value(db_worker, device_id):
+    db_worker.write_actual_data([(device_id, "temperature", 24, MOMENT)])
+    db_worker.write_actual_data(
+        [(device_id, "temperature", 20, MOMENT - timedelta(minutes=5))]
+    )
+    assert actual_value(db_worker, device_id) == (24, MOMENT)
+    # Опоздавший замер всё равно попадает в историю
+    assert history_count(db_worker, device_id) == 2
+
+
+def test_failed_batch_is_rolled_back(db_worker, device_id, monkeypatch):
+    def fail(conn, rows):
+        raise errors.DatabaseError(msg="rollup failed")
+
+    monkeypatch.setattr(db_worker, "_upsert_rollups_chunk", fail)
+    with pytest.raises(errors.DatabaseError):
+        db_worker.write_actual_data([(device_id, "temperature", 24, MOMENT)])
+    assert actual_value(db_worker, device_id) is None
+    assert history_count(db_worker, device_id) == 0
+
+
+def test_rows_of_removed_devices_are_skipped(db_worker, device_id):
+    db_worker.write_actual_data(
+        [(device_id, "temperature", 24, MOMENT), (device_id + 100, "temperature", 1, MOMENT)]
+    )
+    assert actual_value(db_worker, device_id) == (24, MOMENT)
+
+
+def test_rollups_coerce_values(db_worker, device_id):
+    db_worker.write_actual_data(
+        [
+            (device_id, "temperature", "25", MOMENT),
+            (device_id, "temperature", 24, MOMENT + timedelta(seconds=10)),
+            (device_id, "temperature", None, MOMENT + timedelta(seconds=20)),
+            (device_id, "temperature", True, MOMENT + timedelta(seconds=30)),
+            (device_id, "temperature", "warm", MOMENT + timedelta(seconds=40)),
+        ]
+    )
+    row = db_worker.db.query_one(
+        "SELECT value_min, value_max, value_sum, value_count FROM history_minute"
+        " WHERE data_device_id = %s",
+        (device_id,),
+    )
+    assert row == (24, 25, 49, 2)
+
+
+def test_delete_rollups_before(db_worker, device_id):
+    db_worker.write_actual_data(
+        [
+            (device_id, "temperature", 20, MOMENT - timedelta(days=10)),
+            (device_id, "temperature", 24, MOMENT),
+        ]
+    )
+    deleted = db_worker.delete_rollups_before({"history_minute": MOMENT - timedelta(days=7)})
+    assert deleted == {"history_minute": 1}
+    buckets = db_worker.db.query("SELECT bucket FROM history_minute")
+    assert buckets == [(MOMENT.replace(second=0),)]
+
+
+def test_removed_device_is_not_served_from_cache(db_worker, device_id):
+    uuid = "00000000-0000-0000-0000-000000000001"
+    assert db_worker.get_device_id(uuid) == device_id
+    assert db_worker.remove_device(device_id)
+    assert db_worker.get_device_id(uuid) is None
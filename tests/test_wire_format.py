@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from transport.wire_format import (
+    BATCH_KEY,
+    FORMAT_BINARY,
+    FORMAT_JSON,
+    FRAME_BATCH,
+    FRAME_RESPONSE,
+    FRAME_SENSOR,
+    JSON_CODEC,
+    TIMESTAMP_KEY,
+    BinaryCodec,
+    codec_from_response,
+    negotiate,
+    sensor_values,
+    split_sensor_values,
+)
+
+PARAMS = ["temperature", "humidity", "light"]
+
+
+@pytest.fixture
+def codec():
+    return BinaryCodec(PARAMS)
+
+
+def test_sensor_frame_roundtrip(codec):
+    data = {"temperature": -5, "light": 2**31 - 1}
+    payload = codec.encode(data)
+    assert payload[0] == FRAME_SENSOR
+    assert len(payload) == 2 + 2 * 5
+    assert codec.decode(payload) == data
+
+
+def test_batch_frame_roundtrip(codec):
+    data = {
+        BATCH_KEY: [
+            {TIMESTAMP_KEY: 1760000000.5, "temperature": 24},
+            {TIMESTAMP_KEY: 1760000001.0, "temperature": 25, "humidity": 60},
+        ]
+    }
+    payload = codec.encode(data)
+    assert payload[0] == FRAME_BATCH
+    assert codec.decode(payload) == data
+
+
+def test_response_frame_roundtrip(codec):
+    data = {"delay": 30, "commands": ["heat:50", "вентиляция:10"]}
+    payload = codec.encode(data)
+    assert payload[0] == FRAME_RESPONSE
+    assert codec.decode(payload) == data
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        {"temperature": True},
+        {"temperature": 2**31},
+        {"temperature": 24.5},
+        {"pressure": 1},
+        {"temperature": None},
+    ],
+)
+def test_other_messages_fall_back_to_json(codec, data):
+    payload = codec.encode(data)
+    assert json.loads(payload) == data
+    assert codec.decode(payload) == data
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [bytes([FRAME_SENSOR, 2, 0, 0, 0, 0, 1]), bytes([FRAME_BATCH, 1]), bytes([9])],
+)
+def test_corrupted_frame_is_rejected(codec, payload):
+    with pytest.raises(ValueError):
+        codec.decode(payload)
+
+
+def test_sensor_values_keeps_only_numbers():
+    data = {"a": 1, "b": 2.5, "c": True, "d": None, "e": "3", "f": float("nan"), 7: 1}
+    assert sensor_values(data) == {"a": 1, "b": 2.5}
+
+
+def test_negotiate_binary_format():
+    codec, answer = negotiate({"formats": [FORMAT_BINARY, FORMAT_JSON], "params": PARAMS})
+    assert isinstance(codec, BinaryCodec)
+    assert answer == {"format": FORMAT_BINARY, "params": PARAMS}
+    assert codec_from_response(answer).params == PARAMS
+
+
+def test_negotiate_falls_back_to_json():
+    assert negotiate({}) == (JSON_CODEC, {})
+    assert negotiate({"formats": [FORMAT_BINARY], "params": []}) == (
+        JSON_CODEC,
+        {"format": FORMAT_JSON},
+    )
+    assert codec_from_response({"format": FORMAT_JSON}) is JSON_CODEC
+
+
+def test_split_sensor_values_counts_rejected():
+    data = {"timestamp": 1.5, "state": 1, "a": 1, "b": None, "c": True}
+    assert split_sensor_values(data, ignore=("timestamp", "state")) == ({"a": 1}, 2)
+
+
+def test_long_command_is_cut_on_character_boundary(codec):
+    command = "ж" * 200
+    decoded = codec.decode(codec.encode({"delay": 5, "commands": [command]}))
+    assert decoded["commands"] == ["ж" * 127]
+
+
+def test_bool_timestamp_is_not_a_batch_frame(codec):
+    data = {BATCH_KEY: [{TIMESTAMP_KEY: True, "temperature": 24}]}
+    assert not codec.is_batch_frame(data)
+    assert json.loads(codec.encode(data)) == data
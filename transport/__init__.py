@@ -0,0 +1,29 @@
+from .framing import (
+    HEADER,
+    MAX_FRAME_SIZE,
+    INITIAL_BUFFER_SIZE,
+    FrameError,
+    FrameReader,
+    recv_frame,
+    pack_header,
+    send_frame,
+    read_header_async,
+    read_payload_async,
+    read_frame_async,
+    write_frame,
+)
+
+__all__ = [
+    "HEADER",
+    "MAX_FRAME_SIZE",
+    "INITIAL_BUFFER_SIZE",
+    "FrameError",
+    "FrameReader",
+    "recv_frame",
+    "pack_header",
+    "send_frame",
+    "read_header_async",
+    "read_payload_async",
+    "read_frame_async",
+    "write_frame",
+]
@@ -0,0 +1,228 @@
+import time
+import socket
+import struct
+import asyncio
+
+# Заголовок кадра - длина полезной нагрузки, 4 байта big-endian
+HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 1024 * 1024
+INITIAL_BUFFER_SIZE = 4096
+
+HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+
+class FrameError(ConnectionError):
+    """Кадр нарушает протокол (например, превышает максимальный размер)"""
+
+
+class FrameReader:
+    def __init__(
+        self,
+        sock: socket.socket,
+        max_frame_size: int = MAX_FRAME_SIZE,
+        buffer_size: int = INITIAL_BUFFER_SIZE,
+    ):
+        """
+        Чтение кадров с префиксом длины в заранее выделенный буфер.
+
+        Данные читаются через recv_into прямо в буфер без промежуточных
+        копий. Буфер переиспользуется между кадрами и увеличивается,
+        только если очередной кадр в него не помещается.
+
+        Args:
+            sock (socket.socket): Сокет для чтения
+            max_frame_size (int, optional): Максимальный размер полезной нагрузки
+            buffer_size (int, optional): Начальный размер буфера
+
+        Attributes:
+            buffer (bytearray): Буфер полезной нагрузки
+            view (memoryview): Представление буфера для recv_into
+            payload_seconds (float): Время чтения полезной нагрузки последнего кадра
+                после получения его заголовка
+        """
+        self.sock = sock
+        self.max_frame_size = max_frame_size
+        self.header = bytearray(HEADER.size)
+        self.header_view = memoryview(self.header)
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.payload_seconds = 0.0
+
+    def read_into(self, view: memoryview) -> None:
+        """
+        Заполняет представление целиком данными из сокета.
+
+        Args:
+            view (memoryview): Область буфера для заполнения
+
+        Raises:
+            ConnectionError: Если соединение закрыто до получения всех данных
+        """
+        received = 0
+        size = len(view)
+        while received < size:
+            count = self.sock.recv_into(view[received:])
+            if not count:
+                raise ConnectionError("Соединение закрыто")
+            received += count
+
+    def read_frame(self) -> memoryview:
+        """
+        Читает очередной кадр.
+
+        Returns:
+            memoryview: Полезная нагрузка кадра. Действительна до следующего вызова
+
+        Raises:
+            FrameError: Если размер кадра превышает max_frame_size
+            ConnectionError: Если соединение закрыто
+        """
+        self.read_into(self.header_view)
+        (length,) = HEADER.unpack(self.header)
+        if length > self.max_frame_size:
+            raise FrameError(f"Размер кадра {length} превышает {self.max_frame_size}")
+
+        if length > len(self.buffer):
+            self.buffer = bytearray(max(length, len(self.buffer) * 2))
+            self.view = memoryview(self.buffer)
+
+        payload = self.view[:length]
+        started = time.perf_counter()
+        self.read_into(payload)
+        self.payload_seconds = time.perf_counter() - started
+        return payload
+
+
+def recv_frame(sock: socket.socket, max_frame_size: int = MAX_FRAME_SIZE) -> memoryview:
+    """
+    Читает один кадр из сокета (для соединений с единственным запросом).
+
+    Args:
+        sock (socket.socket): Сокет для чтения
+        max_frame_size (int, optional): Максимальный размер полезной нагрузки
+
+    Returns:
+        memoryview: Полезная нагрузка кадра в буфере точного размера
+
+    Raises:
+        FrameError: Если размер кадра превышает max_frame_size
+        ConnectionError: Если соединение закрыто
+    """
+    return FrameReader(sock, max_frame_size, buffer_size=0).read_frame()
+
+
+def pack_header(payload: bytes) -> bytes:
+    """
+    Формирует заголовок кадра.
+
+    Args:
+        payload (bytes): Полезная нагрузка
+
+    Returns:
+        bytes: 4-байтовая длина в big-endian
+    """
+    return HEADER.pack(len(payload))
+
+
+def send_frame(sock: socket.socket, payload: bytes) -> None:
+    """
+    Отправляет кадр одним системным вызовом.
+
+    Заголовок и полезная нагрузка передаются через sendmsg без склейки.
+    На платформах без sendmsg они объединяются в один буфер.
+
+    Args:
+        sock (socket.socket): Сокет для записи
+        payload (bytes): Полезная нагрузка
+    """
+    header = pack_header(payload)
+    if not HAS_SENDMSG:
+        sock.sendall(header + payload)
+        return
+
+    sent = sock.sendmsg([header, payload])
+    total = len(header) + len(payload)
+    if sent < total:
+        # Частичная запись: досылаем остаток обычным sendall
+        if sent < len(header):
+            sock.sendall(header[sent:])
+            sent = len(header)
+        sock.sendall(memoryview(payload)[sent - len(header):])
+
+
+async def read_header_async(
+    reader: asyncio.StreamReader, max_frame_size: int = MAX_FRAME_SIZE
+) -> int:
+    """
+    Читает заголовок кадра из потока asyncio.
+
+    Args:
+        reader (asyncio.StreamReader): Поток чтения
+        max_frame_size (int, optional): Максимальный размер полезной нагрузки
+
+    Returns:
+        int: Длина полезной нагрузки
+
+    Raises:
+        FrameError: Если размер кадра превышает max_frame_size
+        ConnectionError: Если соединение закрыто
+    """
+    try:
+        (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    except asyncio.IncompleteReadError:
+        raise ConnectionError("Соединение закрыто")
+    if length > max_frame_size:
+        raise FrameError(f"Размер кадра {length} превышает {max_frame_size}")
+    return length
+
+
+async def read_payload_async(reader: asyncio.StreamReader, length: int) -> bytes:
+    """
+    Читает полезную нагрузку кадра, заголовок которого уже прочитан.
+
+    Args:
+        reader (asyncio.StreamReader): Поток чтения
+        length (int): Длина полезной нагрузки
+
+    Returns:
+        bytes: Полезная нагрузка кадра
+
+    Raises:
+        ConnectionError: Если соединение закрыто
+    """
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ConnectionError("Соединение закрыто")
+
+
+async def read_frame_async(
+    reader: asyncio.StreamReader, max_frame_size: int = MAX_FRAME_SIZE
+) -> bytes:
+    """
+    Читает кадр из потока asyncio.
+
+    Args:
+        reader (asyncio.StreamReader): Поток чтения
+        max_frame_size (int, optional): Максимальный размер полезной нагрузки
+
+    Returns:
+        bytes: Полезная нагрузка кадра
+
+    Raises:
+        FrameError: Если размер кадра превышает max_frame_size
+        ConnectionError: Если соединение закрыто
+    """
+    length = await read_header_async(reader, max_frame_size)
+    return await read_payload_async(reader, length)
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes) -> None:
+    """
+    Ставит кадр в очередь записи потока asyncio без склейки буферов.
+
+    Args:
+        writer (asyncio.StreamWriter): Поток записи
+        payload (bytes): Полезная нагрузка
+    """
+    writer.writelines((pack_header(payload), payload))
@@ -0,0 +1,149 @@
+import hashlib
+import hmac
+import os
+
+from Crypto.Cipher import AES
+
+CIPHER_SESSION = "session"
+SESSION_NONCE_SIZE = 16
+GCM_TAG_SIZE = 16
+
+
+class SessionCipher:
+    def __init__(self, key: bytes, is_server: bool):
+        """
+        Шифр сессии: AES-GCM с ключом подключения и счётчиком вместо случайного nonce.
+
+        Nonce (12 байт) = направление (4 байта) + номер сообщения (8 байт) и по сети
+        не передаётся, поэтому кадр содержит только [шифротекст][16-байтовый тег].
+        Сообщения должны расшифровываться строго в порядке отправки, что
+        гарантирует TCP; повтор или пропуск кадра приводит к ошибке проверки тега.
+
+        Args:
+            key (bytes): Ключ сессии
+            is_server (bool): True для серверной стороны подключения
+        """
+        self.key = key
+        self.send_prefix = b"srv>" if is_server else b"dev>"
+        self.receive_prefix = b"dev>" if is_server else b"srv>"
+        self.send_counter = 0
+        self.receive_counter = 0
+
+    @classmethod
+    def derive(
+        cls, secret: bytes, client_nonce: bytes, server_nonce: bytes, is_server: bool
+    ) -> "SessionCipher":
+        """
+        Создаёт шифр сессии с ключом, выведенным из общего ключа и nonce обеих сторон.
+
+        Args:
+            secret (bytes): Общий ключ устройств и сервера (ENCRYPTION_KEY)
+            client_nonce (bytes): Случайное значение устройства
+            server_nonce (bytes): Случайное значение сервера
+            is_server (bool): True для серверной стороны подключения
+
+        Returns:
+            SessionCipher: Шифр сессии
+        """
+        key = hmac.new(
+            secret, b"session" + client_nonce + server_nonce, hashlib.sha256
+        ).digest()[: len(secret)]
+        return cls(key, is_server)
+
+    def encrypt(self, message: bytes) -> bytes:
+        """
+        Шифрует очередное исходящее сообщение.
+
+        Args:
+            message (bytes): Исходное сообщение
+
+        Returns:
+            bytes: Данные в формате [шифротекст][тег]
+        """
+        nonce = self.send_prefix + self.send_counter.to_bytes(8, "big")
+        self.send_counter += 1
+        cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
+        cipher_message, tag = cipher.encrypt_and_digest(message)
+        return cipher_message + tag
+
+    def decrypt(self, byte_data: bytes) -> bytes:
+        """
+        Дешифрует очередное входящее сообщение.
+
+        Args:
+            byte_data (bytes): Данные в формате [шифротекст][тег]
+
+        Returns:
+            bytes: Расшифрованное сообщение
+
+        Raises:
+            ValueError: При неверном теге, повторе или пропуске сообщения
+        """
+        nonce = self.receive_prefix + self.receive_counter.to_bytes(8, "big")
+        try:
+            cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
+            message = cipher.decrypt_and_verify(
+                byte_data[:-GCM_TAG_SIZE], byte_data[-GCM_TAG_SIZE:]
+            )
+        except ValueError:
+            raise ValueError("Ошибка дешифрования. Невалидные данные")
+        self.receive_counter += 1
+        return message
+
+
+def new_session_nonce() -> bytes:
+    """
+    Генерирует случайное значение для вывода ключа сессии.
+
+    Returns:
+        bytes: SESSION_NONCE_SIZE случайных байт
+    """
+    return os.urandom(SESSION_NONCE_SIZE)
+
+
+def negotiate_session(
+    device_info: dict, secret: bytes
+) -> tuple[SessionCipher | None, dict]:
+    """
+    Создаёт шифр сессии на стороне сервера, если устройство его запросило.
+
+    Args:
+        device_info (dict): Сообщение устройства с полями 'cipher' и 'client_nonce' (hex)
+        secret (bytes): Общий ключ устройств и сервера (ENCRYPTION_KEY)
+
+    Returns:
+        tuple: (шифр сессии или None для прежнего режима, поля для ответа устройству)
+    """
+    if device_info.get("cipher") != CIPHER_SESSION:
+        return None, {}
+
+    try:
+        client_nonce = bytes.fromhex(device_info.get("client_nonce", ""))
+    except ValueError:
+        return None, {}
+    if len(client_nonce) != SESSION_NONCE_SIZE:
+        return None, {}
+
+    server_nonce = new_session_nonce()
+    cipher = SessionCipher.derive(secret, client_nonce, server_nonce, is_server=True)
+    return cipher, {"cipher": CIPHER_SESSION, "server_nonce": server_nonce.hex()}
+
+
+def session_from_response(
+    response: dict, client_nonce: bytes, secret: bytes
+) -> SessionCipher | None:
+    """
+    Создаёт шифр сессии на стороне устройства по ответу сервера на вход.
+
+    Args:
+        response (dict): Ответ сервера
+        client_nonce (bytes): Значение, отправленное устройством при входе
+        secret (bytes): Общий ключ устройств и сервера (ENCRYPTION_KEY)
+
+    Returns:
+        SessionCipher | None: Шифр сессии или None, если сервер остался в прежнем режиме
+    """
+    if response.get("cipher") != CIPHER_SESSION:
+        return None
+    server_nonce = bytes.fromhex(response["server_nonce"])
+    return SessionCipher.derive(secret, client_nonce, server_nonce, is_server=False)
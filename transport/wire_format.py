@@ -0,0 +1,350 @@
+import json
+import math
+import struct
+
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+
+# Первый байт двоичного кадра. JSON-кадр всегда начинается с '{'
+FRAME_SENSOR = 1
+FRAME_RESPONSE = 2
+FRAME_BATCH = 3
+
+# Пакет показаний: {'samples': [{'timestamp': float, параметр: значение, ...}, ...]}
+BATCH_KEY = "samples"
+TIMESTAMP_KEY = "timestamp"
+
+# Команды, отправленные сервером без запроса устройства: {'push': True, 'commands': [...]}
+PUSH_KEY = "push"
+
+# Первый кадр возобновляемой сессии: {'resume': токен, поля входа..., 'data': показания}
+RESUME_KEY = "resume"
+RESUME_DATA_KEY = "data"
+
+# Сервер останавливается: переподключиться через указанное число секунд
+RECONNECT_KEY = "reconnect"
+MAX_SAMPLES = 255
+
+JSON_MARKER = ord("{")
+MAX_PARAMS = 255
+INT32_MIN = -(2**31)
+INT32_MAX = 2**31 - 1
+
+SENSOR_HEADER = struct.Struct("!BB")
+SENSOR_ITEM = struct.Struct("!Bi")
+BATCH_HEADER = struct.Struct("!BB")
+SAMPLE_HEADER = struct.Struct("!dB")
+RESPONSE_HEADER = struct.Struct("!BHB")
+COMMAND_LENGTH = struct.Struct("!B")
+
+
+def is_sensor_value(value) -> bool:
+    """
+    Проверяет, что значение показания - число в диапазоне int32.
+    None, логические значения, строки, NaN и бесконечность не принимаются.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    return math.isfinite(value) and INT32_MIN <= value <= INT32_MAX
+
+
+def sensor_values(data: dict) -> dict:
+    """
+    Отбирает из показаний параметры с допустимыми значениями (is_sensor_value).
+
+    Args:
+        data (dict): Показания {параметр: значение}
+
+    Returns:
+        dict: Показания без параметров с недопустимыми значениями
+    """
+    return split_sensor_values(data)[0]
+
+
+def split_sensor_values(data: dict, ignore: tuple = ()) -> tuple[dict, int]:
+    """
+    Отбирает из показаний параметры с допустимыми значениями и считает отброшенные.
+
+    Args:
+        data (dict): Показания {параметр: значение}
+        ignore (tuple, optional): Служебные поля, которые не являются показаниями
+
+    Returns:
+        tuple[dict, int]: (допустимые показания, число отброшенных значений)
+    """
+    values = {}
+    rejected = 0
+    for key, value in data.items():
+        if key in ignore:
+            continue
+        if isinstance(key, str) and is_sensor_value(value):
+            values[key] = value
+        else:
+            rejected += 1
+    return values, rejected
+
+
+class JsonCodec:
+    name = FORMAT_JSON
+
+    def encode(self, data: dict) -> bytes:
+        """
+        Сериализует сообщение в JSON.
+
+        Args:
+            data (dict): Сообщение
+
+        Returns:
+            bytes: JSON в кодировке UTF-8
+        """
+        return json.dumps(data).encode("utf-8")
+
+    def decode(self, payload: bytes) -> dict:
+        """
+        Десериализует JSON-сообщение.
+
+        Args:
+            payload (bytes): JSON в кодировке UTF-8
+
+        Returns:
+            dict: Сообщение
+        """
+        return json.loads(payload)
+
+
+class BinaryCodec(JsonCodec):
+    name = FORMAT_BINARY
+
+    def __init__(self, params: list[str]):
+        """
+        Компактный двоичный формат с числовыми ID параметров.
+
+        ID параметра - его позиция в списке params, согласованном при входе.
+        Кадр показаний: [1][количество] + [ID параметра][int32] на каждый параметр.
+        Кадр ответа: [2][задержка uint16][число команд] + [длина][команда UTF-8].
+        Кадр пакета: [3][число замеров] + на каждый замер [время float64][количество]
+        и [ID параметра][int32] на каждый параметр.
+        Сообщения другого вида передаются в JSON.
+
+        Args:
+            params (list[str]): Список параметров устройства (не более 255)
+        """
+        self.params = list(params)
+        self.param_ids = {name: i for i, name in enumerate(self.params)}
+        self.sensor_structs = {}
+
+    def encode(self, data: dict) -> bytes:
+        """
+        Сериализует сообщение в двоичный кадр или, если это невозможно, в JSON.
+
+        Args:
+            data (dict): Сообщение
+
+        Returns:
+            bytes: Двоичный кадр или JSON в кодировке UTF-8
+        """
+        if self.is_sensor_frame(data):
+            return self.encode_sensor(data)
+        if self.is_batch_frame(data):
+            return self.encode_batch(data)
+        if self.is_response_frame(data):
+            return self.encode_response(data)
+        return super().encode(data)
+
+    def decode(self, payload: bytes) -> dict:
+        """
+        Десериализует двоичный кадр или JSON-сообщение.
+
+        Args:
+            payload (bytes): Кадр
+
+        Returns:
+            dict: Сообщение
+
+        Raises:
+            ValueError: При неизвестном типе кадра или повреждённых данных
+        """
+        try:
+            frame_type = payload[0]
+            if frame_type == JSON_MARKER:
+                return super().decode(payload)
+            if frame_type == FRAME_SENSOR:
+                return self.decode_sensor(payload)
+            if frame_type == FRAME_RESPONSE:
+                return self.decode_response(payload)
+            if frame_type == FRAME_BATCH:
+                return self.decode_batch(payload)
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"Повреждённый двоичный кадр: {e}")
+        raise ValueError(f"Неизвестный тип кадра: {frame_type}")
+
+    def is_sensor_frame(self, data: dict) -> bool:
+        """Проверяет, что сообщение - непустой набор целых значений известных параметров"""
+        return bool(data) and all(
+            key in self.param_ids
+            and isinstance(value, int)
+            and not isinstance(value, bool)
+            and INT32_MIN <= value <= INT32_MAX
+            for key, value in data.items()
+        )
+
+    def is_batch_frame(self, data: dict) -> bool:
+        """Проверяет, что сообщение - пакет замеров с метками времени"""
+        samples = data.get(BATCH_KEY)
+        return (
+            data.keys() == {BATCH_KEY}
+            and isinstance(samples, list)
+            and len(samples) <= MAX_SAMPLES
+            and all(
+                isinstance(sample, dict)
+                and isinstance(sample.get(TIMESTAMP_KEY), (int, float))
+                and not isinstance(sample.get(TIMESTAMP_KEY), bool)
+                and self.is_sensor_frame(
+                    {k: v for k, v in sample.items() if k != TIMESTAMP_KEY}
+                )
+                for sample in samples
+            )
+        )
+
+    @staticmethod
+    def is_response_frame(data: dict) -> bool:
+        """Проверяет, что сообщение - ответ сервера {'delay', 'commands'}"""
+        delay = data.get("delay")
+        commands = data.get("commands")
+        return (
+            data.keys() == {"delay", "commands"}
+            and isinstance(delay, int)
+            and 0 <= delay <= 0xFFFF
+            and isinstance(commands, list)
+            and len(commands) <= 0xFF
+            and all(isinstance(command, str) for command in commands)
+        )
+
+    def encode_sensor(self, data: dict) -> bytes:
+        """Упаковывает кадр показаний. Struct для каждого числа параметров кэшируется"""
+        count = len(data)
+        packer = self.sensor_structs.get(count)
+        if packer is None:
+            packer = struct.Struct("!BB" + "Bi" * count)
+            self.sensor_structs[count] = packer
+
+        values = [FRAME_SENSOR, count]
+        for key, value in data.items():
+            values.append(self.param_ids[key])
+            values.append(value)
+        return packer.pack(*values)
+
+    def decode_sensor(self, payload: bytes) -> dict:
+        """Распаковывает кадр показаний"""
+        _, count = SENSOR_HEADER.unpack_from(payload)
+        end = SENSOR_HEADER.size + count * SENSOR_ITEM.size
+        if len(payload) != end:
+            raise ValueError("Неверная длина кадра показаний")
+        return {
+            self.params[param_id]: value
+            for param_id, value in SENSOR_ITEM.iter_unpack(payload[SENSOR_HEADER.size:end])
+        }
+
+    def encode_batch(self, data: dict) -> bytes:
+        """Упаковывает кадр пакета замеров"""
+        samples = data[BATCH_KEY]
+        parts = [BATCH_HEADER.pack(FRAME_BATCH, len(samples))]
+        for sample in samples:
+            items = [(k, v) for k, v in sample.items() if k != TIMESTAMP_KEY]
+            parts.append(SAMPLE_HEADER.pack(sample[TIMESTAMP_KEY], len(items)))
+            for key, value in items:
+                parts.append(SENSOR_ITEM.pack(self.param_ids[key], value))
+        return b"".join(parts)
+
+    def decode_batch(self, payload: bytes) -> dict:
+        """Распаковывает кадр пакета замеров"""
+        _, count = BATCH_HEADER.unpack_from(payload)
+        offset = BATCH_HEADER.size
+        samples = []
+        for _ in range(count):
+            timestamp, items = SAMPLE_HEADER.unpack_from(payload, offset)
+            offset += SAMPLE_HEADER.size
+            sample = {TIMESTAMP_KEY: timestamp}
+            for _ in range(items):
+                param_id, value = SENSOR_ITEM.unpack_from(payload, offset)
+                offset += SENSOR_ITEM.size
+                sample[self.params[param_id]] = value
+            samples.append(sample)
+        if offset != len(payload):
+            raise ValueError("Неверная длина кадра пакета")
+        return {BATCH_KEY: samples}
+
+    @staticmethod
+    def encode_response(data: dict) -> bytes:
+        """
+        Упаковывает кадр ответа сервера. Команды длиннее 255 байт обрезаются
+        по границе символа UTF-8.
+        """
+        commands = data["commands"]
+        parts = [RESPONSE_HEADER.pack(FRAME_RESPONSE, data["delay"], len(commands))]
+        for command in commands:
+            encoded = command.encode("utf-8")
+            if len(encoded) > 0xFF:
+                encoded = encoded[:0xFF].decode("utf-8", "ignore").encode("utf-8")
+            parts.append(COMMAND_LENGTH.pack(len(encoded)))
+            parts.append(encoded)
+        return b"".join(parts)
+
+    @staticmethod
+    def decode_response(payload: bytes) -> dict:
+        """Распаковывает кадр ответа сервера"""
+        _, delay, count = RESPONSE_HEADER.unpack_from(payload)
+        offset = RESPONSE_HEADER.size
+        commands = []
+        for _ in range(count):
+            length = payload[offset]
+            offset += 1
+            commands.append(bytes(payload[offset:offset + length]).decode("utf-8"))
+            offset += length
+        return {"delay": delay, "commands": commands}
+
+
+JSON_CODEC = JsonCodec()
+
+
+def negotiate(device_info: dict) -> tuple[JsonCodec, dict]:
+    """
+    Выбирает формат обмена по данным, присланным устройством при входе.
+
+    Устройство перечисляет поддерживаемые форматы в порядке предпочтения
+    ('formats') и свои параметры ('params'). Устройства без поля 'formats'
+    продолжают работать в JSON.
+
+    Args:
+        device_info (dict): Сообщение устройства с метаданными
+
+    Returns:
+        tuple: (кодек, поля для ответа устройству)
+    """
+    formats = device_info.get("formats")
+    if not formats:
+        return JSON_CODEC, {}
+
+    params = device_info.get("params") or []
+    for name in formats:
+        if name == FORMAT_BINARY and 0 < len(params) <= MAX_PARAMS:
+            codec = BinaryCodec(params)
+            return codec, {"format": FORMAT_BINARY, "params": codec.params}
+        if name == FORMAT_JSON:
+            break
+    return JSON_CODEC, {"format": FORMAT_JSON}
+
+
+def codec_from_response(response: dict) -> JsonCodec:
+    """
+    Создаёт кодек по ответу сервера на вход устройства.
+
+    Args:
+        response (dict): Ответ сервера
+
+    Returns:
+        JsonCodec: Согласованный кодек (JSON, если сервер не поддерживает выбор формата)
+    """
+    if response.get("format") == FORMAT_BINARY and response.get("params"):
+        return BinaryCodec(response["params"])
+    return JSON_CODEC